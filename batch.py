@@ -0,0 +1,238 @@
+"""
+여러 유튜브 영상을 한 번에 팩트체크하는 배치 실행기 (UI 없이 실행)
+영상을 하나씩 run_pipeline으로 처리하면 같은 키워드 검색, 논문 다운로드, 임베딩이 영상마다 반복되므로
+영상 묶음(group)마다 키워드를 합쳐 중복을 없앤 뒤 논문을 한 번만 수집/임베딩하고,
+다음 묶음의 자막 추출/분석은 이전 묶음의 수집/검색/팩트체크와 겹쳐서 실행함
+
+사용 예:
+    python batch.py https://youtu.be/AAAA https://youtu.be/BBBB
+    python batch.py --input videos.jsonl --output results.jsonl   # {"url": ...} 한 줄씩 (또는 URL만 한 줄씩)
+
+결과는 영상 하나가 끝날 때마다 한 줄씩 JSONL로 기록됨
+    {"url", "video_id", "status": "ok" | "cached" | "error", "stage", "error", "claims", "keywords", "answer", "seconds"}
+"""
+import argparse
+import contextvars
+import json
+import logging
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from main import App
+from src.utils import YouTubeTranscriber
+from src.utils.logger import setup_logger
+from src.utils.pipeline import buffered
+from src.utils.tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class BatchRunner:
+    """
+    URL 목록 -> 영상별 결과 dict를 끝나는 순서대로 반환
+    - group_size개 영상씩 묶어서 처리: (1) 자막/주장/키워드 분석  (2) 합친 키워드로 논문 수집, 임베딩, 업로드 1회
+      (3) 영상별 검색 범위를 나눠 주장별로 검색  (4) 주장별 팩트체크 후 영상별 보고서로 합침
+    - (1)은 백그라운드에서 다음 묶음을 미리 처리하므로 (2)~(4)와 겹쳐서 실행됨
+    - 단계 결과는 App.result_store에 저장되어 UI와 공유되고, 중단 후 다시 실행하면 완료된 단계는 건너뜀
+    """
+    def __init__(self, app: App, group_size: int = 16, workers: int = 4, refresh: bool = False):
+        self.app = app
+        self.group_size = group_size
+        self.workers = workers
+        self.refresh = refresh
+
+    def run(self, urls):
+        groups = buffered(self._analyzed_groups(urls), maxsize=1, name="analyze")
+        try:
+            for group in groups:
+                yield from self._finish_group(group)
+        finally:
+            groups.close()
+
+    # URL을 group_size개씩 묶어 자막 추출과 분석을 마친 작업 목록으로 반환
+    def _analyzed_groups(self, urls):
+        group = []
+        for url in urls:
+            group.append(url)
+            if len(group) == self.group_size:
+                yield self._analyze_group(group)
+                group = []
+        if group:
+            yield self._analyze_group(group)
+
+    def _analyze_group(self, urls: list[str]) -> list[dict]:
+        with tracer.span("batch.analyze", videos=len(urls)), ThreadPoolExecutor(self.workers, thread_name_prefix="batch") as pool:
+            # 트레이싱 span을 이어받도록 호출한 쪽의 컨텍스트에서 실행
+            futures = [pool.submit(contextvars.copy_context().run, self._analyze, url) for url in urls]
+            return [future.result() for future in futures]
+
+    # 영상 1개: 저장된 결과를 불러오고 없으면 자막 추출 -> 주장/근거 -> 키워드
+    def _analyze(self, url: str) -> dict:
+        job = {"url": url, "video_id": YouTubeTranscriber.video_id(url), "started": time.perf_counter()}
+        store = self.app.result_store if job["video_id"] else None
+        job["record"] = store.load(job["video_id"]) if store and not self.refresh else {}
+        record = job["record"]
+        if record.get("answer") or (record.get("claims") and record.get("keywords")):
+            return job
+        try:
+            job["stage"] = "transcript"
+            transcript = self.app.transcriber.extract_transcripts(url)
+            job["stage"] = "analyze"
+            claims = self.app.analyzer.extract_claims(transcript)
+            keywords = self.app.analyzer.extract_keywords(claims)
+            if not claims or not keywords:
+                raise RuntimeError("주장/근거 또는 키워드를 추출하지 못했습니다.")
+            record.update(claims=claims, keywords=keywords)
+            self._save(job)
+        except Exception as e:
+            logger.error(f"Batch analysis failed for '{url}'", exc_info=True)
+            job["error"] = str(e)
+        return job
+
+    def _save(self, job: dict):
+        if job["video_id"]:
+            self.app.result_store.save(job["video_id"], job["record"])
+
+    # 수집/검색/팩트체크 후 영상별 결과를 끝나는 대로 반환
+    def _finish_group(self, jobs: list[dict]):
+        active = []
+        for job in jobs:
+            if "error" in job:
+                yield self._result(job, "error")
+            elif job["record"].get("answer"):
+                yield self._result(job, "cached")
+            else:
+                active.append(job)
+        if not active:
+            return
+        try:
+            self._index(active)
+            self._search(active)
+        except Exception as e:
+            logger.error("Batch indexing/search failed", exc_info=True)
+            for job in active:
+                job["error"] = str(e)
+                yield self._result(job, "error")
+            return
+        with ThreadPoolExecutor(self.workers, thread_name_prefix="batch") as pool:
+            futures = [(job, pool.submit(contextvars.copy_context().run, self._factcheck, job)) for job in active]
+            for job, future in futures:
+                try:
+                    future.result()
+                    yield self._result(job, "ok")
+                except Exception as e:
+                    logger.error(f"Batch fact-check failed for '{job['url']}'", exc_info=True)
+                    job["error"] = str(e)
+                    yield self._result(job, "error")
+
+    # 묶음 안의 모든 키워드를 합쳐 (대소문자 무시) 중복 없이 한 번만 수집하고 임베딩
+    # 키워드별로 검색된 논문 id를 기록해 두었다가 영상마다 자기 키워드의 논문으로 검색 범위를 제한
+    def _index(self, jobs: list[dict]):
+        pending = [job for job in jobs if "paper_ids" not in job["record"]]
+        if not pending:
+            return
+        for job in pending:
+            job["stage"] = "index"
+        queries = {}
+        for job in pending:
+            for keyword in job["record"]["keywords"]:
+                queries.setdefault(keyword.strip().lower(), keyword.strip())
+        total = sum(len(job["record"]["keywords"]) for job in pending)
+        logger.info(f"Collecting papers for {len(queries)} unique keywords ({total} before de-duplication) from {len(pending)} videos.")
+        self.app.db_manager.setup_qdrant()
+        sources, collected = {}, set()
+        with tracer.span("batch.index", videos=len(pending), keywords=len(queries)):
+            self.app.db_manager.upload_stream(
+                self.app.data_collector.iter_collect(list(queries.values()), sources=sources),
+                paper_ids=collected
+            )
+        for job in pending:
+            paper_ids = set()
+            for keyword in job["record"]["keywords"]:
+                paper_ids.update(sources.get(queries[keyword.strip().lower()], []))
+            job["record"]["paper_ids"] = sorted(paper_ids & collected)
+            self._save(job)
+
+    def _search(self, jobs: list[dict]):
+        with tracer.span("batch.search", videos=len(jobs)):
+            for job in jobs:
+                record = job["record"]
+                if "search_results" in record:
+                    continue
+                job["stage"] = "search"
+                record["search_results"] = self.app.db_manager.search_claims(
+                    record["claims"], paper_ids=set(record["paper_ids"]), keywords=record["keywords"]
+                )
+                self._save(job)
+
+    def _factcheck(self, job: dict):
+        job["stage"] = "factcheck"
+        record = job["record"]
+        record["answer"] = self.app.fact_check.factcheck_claims(record["claims"], record["search_results"])
+        if record["answer"]:
+            self._save(job)
+
+    @staticmethod
+    def _result(job: dict, status: str) -> dict:
+        record = job["record"]
+        result = {
+            "url": job["url"],
+            "video_id": job["video_id"],
+            "status": status,
+            "claims": record.get("claims"),
+            "keywords": record.get("keywords"),
+            "answer": record.get("answer"),
+            "seconds": round(time.perf_counter() - job["started"], 2),
+        }
+        if status == "error":
+            result["stage"] = job.get("stage")
+            result["error"] = job.get("error")
+        return result
+
+
+# 인자로 받은 URL과 입력 파일(JSONL의 "url" 또는 한 줄에 URL 하나)을 순서대로 나열
+def iter_urls(urls: list[str], input_path: str | None):
+    yield from urls
+    if not input_path:
+        return
+    with open(input_path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            yield json.loads(line)["url"] if line.startswith("{") else line
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="여러 유튜브 영상 팩트체크 (배치)")
+    parser.add_argument("urls", nargs="*", help="분석할 유튜브 URL")
+    parser.add_argument("--input", help="URL 목록 파일 (JSONL의 url 필드 또는 한 줄에 URL 하나)")
+    parser.add_argument("--output", default="batch_results.jsonl", help="결과 JSONL 경로 (영상마다 한 줄씩 바로 기록)")
+    parser.add_argument("--group-size", type=int, default=16, help="키워드를 합쳐 논문을 함께 수집할 영상 수")
+    parser.add_argument("--workers", type=int, default=4, help="자막 추출/분석, 팩트체크를 동시에 처리할 영상 수")
+    parser.add_argument("--refresh", action="store_true", help="저장된 결과를 무시하고 다시 분석")
+    args = parser.parse_args(argv)
+    if not args.urls and not args.input:
+        parser.error("URL 또는 --input 을 지정하세요.")
+
+    setup_logger()
+    app = App()
+    app.configure_runtime()
+    runner = BatchRunner(app, group_size=args.group_size, workers=args.workers, refresh=args.refresh)
+
+    started = time.perf_counter()
+    counts = {"ok": 0, "cached": 0, "error": 0}
+    with open(args.output, "a", encoding="utf-8") as out:
+        for result in runner.run(iter_urls(args.urls, args.input)):
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+            counts[result["status"]] += 1
+    elapsed = time.perf_counter() - started
+    done = sum(counts.values())
+    logger.info(f"Batch finished: {counts} in {elapsed:.1f}s ({done / elapsed * 3600:.0f} videos/hour). Results: {args.output}")
+    return 1 if counts["error"] and not (counts["ok"] or counts["cached"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+청킹 벤치마크
+머리글/바닥글, 절 제목, 수식/표 조각이 들어간 합성 논문 PDF로
+기존 방식(호출마다 분할기 생성, 글자 수로만 분할)과 StructuredChunker를 비교함
+- chunks/s: 청킹 처리량
+- chunks: 임베딩할 청크 수 (기존 대비 줄어든 수 = 더 이상 임베딩하지 않아도 되는 청크)
+- boilerplate: 머리글/수식 조각이 남아 있는 청크 수
+
+사용 예:
+    python -m benchmarks.chunker
+    python -m benchmarks.chunker --papers 100 --repeat 5 --embedding-model sentence-transformers/all-MiniLM-L6-v2
+"""
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+
+from src.data.pdf_extract import extract_pdf_text
+from src.utils.chunking import StructuredChunker, PAGE_BREAK
+from benchmarks.fakes import make_pdf_corpus
+
+logger = logging.getLogger(__name__)
+
+BENCH_DIR = Path(__file__).resolve().parent
+HEADER_LINE = "Synthetic Journal of Benchmark Studies"
+
+
+# 기존 TextProcessor.chunk_text와 같은 방식: 호출마다 분할기를 만들고 페이지 구분 없이 글자 수로 분할
+def legacy_chunks(text: str, size: int, overlap: int) -> list[str]:
+    from langchain_text_splitters import RecursiveCharacterTextSplitter
+    splitter = RecursiveCharacterTextSplitter(chunk_size=size, chunk_overlap=overlap, length_function=len)
+    return splitter.split_text(text.replace(PAGE_BREAK, ""))
+
+
+def has_boilerplate(text: str) -> bool:
+    return HEADER_LINE in text or any(StructuredChunker.is_debris(line) for line in text.splitlines() if line.strip())
+
+
+def measure(name: str, chunk_fn, texts: list[str], repeat: int) -> dict:
+    chunks, seconds = [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = [chunk for text in texts for chunk in chunk_fn(text)]
+        seconds.append(time.perf_counter() - start)
+    best = min(seconds)
+    return {
+        "name": name,
+        "chunks": len(chunks),
+        "chars": sum(len(c) for c in chunks),
+        "boilerplate": sum(has_boilerplate(c) for c in chunks),
+        "seconds": round(best, 4),
+        "chunks_per_s": round(len(chunks) / best, 1) if best else None,
+        "texts": chunks,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="청킹 벤치마크 (기존 방식 vs StructuredChunker)")
+    parser.add_argument("--papers", type=int, default=40)
+    parser.add_argument("--pages", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--chunk-size", type=int, default=1500)
+    parser.add_argument("--chunk-overlap", type=int, default=100)
+    parser.add_argument("--embedding-model", default=None, help="지정하면 두 방식의 청크 임베딩 시간도 측정")
+    parser.add_argument("--output", default=None, help="결과 JSON 저장 경로")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    paths = make_pdf_corpus(BENCH_DIR / ".cache" / "structured_pdfs", n_papers=args.papers, pages=args.pages, structured=True)
+    texts = [extract_pdf_text(path.read_bytes()) for path in paths]
+
+    chunker = StructuredChunker(size=args.chunk_size, overlap=args.chunk_overlap)
+    dropped = []
+    def structured_chunks(text):
+        chunks, count = chunker.split(text)
+        dropped.append(count)
+        return [chunk.text for chunk in chunks]
+
+    results = [
+        measure("legacy", lambda text: legacy_chunks(text, args.chunk_size, args.chunk_overlap), texts, args.repeat),
+        measure("structured", structured_chunks, texts, args.repeat),
+    ]
+    legacy, structured = results
+    structured["dropped_low_information"] = sum(dropped[-len(texts):])
+
+    if args.embedding_model:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(args.embedding_model)
+        for result in results:
+            start = time.perf_counter()
+            model.encode(result["texts"], batch_size=64)
+            result["embed_seconds"] = round(time.perf_counter() - start, 2)
+
+    for result in results:
+        result.pop("texts")
+    summary = {
+        "papers": len(texts),
+        "results": results,
+        "chunks_not_embedded": legacy["chunks"] - structured["chunks"],
+        "chars_not_embedded": legacy["chars"] - structured["chars"],
+    }
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    if args.output:
+        Path(args.output).write_text(json.dumps(summary, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# 벤치마크용 오프라인 대체 구현
+# 유튜브, arXiv, Whisper, Ollama, Qdrant 서버 없이 파이프라인 전체를 측정하기 위함
+import asyncio
+import datetime
+import json
+import random
+import re
+import time
+import zlib
+from pathlib import Path
+
+import fitz
+import numpy as np
+
+from src.analysis import BaseLLM
+
+VOCABULARY = (
+    "model data training neural network language vector embedding retrieval evidence claim "
+    "experiment result accuracy dataset transformer attention layer gradient loss benchmark "
+    "analysis method approach performance evaluation baseline signal noise climate energy "
+    "vaccine protein quantum sensor graph inference probability distribution sample"
+).split()
+
+FIXTURE_TRANSCRIPT = (
+    "오늘은 인공지능 언어 모델이 사실 확인에 얼마나 정확한지 이야기해 보겠습니다. "
+    "최근 연구에 따르면 검색 증강 생성 방식이 환각을 줄인다고 합니다. "
+) * 20
+
+
+SECTION_TITLES = ["1 Introduction", "2 Related Work", "3 Method", "4 Experiments", "5 Results", "6 Conclusion"]
+
+
+# 실제 논문 PDF처럼 머리글/바닥글, 절 제목, 수식/표 조각이 들어간 페이지 본문
+def structured_page_text(rng: random.Random, page: int, sentences: list[str]) -> str:
+    lines = ["Synthetic Journal of Benchmark Studies, Vol. 1"]
+    if page == 0:
+        lines.append("arXiv:2401.00001v1 [cs.CL] 1 Jan 2024")
+    for i in range(0, len(sentences), 10):
+        if i % 20 == 0:
+            lines.append(SECTION_TITLES[min(page * 2 + i // 20, len(SECTION_TITLES) - 1)])
+        lines.extend(sentences[i:i + 10])
+        # 수식과 표에서 추출된 짧은 기호/숫자 줄
+        lines.extend(f"{rng.random():.3f} {rng.random():.3f} ({rng.randint(1, 9)})" for _ in range(8))
+    lines.append(str(page + 1))
+    return "\n".join(lines)
+
+
+# 임의의 영어 문장으로 이루어진 논문 PDF 생성 (마지막 페이지는 References)
+# structured=True이면 머리글/바닥글, 절 제목, 수식/표 조각을 함께 넣음 (청킹 벤치마크용)
+def make_pdf_corpus(directory: str, n_papers: int = 20, pages: int = 6, seed: int = 0, structured: bool = False) -> list[Path]:
+    rng = random.Random(seed)
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(n_papers):
+        path = directory / f"paper_{i:04d}.pdf"
+        paths.append(path)
+        if path.exists():
+            continue
+        doc = fitz.open()
+        for p in range(pages):
+            page = doc.new_page()
+            if p == pages - 1:
+                text = "References\n" + "\n".join(f"[{k}] Author et al. Some title. 2020." for k in range(30))
+            else:
+                sentences = [" ".join(rng.choice(VOCABULARY) for _ in range(14)).capitalize() + "." for _ in range(40)]
+                text = structured_page_text(rng, p, sentences) if structured else "\n".join(sentences)
+            page.insert_textbox(fitz.Rect(36, 36, 576, 806), text, fontsize=7)
+        doc.save(path)
+        doc.close()
+    return paths
+
+
+class FakeArxivResult:
+    def __init__(self, index: int, pdf_path: Path):
+        self.entry_id = f"http://arxiv.org/abs/9999.{index:05d}v1"
+        self.title = f"Synthetic paper {index}"
+        self.published = datetime.datetime(2024, 1, 1) + datetime.timedelta(days=index)
+        # file:// URL이므로 네트워크 없이 ArxivCollector.download_pdf가 그대로 동작함
+        self.pdf_url = pdf_path.resolve().as_uri()
+
+    def get_short_id(self) -> str:
+        return self.entry_id.split("/abs/")[-1]
+
+
+# arxiv.Client 대체: 키워드마다 고정된 논문 부분집합을 반환 (키워드끼리 일부 겹침)
+class FakeArxivClient:
+    def __init__(self, pdf_paths: list[Path], latency: float = 0.0):
+        self.papers = [FakeArxivResult(i, path) for i, path in enumerate(pdf_paths)]
+        self.latency = latency
+
+    def results(self, search):
+        time.sleep(self.latency)
+        offset = zlib.crc32(search.query.encode("utf-8")) % max(1, len(self.papers))
+        count = min(search.max_results or len(self.papers), len(self.papers))
+        return iter([self.papers[(offset + k) % len(self.papers)] for k in range(count)])
+
+
+# SentenceTransformer 대체: 단어 해시 기반 임베딩 (모델 다운로드 없이 동작)
+class HashingEmbedder:
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token in text.lower().split():
+            vector[zlib.crc32(token.encode("utf-8")) % self.dim] += 1.0
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True, show_progress_bar: bool = False, **kwargs):
+        if isinstance(sentences, str):
+            return self._encode_one(sentences)
+        return np.stack([self._encode_one(s) for s in sentences])
+
+
+# BaseLLM 대체: 설정한 지연 시간 후 프롬프트 종류에 맞는 고정 응답 반환
+class MockLLM(BaseLLM):
+    RESPONSES = {
+        "claim_evidence": json.dumps({"claims": [
+            {
+                "claim": "검색 증강 생성은 언어 모델의 환각을 줄인다.",
+                "evidence": ["retrieval evidence reduces hallucination", "language model accuracy improves with retrieval"]
+            },
+            {
+                "claim": "임베딩 벡터가 클수록 검색 정확도가 높아진다.",
+                "evidence": ["vector embedding training improves retrieval"]
+            },
+        ]}, ensure_ascii=False),
+        "keywords": '["retrieval", "language", "model"]',
+        "fact_check": "**[최종 판정]**\n- **판정**: **`대체로 사실`**\n- **신뢰도**: **`보통`**",
+    }
+
+    def __init__(self, prompt_manager, latency: float = 0.05, **kwargs):
+        super().__init__(model="mock", api_base=None, **kwargs)
+        self.latency = latency
+        # 시스템 프롬프트 내용으로 어떤 프롬프트의 호출인지 구분
+        self._by_system = {
+            prompt["prompts"]["system"]: key for key, prompt in prompt_manager.prompts.items()
+        }
+        self.calls = 0
+
+    def _respond(self, messages) -> str:
+        self.calls += 1
+        key = self._by_system.get(messages[0]["content"], "fact_check")
+        return self.RESPONSES.get(key, self.RESPONSES["fact_check"])
+
+    def _completion(self, messages, **kwargs) -> str:
+        time.sleep(self.latency)
+        return self._respond(messages)
+
+    # 첫 조각까지 latency만큼 기다린 뒤 단어 단위로 반환
+    def llm_stream(self, messages, template_hash=None, use_cache=True, usage=None, **kwargs):
+        time.sleep(self.latency)
+        yield from re.findall(r"\S+\s*", self._respond(messages))
+
+    async def _acall(self, messages, **kwargs) -> str:
+        async with self._semaphore:
+            await asyncio.sleep(self.latency)
+            return self._respond(messages)
+
+
+# YouTubeTranscriber 대체
+class FakeTranscriber:
+    def __init__(self, latency: float = 0.0, transcript: str = FIXTURE_TRANSCRIPT):
+        self.latency = latency
+        self.transcript = transcript
+
+    def extract_transcripts(self, url: str, on_partial=None) -> str:
+        time.sleep(self.latency)
+        return self.transcript
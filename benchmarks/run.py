@@ -0,0 +1,323 @@
+"""
+오프라인 벤치마크
+외부 서비스 대신 benchmarks/fakes.py의 대체 구현과 Qdrant :memory: 모드를 사용해
+단계별 지연 시간(p50/p90/p99), 처리량(papers/s, chunks/s), 최대 메모리(RSS)를 측정하고 기준값과 비교함
+
+사용 예:
+    python -m benchmarks.run                      # 측정 후 benchmarks/baseline.json과 비교
+    python -m benchmarks.run --save-baseline      # 현재 결과를 기준값으로 저장
+    python -m benchmarks.run --embedding-model sentence-transformers/all-MiniLM-L6-v2
+"""
+import argparse
+import json
+import logging
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+from qdrant_client import QdrantClient
+
+from main import App
+from src.analysis import TextAnalyzer, FactCheck
+from src.data import ArxivCollector, HostRateLimiter, PdfExtractor
+from src.database.qdrant import VectorDB
+from src.database.local_index import LocalVectorDB
+from src.utils import PromptManager, TextProcessor
+from src.utils import SparseEncoder
+from benchmarks.fakes import make_pdf_corpus, FakeArxivClient, HashingEmbedder, MockLLM, FakeTranscriber
+
+logger = logging.getLogger(__name__)
+
+BENCH_DIR = Path(__file__).resolve().parent
+DEFAULT_BASELINE = BENCH_DIR / "baseline.json"
+KEYWORDS = ["retrieval", "language", "model"]
+CLAIMS = [
+    {
+        "claim": "retrieval augmented generation reduces hallucination",
+        "evidence": ["retrieval evidence improves accuracy", "language model benchmark results"],
+    },
+    {
+        "claim": "larger embedding vectors improve retrieval",
+        "evidence": ["vector embedding training data"],
+    },
+]
+
+
+# App 생성까지 불러오면 안 되는 무거운 패키지 (처음 사용할 때 불러와야 함)
+HEAVY_MODULES = ("gradio", "litellm", "sentence_transformers", "torch", "qdrant_client", "langchain_text_splitters", "fitz", "openai")
+
+# 새 인터프리터에서 main import와 App 생성 시간, 그 시점까지 불러온 무거운 패키지를 측정
+STARTUP_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+main.App()
+built = time.perf_counter()
+print(json.dumps({
+    "import_s": imported - start,
+    "app_init_s": built - imported,
+    "heavy_modules": [m for m in HEAVY_MODULES if m in sys.modules],
+}))
+"""
+
+
+def measure_startup(workdir: Path) -> dict:
+    # App()이 외부 서비스 없이 생성되도록 필요한 설정만 채우고, 캐시 파일은 작업 폴더에 생성
+    env = dict(
+        os.environ,
+        VECTOR_SIZE=os.environ.get("VECTOR_SIZE", "384"),
+        PAPER_CACHE_DIR=str(workdir / "cache" / "papers"),
+        LLM_CACHE_PATH=str(workdir / "cache" / "llm.sqlite3"),
+        TRANSCRIPT_CACHE_PATH=str(workdir / "cache" / "transcripts.sqlite3"),
+        RESULT_STORE_PATH=str(workdir / "cache" / "results.sqlite3"),
+    )
+    script = f"HEAVY_MODULES = {HEAVY_MODULES!r}\n" + STARTUP_SCRIPT
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        cwd=BENCH_DIR.parent, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+class StageTimer:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.counts = defaultdict(int)
+
+    @contextmanager
+    def measure(self, name: str):
+        start = time.perf_counter()
+        yield
+        self.samples[name].append(time.perf_counter() - start)
+
+
+def percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+# 현재 프로세스의 최대 RSS (MB) - Linux는 KB, macOS는 byte 단위
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+def load_embedding_model(name: str | None):
+    if not name:
+        model = HashingEmbedder()
+        return model, model.dim
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(name)
+    return model, model.get_sentence_embedding_dimension()
+
+
+class Bench:
+    def __init__(self, args):
+        self.args = args
+        self.workdir = Path(args.workdir or tempfile.mkdtemp(prefix="factcheck-bench-"))
+        pdf_paths = make_pdf_corpus(self.workdir / "corpus", n_papers=args.papers, pages=args.pages)
+        self.arxiv_client = FakeArxivClient(pdf_paths, latency=args.search_latency)
+        self.prompt_manager = PromptManager(prompt_dir=str(BENCH_DIR.parent / "Prompts"))
+        self.llm = MockLLM(self.prompt_manager, latency=args.llm_latency)
+        self.embedding_model, self.vector_size = load_embedding_model(args.embedding_model)
+        self.qdrant = QdrantClient(":memory:")
+        self.extractor = PdfExtractor(max_workers=args.pdf_workers)
+
+    # 매 반복마다 새 컬렉션/임베딩 캐시를 사용해 항상 같은 조건(캐시 없음)에서 측정
+    def components(self, run: int) -> dict:
+        processor = TextProcessor(
+            embedding_model=self.embedding_model,
+            model_name=self.args.embedding_model or "hashing",
+            batch_size=self.args.batch_size,
+            sparse_encoder=None if self.args.dense_only else SparseEncoder()
+        )
+        return {
+            "collector": ArxivCollector(
+                arxiv_client=self.arxiv_client,
+                max_result=self.args.max_result,
+                max_workers=self.args.workers,
+                rate_limiter=HostRateLimiter(default_interval=0, intervals={"export.arxiv.org": 0}),
+                extractor=self.extractor
+            ),
+            "processor": processor,
+            "db": LocalVectorDB(
+                path=str(self.workdir / "index"),
+                text_processer=processor,
+                collection_name=f"bench_{run}",
+                vector_size=self.vector_size
+            ) if self.args.backend == "local" else VectorDB(
+                client=self.qdrant,
+                text_processer=processor,
+                collection_name=f"bench_{run}",
+                vector_size=self.vector_size
+            ),
+            "analyzer": TextAnalyzer(llm=self.llm, prompt_manager=self.prompt_manager),
+            "fact_check": FactCheck(llm=self.llm, prompt_manager=self.prompt_manager),
+        }
+
+    def build_app(self, components: dict) -> App:
+        # App.__init__은 실제 서비스에 연결하므로 사용하지 않고 구성 요소만 대체
+        app = App.__new__(App)
+        app.transcriber = FakeTranscriber()
+        app.analyzer = components["analyzer"]
+        app.fact_check = components["fact_check"]
+        app.data_collector = components["collector"]
+        app.db_manager = components["db"]
+        # 매 반복마다 전체 파이프라인을 측정하기 위해 결과 저장소는 사용하지 않음
+        app.result_store = None
+        return app
+
+    def run(self) -> dict:
+        timer = StageTimer()
+        for run in range(self.args.repeat):
+            c = self.components(run)
+            with timer.measure("collect"):
+                papers = c["collector"].collect(KEYWORDS)
+            timer.counts["papers"] += len(papers)
+
+            with timer.measure("chunk"):
+                chunks = [chunk for p in papers for chunk in c["processor"].chunk_text(p["body"])]
+            timer.counts["chunks"] += len(chunks)
+
+            with timer.measure("embed"):
+                c["processor"].embed_documents(chunks)
+
+            c["db"].setup_qdrant()
+            with timer.measure("upload"):
+                c["db"].upload_data(papers)
+
+            with timer.measure("search"):
+                c["db"].search_claims(CLAIMS, keywords=KEYWORDS)
+
+            with timer.measure("analyze"):
+                claims = c["analyzer"].extract_claims("transcript")
+                c["analyzer"].extract_keywords(claims)
+
+            with timer.measure("factcheck"):
+                c["fact_check"].factcheck_claims(CLAIMS, [[] for _ in CLAIMS])
+
+            # 전체 파이프라인은 새 컬렉션에서 측정
+            c = self.components(run + self.args.repeat)
+            app = self.build_app(c)
+            with timer.measure("pipeline"):
+                outputs = list(app.run_pipeline("https://youtu.be/dQw4w9WgXcQ"))
+            status, answer = outputs[-1]
+            if not answer:
+                raise RuntimeError(f"Pipeline did not produce an answer: {status}")
+
+        stages = {
+            name: {
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "mean": sum(values) / len(values),
+                "n": len(values),
+            }
+            for name, values in timer.samples.items()
+        }
+        return {
+            "stages": stages,
+            "startup": measure_startup(self.workdir),
+            "throughput": {
+                "papers_per_s": timer.counts["papers"] / sum(timer.samples["collect"]),
+                "chunks_per_s_chunk": timer.counts["chunks"] / sum(timer.samples["chunk"]),
+                "chunks_per_s_embed": timer.counts["chunks"] / sum(timer.samples["embed"]),
+            },
+            "peak_rss_mb": peak_rss_mb(),
+            "config": {k: v for k, v in vars(self.args).items() if k not in ("baseline", "save_baseline", "workdir", "startup_budget")},
+        }
+
+
+# 기준값 대비 p50 지연 시간이 tolerance 비율 이상 늘어난 단계 목록
+def compare(result: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, stats in result["stages"].items():
+        base = baseline.get("stages", {}).get(name)
+        if not base:
+            continue
+        if stats["p50"] > base["p50"] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {stats['p50'] * 1000:.1f}ms > baseline {base['p50'] * 1000:.1f}ms")
+    base_rss = baseline.get("peak_rss_mb")
+    if base_rss and result["peak_rss_mb"] > base_rss * (1 + tolerance):
+        regressions.append(f"peak_rss: {result['peak_rss_mb']:.0f}MB > baseline {base_rss:.0f}MB")
+    return regressions
+
+
+# 시작 시간이 예산을 넘거나 무거운 패키지를 App 생성 시점에 불러오면 실패
+def check_startup(startup: dict, budget: float) -> list[str]:
+    problems = []
+    total = startup["import_s"] + startup["app_init_s"]
+    if total > budget:
+        problems.append(f"startup: {total:.2f}s > budget {budget:.2f}s")
+    if startup["heavy_modules"]:
+        problems.append(f"startup: heavy modules imported eagerly: {', '.join(startup['heavy_modules'])}")
+    return problems
+
+
+def print_report(result: dict):
+    print(f"{'stage':<12}{'p50(ms)':>10}{'p90(ms)':>10}{'p99(ms)':>10}{'n':>5}")
+    for name, stats in result["stages"].items():
+        print(f"{name:<12}{stats['p50'] * 1000:>10.1f}{stats['p90'] * 1000:>10.1f}{stats['p99'] * 1000:>10.1f}{stats['n']:>5}")
+    for name, value in result["throughput"].items():
+        print(f"{name:<22}{value:>10.1f}")
+    print(f"{'peak_rss_mb':<22}{result['peak_rss_mb']:>10.1f}")
+    startup = result["startup"]
+    print(f"{'startup_import_s':<22}{startup['import_s']:>10.2f}")
+    print(f"{'startup_app_init_s':<22}{startup['app_init_s']:>10.2f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="오프라인 팩트체크 파이프라인 벤치마크")
+    parser.add_argument("--papers", type=int, default=20, help="픽스처 논문 수")
+    parser.add_argument("--pages", type=int, default=6, help="논문당 페이지 수")
+    parser.add_argument("--max-result", type=int, default=10, help="키워드당 검색 결과 수")
+    parser.add_argument("--workers", type=int, default=4, help="ArxivCollector 동시 작업 수")
+    parser.add_argument("--pdf-workers", type=int, default=2, help="PDF 파싱 프로세스 수 (0이면 스레드에서 파싱)")
+    parser.add_argument("--batch-size", type=int, default=64, help="임베딩 배치 크기")
+    parser.add_argument("--repeat", type=int, default=5, help="반복 횟수")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Mock LLM 응답 지연(초)")
+    parser.add_argument("--search-latency", type=float, default=0.0, help="가짜 arXiv 검색 지연(초)")
+    parser.add_argument("--backend", choices=["qdrant", "local"], default="qdrant", help="벡터 저장소 (qdrant :memory: | 로컬 인덱스)")
+    parser.add_argument("--dense-only", action="store_true", help="BM25 희소 벡터 없이 밀집 벡터 검색만 측정")
+    parser.add_argument("--embedding-model", default=None, help="SentenceTransformer 모델 이름 (없으면 해시 임베딩)")
+    parser.add_argument("--workdir", default=None, help="픽스처 PDF를 저장할 경로")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="기준값 JSON 경로")
+    parser.add_argument("--save-baseline", action="store_true", help="현재 결과를 기준값으로 저장")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="허용 성능 저하 비율")
+    parser.add_argument("--startup-budget", type=float, default=2.0, help="main import + App 생성 허용 시간(초)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING)
+    result = Bench(args).run()
+    print_report(result)
+    startup_problems = check_startup(result["startup"], args.startup_budget)
+    for line in startup_problems:
+        print(f"REGRESSION {line}")
+
+    baseline_path = Path(args.baseline)
+    if args.save_baseline:
+        baseline_path.write_text(json.dumps(result, indent=2), encoding="utf-8")
+        print(f"Saved baseline to {baseline_path}")
+        return 1 if startup_problems else 0
+    if not baseline_path.exists():
+        print(f"No baseline at {baseline_path}. Run with --save-baseline to create one.")
+        return 1 if startup_problems else 0
+    regressions = compare(result, json.loads(baseline_path.read_text(encoding="utf-8")), args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return 1 if regressions or startup_problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
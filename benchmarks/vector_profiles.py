@@ -0,0 +1,116 @@
+"""
+컬렉션 저장 프로필별 검색 정확도(recall@k)와 메모리 사용량 비교
+양자화와 HNSW 설정은 Qdrant 서버에서만 적용되므로(:memory: 모드는 전수 검색) 실제 서버가 필요함
+
+사용 예:
+    python -m benchmarks.vector_profiles --url http://localhost:6333
+    python -m benchmarks.vector_profiles --profiles default int8 binary --points 50000 --dim 768
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from src.database.qdrant import VectorDB
+from src.database.profiles import COLLECTION_PROFILES, estimate_memory, search_params
+from benchmarks.run import percentile
+
+
+# 실제 임베딩처럼 몇 개의 군집에 모인 정규화 벡터와, 그 근처의 질의 벡터 생성
+def make_vectors(points: int, queries: int, dim: int, clusters: int = 64, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dim)).astype(np.float32)
+    data = centers[rng.integers(0, clusters, points)] + 0.5 * rng.normal(size=(points, dim)).astype(np.float32)
+    data /= np.linalg.norm(data, axis=1, keepdims=True)
+    query = data[rng.integers(0, points, queries)] + 0.3 * rng.normal(size=(queries, dim)).astype(np.float32)
+    query /= np.linalg.norm(query, axis=1, keepdims=True)
+    return data, query
+
+
+# 인덱싱(HNSW 구성, 양자화)이 끝날 때까지 대기
+def wait_indexed(client: QdrantClient, name: str, timeout: float = 600):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if client.get_collection(collection_name=name).status == models.CollectionStatus.GREEN:
+            return
+        time.sleep(1)
+    raise TimeoutError(f"Collection '{name}' was not indexed within {timeout}s")
+
+
+def bench_profile(client: QdrantClient, profile_name: str, data: np.ndarray, query: np.ndarray, truth: np.ndarray, args) -> dict:
+    name = f"bench_profile_{profile_name}"
+    if client.collection_exists(collection_name=name):
+        client.delete_collection(collection_name=name)
+    db = VectorDB(client=client, text_processer=None, collection_name=name, vector_size=data.shape[1], profile=profile_name)
+    db.setup_qdrant()
+    try:
+        for start in range(0, len(data), args.batch_size):
+            end = min(start + args.batch_size, len(data))
+            client.upsert(
+                collection_name=name,
+                wait=True,
+                points=models.Batch(
+                    ids=list(range(start, end)),
+                    vectors=data[start:end].tolist(),
+                    payloads=[{"paper_id": f"paper-{i // 20}", "date": "2024-01-01", "chunk_text": "x" * args.payload_chars} for i in range(start, end)]
+                )
+            )
+        wait_indexed(client, name)
+
+        latencies, hits = [], 0
+        for q, expected in zip(query, truth):
+            started = time.perf_counter()
+            result = client.query_points(
+                collection_name=name,
+                query=q.tolist(),
+                limit=args.k,
+                search_params=search_params(db.profile),
+                with_payload=False
+            )
+            latencies.append(time.perf_counter() - started)
+            hits += len({point.id for point in result.points} & set(expected.tolist()))
+        return {
+            "profile": profile_name,
+            "recall": hits / (len(query) * args.k),
+            "p50_ms": percentile(latencies, 50) * 1000,
+            "p99_ms": percentile(latencies, 99) * 1000,
+            "est_ram_mb": estimate_memory(db.profile, data.shape[1], len(data)) / (1024 * 1024),
+        }
+    finally:
+        if not args.keep:
+            client.delete_collection(collection_name=name)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="컬렉션 프로필별 recall/메모리 비교")
+    parser.add_argument("--url", default="http://localhost:6333", help="Qdrant 서버 주소")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--profiles", nargs="+", default=list(COLLECTION_PROFILES), choices=list(COLLECTION_PROFILES))
+    parser.add_argument("--points", type=int, default=30000, help="저장할 벡터 수")
+    parser.add_argument("--queries", type=int, default=200, help="질의 수")
+    parser.add_argument("--dim", type=int, default=384, help="벡터 차원")
+    parser.add_argument("--k", type=int, default=10, help="recall@k")
+    parser.add_argument("--batch-size", type=int, default=1000, help="업로드 배치 크기")
+    parser.add_argument("--payload-chars", type=int, default=1500, help="포인트당 chunk_text 길이")
+    parser.add_argument("--keep", action="store_true", help="측정 후 컬렉션을 지우지 않음")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    client = QdrantClient(url=args.url, api_key=args.api_key)
+    data, query = make_vectors(args.points, args.queries, args.dim)
+    # 정답: 전수 코사인 유사도 top-k
+    truth = np.argsort(-(query @ data.T), axis=1)[:, :args.k]
+
+    print(f"{'profile':<10}{'recall@' + str(args.k):>11}{'p50(ms)':>10}{'p99(ms)':>10}{'est RAM(MB)':>13}")
+    for profile_name in args.profiles:
+        row = bench_profile(client, profile_name, data, query, truth, args)
+        print(f"{row['profile']:<10}{row['recall']:>11.3f}{row['p50_ms']:>10.1f}{row['p99_ms']:>10.1f}{row['est_ram_mb']:>13.1f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,6 @@
-import dotenv, os, openai
-from sentence_transformers import SentenceTransformer
+import dotenv, os
 # 메모이제이션 적용을 위한 데코레이터
 from functools import lru_cache
-from qdrant_client import QdrantClient
 
 # 환경 변수 로드
 dotenv.load_dotenv()
@@ -18,21 +16,114 @@ class Settings:
         self.EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
         self.VECTOR_SIZE = int(os.getenv("VECTOR_SIZE"))
         self.COLLECTION_NAME = os.getenv("QDRANT_COLLECTION_NAME")
+        # 새 컬렉션을 만들 때의 저장 방식 (default | int8 | binary | compact)
+        self.COLLECTION_PROFILE = os.getenv("QDRANT_COLLECTION_PROFILE", "default")
+        # 밀집 벡터 검색과 BM25 키워드 검색을 함께 사용 (새로 만드는 컬렉션에 희소 벡터 추가)
+        self.HYBRID_SEARCH = os.getenv("HYBRID_SEARCH", "true").lower() == "true"
 
+        # 벡터 저장소 (qdrant | local), 로컬 인덱스 저장 경로와 IVF 군집 수(0이면 전수 검색)
+        self.VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "qdrant")
+        self.LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", ".cache/vector_index")
+        self.LOCAL_INDEX_NLIST = int(os.getenv("LOCAL_INDEX_NLIST", "0"))
+
+        # 논문 본문 캐시 경로와 최대 크기(MB)
+        self.PAPER_CACHE_DIR = os.getenv("PAPER_CACHE_DIR", ".cache/papers")
+        self.PAPER_CACHE_MAX_MB = int(os.getenv("PAPER_CACHE_MAX_MB", "1024"))
+
+        # 논문 수집 동시 작업 수(1이면 순차 처리)와 논문 1편당 제한 시간(초)
+        self.ARXIV_MAX_WORKERS = int(os.getenv("ARXIV_MAX_WORKERS", "4"))
+        self.ARXIV_PAPER_TIMEOUT = float(os.getenv("ARXIV_PAPER_TIMEOUT", "60"))
+
+        # PDF 파싱 프로세스 수(0이면 요청 스레드에서 파싱), 문서당 최대 페이지 수와 크기(MB)
+        self.PDF_MAX_WORKERS = int(os.getenv("PDF_MAX_WORKERS", "2"))
+        self.PDF_MAX_PAGES = int(os.getenv("PDF_MAX_PAGES", "50"))
+        self.PDF_MAX_MB = int(os.getenv("PDF_MAX_MB", "30"))
+
+        # 임베딩 배치 크기와 임베딩 캐시 최대 항목 수
+        self.EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        self.EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
+
+        # LLM 호출 제한 시간(초), 최대 재시도 횟수, 최대 동시 요청 수
+        self.LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))
+        self.LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+        self.LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+
+        # LLM 컨텍스트 크기(0이면 litellm 모델 정보에서 자동으로 찾음)와 출력용으로 남겨둘 토큰 수
+        # 두 값은 호출마다 max_tokens와 (Ollama 모델이면) num_ctx로도 전달됨
+        self.LLM_CONTEXT_SIZE = int(os.getenv("LLM_CONTEXT_SIZE", "0"))
+        self.LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "1024"))
+
+        # 주장/근거, 키워드 출력 형식 제한 (schema: JSON 스키마, json: JSON 모드, off: 프롬프트로만 요청)
+        # 형식이 틀린 응답은 오류 내용을 알려주고 해당 호출만 LLM_REPAIR_RETRIES번까지 다시 요청
+        self.LLM_JSON_MODE = os.getenv("LLM_JSON_MODE", "schema").lower()
+        self.LLM_REPAIR_RETRIES = int(os.getenv("LLM_REPAIR_RETRIES", "2"))
+
+        # 영상 하나에서 추출할 최대 주장 수와 주장별 팩트체크를 동시에 실행할 수
+        self.MAX_CLAIMS = int(os.getenv("MAX_CLAIMS", "3"))
+        self.FACTCHECK_WORKERS = int(os.getenv("FACTCHECK_WORKERS", "3"))
+
+        # LLM 응답 캐시 (sqlite 파일 경로, 유효 기간(초), 사용 여부)
+        self.LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm.sqlite3")
+        self.LLM_CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))
+        self.LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+
+        # 로컬 arXiv 논문 목록 (키워드를 먼저 로컬에서 찾고, CORPUS_MIN_HITS편 미만일 때만 arXiv API 검색)
+        # CORPUS_CATEGORIES(쉼표 구분, 예: cs.CL,cs.AI)를 설정하면 해당 분야 새 논문을 CORPUS_SYNC_INTERVAL초마다 백그라운드에서 수집/임베딩
+        self.CORPUS_ENABLED = os.getenv("CORPUS_ENABLED", "true").lower() == "true"
+        self.CORPUS_PATH = os.getenv("CORPUS_PATH", ".cache/arxiv_corpus.sqlite3")
+        self.CORPUS_CATEGORIES = [c.strip() for c in os.getenv("CORPUS_CATEGORIES", "").split(",") if c.strip()]
+        self.CORPUS_MIN_HITS = int(os.getenv("CORPUS_MIN_HITS", "3"))
+        self.CORPUS_SYNC_INTERVAL = float(os.getenv("CORPUS_SYNC_INTERVAL", str(6 * 3600)))
+        self.CORPUS_SYNC_MAX = int(os.getenv("CORPUS_SYNC_MAX", "2000"))
+
+        # 자막 캐시 경로, 기존 자막 우선 사용 여부, mp3 재인코딩 여부
+        self.TRANSCRIPT_CACHE_PATH = os.getenv("TRANSCRIPT_CACHE_PATH", ".cache/transcripts.sqlite3")
+        self.TRANSCRIPT_PREFER_SUBTITLES = os.getenv("TRANSCRIPT_PREFER_SUBTITLES", "true").lower() == "true"
+        self.TRANSCRIPT_REENCODE_AUDIO = os.getenv("TRANSCRIPT_REENCODE_AUDIO", "false").lower() == "true"
+
+        # STT 백엔드(openai | local), 구간 길이/겹침(초), 동시 변환 수, 로컬 모델 크기
+        self.STT_BACKEND = os.getenv("STT_BACKEND", "openai")
+        self.STT_SEGMENT_SECONDS = float(os.getenv("STT_SEGMENT_SECONDS", "600"))
+        self.STT_OVERLAP_SECONDS = float(os.getenv("STT_OVERLAP_SECONDS", "5"))
+        self.STT_MAX_WORKERS = int(os.getenv("STT_MAX_WORKERS", "4"))
+        self.STT_LOCAL_MODEL = os.getenv("STT_LOCAL_MODEL", "base")
+
+        # 트레이싱 span을 기록할 JSON-lines 파일, Prometheus 메트릭 포트(0이면 사용 안 함)
+        self.TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "log/trace.jsonl")
+        self.METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+        # 앱 시작 직후 백그라운드에서 모델/클라이언트를 미리 불러올지 여부 (false면 첫 요청 때 불러옴)
+        self.WARMUP_ON_START = os.getenv("WARMUP_ON_START", "true").lower() == "true"
+
+        # 영상별 팩트체크 결과 저장소 경로와 결과 유효 기간(초, 0이면 제한 없음)
+        self.RESULT_STORE_PATH = os.getenv("RESULT_STORE_PATH", ".cache/results.sqlite3")
+        self.RESULT_MAX_AGE = float(os.getenv("RESULT_MAX_AGE", str(7 * 24 * 3600)))
+
+        # 동시에 처리할 요청 수와 대기열 최대 길이 (초과하면 새 요청은 거절)
+        self.UI_CONCURRENCY = int(os.getenv("UI_CONCURRENCY", "4"))
+        self.UI_QUEUE_SIZE = int(os.getenv("UI_QUEUE_SIZE", "32"))
+        # 모든 요청이 공유하는 단계별 동시 작업 수 (다운로드는 I/O, 임베딩은 CPU/GPU 위주라 따로 제한)
+        self.DOWNLOAD_CONCURRENCY = int(os.getenv("DOWNLOAD_CONCURRENCY", "8"))
+        self.EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "1"))
+
+    # 아래 클라이언트/모델은 import와 생성에 시간이 오래 걸리므로 처음 접근할 때 불러와서 생성
     @property
     @lru_cache
-    def openai_client(self) -> openai.Client:
+    def openai_client(self):
+        import openai
         return openai.Client(api_key=self.OPENAI_API_KEY)
     
     # Qdrant 클라이언트 인스턴스 생성
     @property
     @lru_cache
     def qdrant_client(self):
+        from qdrant_client import QdrantClient
         return QdrantClient(
             url=self.QDRANT_URL,
             api_key=self.QDRANT_API_KEY
         )
     @property
     @lru_cache
-    def embedding_model(self) -> SentenceTransformer:
+    def embedding_model(self):
+        from sentence_transformers import SentenceTransformer
         return SentenceTransformer(self.EMBEDDING_MODEL)
\ No newline at end of file
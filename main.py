@@ -1,80 +1,350 @@
-import gradio as gr
-from gradio.components import Textbox,Markdown
 import arxiv
+import contextvars
+import queue
+import sys
+import threading
+import time
+import logging
+from contextlib import closing
 
 from configs.settings import Settings
-from src.utils import PromptManager,YouTubeTranscriber,TextProcessor
-from src.data import ArxivCollector
-from src.analysis import BaseLLM,TextAnalyzer,FactCheck
+from src.utils import PromptManager,YouTubeTranscriber,TextProcessor,SQLiteCache,ResultStore
+from src.utils import ChunkedTranscriber,OpenAIWhisperBackend,LocalWhisperBackend
+from src.data import ArxivCollector,PaperCache,PdfExtractor,LocalCorpus,CorpusSync
+from src.analysis import BaseLLM,TextAnalyzer,FactCheck,TokenBudget
 from src.database.qdrant import VectorDB
+from src.database.local_index import LocalVectorDB
 from src.utils.logger import setup_logger
+from src.utils.tracing import tracer
+from src.utils.concurrency import stage_limiter
+from src.utils.lazy import LazyObject
+from src.utils import SparseEncoder
+
+logger = logging.getLogger(__name__)
+
+# 첫 요청 전에 미리 불러 두면 좋은 무거운 패키지 (readiness에도 표시)
+WARMUP_MODULES = ("litellm", "langchain_text_splitters")
 
 class App():
     def __init__(self):
         self.settings = Settings()
+        # 모델/클라이언트는 처음 사용할 때 생성 -> App 생성과 UI 실행을 기다리게 하지 않음
+        self.lazy = {
+            "embedding_model": LazyObject(lambda: self.settings.embedding_model, "embedding_model"),
+            "openai_client": LazyObject(lambda: self.settings.openai_client, "openai_client"),
+        }
+        # 로컬 인덱스를 쓰면 Qdrant 서버에 연결하지 않음
+        if self.settings.VECTOR_BACKEND == "qdrant":
+            self.lazy["qdrant_client"] = LazyObject(lambda: self.settings.qdrant_client, "qdrant_client")
         self.prompt_manager = PromptManager(
             prompt_dir='Prompts'
         )
         self.transcriber = YouTubeTranscriber(
-            openai_client=self.settings.openai_client
+            openai_client=self.lazy["openai_client"],
+            cache=SQLiteCache(path=self.settings.TRANSCRIPT_CACHE_PATH),
+            prefer_subtitles=self.settings.TRANSCRIPT_PREFER_SUBTITLES,
+            reencode_audio=self.settings.TRANSCRIPT_REENCODE_AUDIO,
+            stt_engine=ChunkedTranscriber(
+                backend=LocalWhisperBackend(model_size=self.settings.STT_LOCAL_MODEL)
+                if self.settings.STT_BACKEND == "local"
+                else OpenAIWhisperBackend(client=self.lazy["openai_client"]),
+                segment_seconds=self.settings.STT_SEGMENT_SECONDS,
+                overlap_seconds=self.settings.STT_OVERLAP_SECONDS,
+                max_workers=self.settings.STT_MAX_WORKERS
+            )
+        )
+        # 프롬프트 토큰 예산 (긴 자막은 나눠서 분석, 검색 결과는 점수 순으로 예산 안에서만 사용, LLM 호출에도 적용)
+        self.token_budget = TokenBudget(
+            model=self.settings.LLM_MODEL,
+            context_size=self.settings.LLM_CONTEXT_SIZE or None,
+            max_output_tokens=self.settings.LLM_MAX_OUTPUT_TOKENS
         )
         self.base_llm = BaseLLM(
             model=self.settings.LLM_MODEL,
             api_base=self.settings.API_BASE,
+            timeout=self.settings.LLM_TIMEOUT,
+            max_retries=self.settings.LLM_MAX_RETRIES,
+            max_concurrency=self.settings.LLM_MAX_CONCURRENCY,
+            cache=SQLiteCache(
+                path=self.settings.LLM_CACHE_PATH,
+                ttl=self.settings.LLM_CACHE_TTL
+            ) if self.settings.LLM_CACHE_ENABLED else None,
+            budget=self.token_budget,
         )
         self.analyzer  = TextAnalyzer(
             llm=self.base_llm,
-            prompt_manager=self.prompt_manager
+            prompt_manager=self.prompt_manager,
+            budget=self.token_budget,
+            json_mode=self.settings.LLM_JSON_MODE,
+            max_repairs=self.settings.LLM_REPAIR_RETRIES,
+            max_claims=self.settings.MAX_CLAIMS
         )
         self.fact_check = FactCheck(
             llm=self.base_llm,
-            prompt_manager=self.prompt_manager
+            prompt_manager=self.prompt_manager,
+            budget=self.token_budget,
+            workers=self.settings.FACTCHECK_WORKERS
         )
+        # 로컬 arXiv 논문 목록 (키워드를 먼저 로컬에서 찾고 부족할 때만 arXiv API 검색)
+        self.corpus = LocalCorpus(self.settings.CORPUS_PATH) if self.settings.CORPUS_ENABLED else None
         self.data_collector = ArxivCollector(
-            arxiv_client = arxiv.Client()
+            arxiv_client = arxiv.Client(),
+            cache=PaperCache(
+                cache_dir=self.settings.PAPER_CACHE_DIR,
+                max_bytes=self.settings.PAPER_CACHE_MAX_MB * 1024 * 1024
+            ),
+            max_workers=self.settings.ARXIV_MAX_WORKERS,
+            paper_timeout=self.settings.ARXIV_PAPER_TIMEOUT,
+            extractor=PdfExtractor(
+                max_workers=self.settings.PDF_MAX_WORKERS,
+                max_pages=self.settings.PDF_MAX_PAGES,
+                max_bytes=self.settings.PDF_MAX_MB * 1024 * 1024,
+                timeout=self.settings.ARXIV_PAPER_TIMEOUT
+            ),
+            corpus=self.corpus,
+            min_local_hits=self.settings.CORPUS_MIN_HITS
         )
-        self.db_manager = VectorDB(
-            client=self.settings.qdrant_client,
-            text_processer=TextProcessor(
-                embedding_model=self.settings.embedding_model
+        text_processer = TextProcessor(
+            embedding_model=self.lazy["embedding_model"],
+            model_name=self.settings.EMBEDDING_MODEL,
+            batch_size=self.settings.EMBEDDING_BATCH_SIZE,
+            embedding_cache_size=self.settings.EMBEDDING_CACHE_SIZE,
+            sparse_encoder=SparseEncoder() if self.settings.HYBRID_SEARCH else None
+        )
+        # 벡터 저장소: Qdrant 서버 또는 프로세스 내부 로컬 인덱스 (같은 인터페이스)
+        if self.settings.VECTOR_BACKEND == "local":
+            self.db_manager = LocalVectorDB(
+                path=self.settings.LOCAL_INDEX_DIR,
+                text_processer=text_processer,
+                collection_name=self.settings.COLLECTION_NAME,
+                vector_size=self.settings.VECTOR_SIZE,
+                nlist=self.settings.LOCAL_INDEX_NLIST,
+            )
+        else:
+            self.db_manager = VectorDB(
+                client=self.lazy["qdrant_client"],
+                text_processer=text_processer,
+                collection_name=self.settings.COLLECTION_NAME,
+                vector_size=self.settings.VECTOR_SIZE,
+                profile=self.settings.COLLECTION_PROFILE,
+            )
+        # 설정한 분야의 새 논문을 미리 수집/임베딩하는 백그라운드 동기화 (__main__에서 시작)
+        self.corpus_sync = CorpusSync(
+            corpus=self.corpus,
+            collector=self.data_collector,
+            db_manager=self.db_manager,
+            categories=self.settings.CORPUS_CATEGORIES,
+            max_per_sync=self.settings.CORPUS_SYNC_MAX
+        ) if self.corpus is not None and self.settings.CORPUS_CATEGORIES else None
+        # 결과에 영향을 주는 설정(모델, 프롬프트, 검색/청킹 설정)이 바뀌면 저장된 결과를 쓰지 않도록 지문에 포함
+        self.result_store = ResultStore(
+            cache=SQLiteCache(path=self.settings.RESULT_STORE_PATH),
+            fingerprint=ResultStore.config_fingerprint(
+                llm_model=self.settings.LLM_MODEL,
+                embedding_model=self.settings.EMBEDDING_MODEL,
+                prompts=self.prompt_manager.hashes,
+                max_result=self.data_collector.max_result,
+                chunk_size=self.db_manager.text_processer.chunk_size,
+                chunk_overlap=self.db_manager.text_processer.chunk_overlap,
+                hybrid_search=self.settings.HYBRID_SEARCH,
+                vector_backend=self.settings.VECTOR_BACKEND,
+                context_size=self.settings.LLM_CONTEXT_SIZE,
+                corpus=self.settings.CORPUS_ENABLED,
+                max_claims=self.settings.MAX_CLAIMS,
             ),
-            collection_name=self.settings.COLLECTION_NAME,
-            vector_size=self.settings.VECTOR_SIZE,
+            max_age=self.settings.RESULT_MAX_AGE or None
         )
 
-    def run_pipeline(self,url:str):
+    # 모델 로딩과 무거운 import를 백그라운드 스레드에서 미리 실행
+    # 실패해도 앱은 계속 실행되고, 해당 구성 요소는 첫 요청 때 다시 불러오면서 오류가 표시됨
+    def warm_up(self) -> threading.Thread:
+        def run():
+            for name, obj in self.lazy.items():
+                try:
+                    obj.resolve()
+                except Exception:
+                    logger.warning(f"Warm-up failed for '{name}'", exc_info=True)
+            for module in WARMUP_MODULES:
+                try:
+                    __import__(module)
+                except Exception:
+                    logger.warning(f"Warm-up import failed for '{module}'", exc_info=True)
+            logger.info(f"Warm-up finished: {self.readiness()}")
+        thread = threading.Thread(target=run, name="warm-up", daemon=True)
+        thread.start()
+        return thread
+
+    # 구성 요소별 로딩 여부 (모두 로딩되면 ready=True)
+    def readiness(self) -> dict:
+        status = {name: obj.loaded for name, obj in self.lazy.items()}
+        status.update({module: module in sys.modules for module in WARMUP_MODULES})
+        status["ready"] = all(status.values())
+        return status
+
+    # 진행 상황 아래에 완료된 단계별 소요 시간을 함께 표시
+    @staticmethod
+    def format_status(message: str, timings: list) -> str:
+        return "\n".join([message] + [f"✔ {label}: {seconds:.1f}s" for label, seconds in timings])
+
+    # 다른 요청이 해당 단계의 자리를 모두 쓰고 있으면 대기 안내 문구 반환
+    @staticmethod
+    def wait_note(stage: str) -> str:
+        if not stage_limiter.busy(stage):
+            return ""
+        return f" ⏳ 다른 요청 처리 중 (대기 {stage_limiter.waiting(stage) + 1}번째)"
+
+    # 단계에서 사용한 LLM 토큰 수 (span.counters 또는 스트리밍 usage, 호출이 없었으면 빈 문자열)
+    @staticmethod
+    def token_note(counters: dict) -> str:
+        tokens_in = int(counters.get("llm_tokens_in", 0))
+        tokens_out = int(counters.get("llm_tokens_out", 0))
+        if not tokens_in and not tokens_out:
+            return ""
+        return f" (토큰 입력 {tokens_in} / 출력 {tokens_out})"
+
+    # 이전 실행에서 완료된 단계는 건너뛰었다고 표시
+    @staticmethod
+    def mark_reused(timings: list, label: str):
+        timings.append((f"{label} (저장된 결과 사용)", 0.0))
+
+    # 자막 추출을 백그라운드 스레드에서 실행하고 구간별 STT가 끝날 때마다 (구간 번호, 텍스트) 반환
+    # 마지막으로 (None, (전체 자막, 소요 시간)) 반환, 추출 중 발생한 예외는 그대로 다시 발생
+    # (span이 yield를 사이에 두지 않도록 작업 스레드 안에서 측정)
+    def iter_transcript(self, url: str):
+        updates = queue.Queue()
+        def work():
+            try:
+                with tracer.span("pipeline.transcript") as span:
+                    transcript = self.transcriber.extract_transcripts(
+                        url, on_partial=lambda index, text: updates.put((index, text))
+                    )
+                updates.put((None, (transcript, span.wall)))
+            except BaseException as e:
+                updates.put((None, e))
+        threading.Thread(target=contextvars.copy_context().run, args=(work,), name="transcript", daemon=True).start()
+        while True:
+            index, value = updates.get()
+            if index is None:
+                if isinstance(value, BaseException):
+                    raise value
+                yield None, value
+                return
+            yield index, value
+
+    # refresh=True이면 저장된 결과를 무시하고 처음부터 다시 분석
+    def run_pipeline(self,url:str,refresh: bool = False):
         if not url:
             yield "URL을 입력해주세요",""
             return
+        timings = []
+        started = time.perf_counter()
+        # 단계가 끝날 때마다 결과를 저장해 두고, 같은 영상이 다시 들어오면 완료된 단계는 건너뜀
+        video_id = YouTubeTranscriber.video_id(url)
+        store = self.result_store if video_id else None
+        record = store.load(video_id) if store and not refresh else {}
         try:
-            yield "(1/6)🔍 유튜브 -> 자막 추출", ""
-            transcript = self.transcriber.extract_transcripts(url)
+            if record.get("answer"):
+                age = time.time() - record.get("updated", time.time())
+                yield self.format_status(f"팩트체크 결과 (저장된 결과, {age / 60:.0f}분 전 분석)", timings), record["answer"]
+                return
 
-            yield "(2/6) LLM으로 영상의 주장/근거와 키워드를 분석", ""
-            claim_evidence = self.analyzer.extract_claim_evidence(transcript)
-            keywords = self.analyzer.extract_keywords(claim_evidence)
-            
-            yield "(3/6) 키워드로 관련 논문 검색", ""
-            data = self.data_collector.collect(keywords)
-            
-            yield "(4/6) 논문 데이터 청크 단위로 분할 및 임베딩", ""
-            self.db_manager.setup_qdrant()
-            self.db_manager.upload_data(data)
-            # 주장과 근거 벡터값과 가장 유사한 데이터 검색
+            if record.get("claims") and record.get("keywords"):
+                claims, keywords = record["claims"], record["keywords"]
+                self.mark_reused(timings, "(1/6) 자막 추출")
+                self.mark_reused(timings, "(2/6) 주장/근거, 키워드 분석")
+            else:
+                yield self.format_status("(1/6)🔍 유튜브 -> 자막 추출" + self.wait_note("download"), timings), ""
+                # 구간별 STT가 끝날 때마다 완료된 구간 수와 지금까지 변환된 자막을 표시
+                partials = {}
+                for index, text in self.iter_transcript(url):
+                    if index is None:
+                        transcript, wall = text
+                        break
+                    partials[index] = text
+                    preview = "\n\n".join(partials[i] for i in sorted(partials))
+                    yield (
+                        self.format_status(f"(1/6)🔍 유튜브 -> 자막 추출 (음성 인식 {len(partials)}개 구간 완료)", timings),
+                        f"**자막 미리보기**\n\n{preview}"
+                    )
+                timings.append(("(1/6) 자막 추출", wall))
 
-            yield "(5/6) 진위여부 판단을 위한 데이터 탐색", ""
-            search_results = self.db_manager.search_data(claim_evidence)
+                yield self.format_status("(2/6) LLM으로 영상의 주장/근거와 키워드를 분석" + self.wait_note("llm"), timings), ""
+                with tracer.span("pipeline.analyze") as span:
+                    claims = self.analyzer.extract_claims(transcript)
+                    keywords = self.analyzer.extract_keywords(claims)
+                timings.append((f"(2/6) 주장/근거, 키워드 분석 (주장 {len(claims)}개)" + self.token_note(span.counters), span.wall))
+                if store and claims and keywords:
+                    record.update(claims=claims, keywords=keywords)
+                    store.save(video_id, record)
 
-            yield "(6/6) 사실여부 확인중", ""
-            answer = self.fact_check.factcheck_llm(claim_evidence, search_results)
+            if "paper_ids" in record:
+                paper_ids = set(record["paper_ids"])
+                self.mark_reused(timings, "(4/6) 논문 수집, 임베딩, 업로드")
+            else:
+                yield self.format_status("(3/6) 키워드로 관련 논문 검색", timings), ""
+                with tracer.span("pipeline.setup") as span:
+                    self.db_manager.setup_qdrant()
+                timings.append(("(3/6) 컬렉션 준비", span.wall))
 
-            yield "팩트체크 결과", answer
+                yield self.format_status("(4/6) 논문 데이터 청크 단위로 분할 및 임베딩" + self.wait_note("embed"), timings), ""
+                # 논문이 수집되는 대로 바로 청킹/임베딩/업로드 (단계별로 겹쳐서 실행)
+                # 이번 요청에서 다룬 논문 id를 모아 검색 범위를 이 요청의 논문으로 제한
+                paper_ids = set()
+                with tracer.span("pipeline.index") as span:
+                    self.db_manager.upload_stream(self.data_collector.iter_collect(keywords), paper_ids=paper_ids)
+                timings.append(("(4/6) 논문 수집, 임베딩, 업로드", span.wall))
+                if store:
+                    record["paper_ids"] = sorted(paper_ids)
+                    store.save(video_id, record)
+
+            if "search_results" in record:
+                search_results = record["search_results"]
+                self.mark_reused(timings, "(5/6) 유사 데이터 검색")
+            else:
+                # 주장별로 주장과 근거 벡터값과 가장 유사한 데이터 검색 (모든 주장의 질의를 한 번의 배치로)
+                yield self.format_status("(5/6) 진위여부 판단을 위한 데이터 탐색", timings), ""
+                with tracer.span("pipeline.search", claims=len(claims)) as span:
+                    search_results = self.db_manager.search_claims(claims, paper_ids=paper_ids, keywords=keywords)
+                timings.append(("(5/6) 유사 데이터 검색", span.wall))
+                if store:
+                    record["search_results"] = search_results
+                    store.save(video_id, record)
+
+            yield self.format_status("(6/6) 사실여부 확인중" + self.wait_note("llm"), timings), ""
+            # 주장별 보고서를 동시에 생성하면서 합친 보고서를 생성되는 대로 화면에 표시
+            # 사용자가 페이지를 떠나 이 제너레이터가 닫히면 스트림도 닫혀 LLM 생성이 중단됨
+            # (yield를 사이에 둔 구간은 다른 스레드에서 이어질 수 있으므로 tracer.span 대신 직접 시간 측정)
+            usage, stage_started, answer = {}, time.perf_counter(), ""
+            with closing(self.fact_check.factcheck_claims_stream(claims, search_results, usage=usage)) as stream:
+                for answer in stream:
+                    yield self.format_status("(6/6) 사실여부 확인중 (보고서 작성 중)", timings), answer
+            timings.append(("(6/6) 사실여부 확인" + self.token_note(usage), time.perf_counter() - stage_started))
+            if store and answer:
+                record["answer"] = answer
+                store.save(video_id, record)
+
+            total = time.perf_counter() - started
+            yield self.format_status(f"팩트체크 결과 (총 {total:.1f}s)", timings), answer
 
         except Exception as e:
-            yield "❌ 오류 발생: " + str(e), ""
+            yield self.format_status("❌ 오류 발생: " + str(e), timings), ""
+
+    # 프로세스 전체에 적용되는 설정 (UI와 batch.py가 같이 사용)
+    def configure_runtime(self):
+        # 단계별 소요 시간을 JSON-lines로 기록
+        tracer.configure(export_path=self.settings.TRACE_EXPORT_PATH)
+        # 모든 요청이 공유하는 단계별 동시 작업 수 제한
+        stage_limiter.configure({
+            "download": self.settings.DOWNLOAD_CONCURRENCY,
+            "embed": self.settings.EMBED_CONCURRENCY,
+            "llm": self.settings.LLM_MAX_CONCURRENCY,
+        })
 
     # Gradio UI 구성
     def launch_ui(self):
+        # gradio는 import가 느리므로 UI를 띄울 때 불러옴
+        import gradio as gr
+        from gradio.components import Textbox,Markdown
         with gr.Blocks(theme=gr.themes.Soft()) as demo:
             gr.Markdown("# 🕵️ LiteLLM(OLlama)와 Qdrant로 구현한 유튜브 영상 팩트체크 파이프라인")
             gr.Markdown("유튜브 URL을 입력하면, OLlama가 영상 내용을 분석하고 관련 논문을 찾아 사실 여부를 검증합니다.")
@@ -83,7 +353,10 @@ class App():
             with gr.Row():
                 url_input = Textbox(label="분석할 유튜브 URL", placeholder="http://googleusercontent.com/youtube.com/...")
 
-            submit_button = gr.Button("검증 시작", variant="primary")
+            refresh_input = gr.Checkbox(label="저장된 결과를 무시하고 다시 분석", value=False)
+            with gr.Row():
+                submit_button = gr.Button("검증 시작", variant="primary")
+                stop_button = gr.Button("중지", variant="stop")
             
             gr.Markdown("---")
             
@@ -94,11 +367,19 @@ class App():
             result_output = Markdown(label="최종 검증 결과")
 
             # 버튼 클릭 이벤트 연결
-            submit_button.click(
+            run_event = submit_button.click(
                 fn=self.run_pipeline,
-                inputs=url_input,
+                inputs=[url_input, refresh_input],
                 outputs=[status_output, result_output]
             )
+            # 진행 중인 분석 중지 (보고서 생성 중이면 LLM 스트림도 닫힘)
+            stop_button.click(fn=None, cancels=[run_event])
+        # 요청을 대기열에 넣고 UI_CONCURRENCY개씩 처리 (대기 순번은 Gradio가 화면에 표시)
+        # 대기열이 가득 차면 새 요청은 바로 거절하여 서버가 밀린 요청으로 과부하되지 않도록 함
+        demo.queue(
+            default_concurrency_limit=self.settings.UI_CONCURRENCY,
+            max_size=self.settings.UI_QUEUE_SIZE
+        )
         demo.launch(share=True)
 
 # Gradio 앱 실행
@@ -106,4 +387,12 @@ if __name__ == "__main__":
     setup_logger()  # 로거 설정
     # 앱 인스턴스 생성 및 실행
     app = App()
+    app.configure_runtime()
+    if app.settings.WARMUP_ON_START:
+        app.warm_up()
+    if app.corpus_sync:
+        app.corpus_sync.start(app.settings.CORPUS_SYNC_INTERVAL)
+    # /metrics와 함께 /ready 경로로 구성 요소 로딩 상태 제공
+    if app.settings.METRICS_PORT:
+        tracer.serve_metrics(app.settings.METRICS_PORT, readiness=app.readiness)
     app.launch_ui()
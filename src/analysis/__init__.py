@@ -1,3 +1,5 @@
 from .analyzer import TextAnalyzer
 from .factcheck import FactCheck
-from .base_llm import BaseLLM
\ No newline at end of file
+from .base_llm import BaseLLM
+from .token_budget import TokenBudget
+from .structured import StructuredOutputError
@@ -1,53 +1,188 @@
+import asyncio
+import json
 import logging
 # LiteLLM의 LLM 호출 구조 상속 받음
 from .base_llm import BaseLLM
-import json
-# keyword가 llm의 답변으로써 문자열로 반환되기 때문에 리스트 변환과정이 필요함
-import ast
+from .token_budget import TokenBudget
+# LLM 답변에서 JSON을 찾아 스키마로 검증하고, 형식이 틀린 호출만 다시 요청
+from .structured import (
+    StructuredCaller, StructuredOutputError,
+    CLAIMS_SCHEMA, KEYWORDS_SCHEMA
+)
 
 # 로거 인스턴스 생성
 logger = logging.getLogger(__name__)
 
 # BaseLLM 을 상속받아 주장,근거,키워드 추출을 위한 LLM 인스턴스 생성
 class TextAnalyzer:
-    def __init__(self,llm:BaseLLM,prompt_manager):
+    # budget: 프롬프트 토큰 예산 (None이면 자막을 나누지 않고 그대로 사용)
+    # json_mode: 출력 형식 제한 방식 (schema | json | off), max_repairs: 형식이 틀린 응답의 재요청 횟수
+    # max_claims: 영상 하나에서 추출할 최대 주장 수 (주장마다 따로 검색/팩트체크)
+    def __init__(self,llm:BaseLLM,prompt_manager,budget: TokenBudget | None = None,
+                 json_mode: str = "schema",max_repairs: int = 2,max_claims: int = 3):
         self.llm = llm # 상속을 여기서 받는게 아니라 BaseLLM 객체를 전달받기
         self.prompt_manager = prompt_manager
-    # 주장과 근거 추출 함수
-    def extract_claim_evidence(self,transcript:str) -> dict: 
+        self.budget = budget
+        self.max_claims = max_claims
+        self.structured = StructuredCaller(llm, mode=json_mode, max_repairs=max_repairs)
+
+    # 주장과 근거 추출 함수 -> [{"claim": ..., "evidence": [...]}, ...] (중요한 주장부터 최대 max_claims개)
+    # 자막이 토큰 예산을 넘으면 구간별로 나눠 동시에 추출(map)한 뒤 하나로 합침(reduce)
+    # 형식이 틀린 응답은 해당 호출만 다시 요청하고, 재요청 후에도 틀리면 StructuredOutputError
+    def extract_claims(self,transcript:str) -> list[dict]:
+        pieces = self.transcript_pieces(transcript)
+        if len(pieces) == 1:
+            return self._claims(self.structured.call(
+                self.claim_evidence_messages(transcript), CLAIMS_SCHEMA, "claims",
+                template_hash=self.prompt_manager.prompt_hash("claim_evidence"),
+                normalize=self.normalize_claims
+            ))
+        partials = self._partials(asyncio.run(self._map_pieces(pieces)))
+        if len(partials) == 1:
+            return partials[0]
+        return self._claims(self.structured.call(
+            self.reduce_messages(partials), CLAIMS_SCHEMA, "claims",
+            template_hash=self.prompt_manager.prompt_hash("claim_evidence_reduce"),
+            normalize=self.normalize_claims
+        ))
+
+    async def aextract_claims(self,transcript:str) -> list[dict]:
+        pieces = self.transcript_pieces(transcript)
+        if len(pieces) == 1:
+            return self._claims(await self.structured.acall(
+                self.claim_evidence_messages(transcript), CLAIMS_SCHEMA, "claims",
+                template_hash=self.prompt_manager.prompt_hash("claim_evidence"),
+                normalize=self.normalize_claims
+            ))
+        partials = self._partials(await self._map_pieces(pieces))
+        if len(partials) == 1:
+            return partials[0]
+        return self._claims(await self.structured.acall(
+            self.reduce_messages(partials), CLAIMS_SCHEMA, "claims",
+            template_hash=self.prompt_manager.prompt_hash("claim_evidence_reduce"),
+            normalize=self.normalize_claims
+        ))
+
+    # 구간별 추출을 동시에 실행 (한 구간이 실패해도 나머지 결과는 유지)
+    async def _map_pieces(self, pieces: list[str]) -> list:
+        template_hash = self.prompt_manager.prompt_hash("claim_evidence")
+        return await asyncio.gather(
+            *(self.structured.acall(self.claim_evidence_messages(piece), CLAIMS_SCHEMA, "claims",
+                                    template_hash=template_hash, normalize=self.normalize_claims)
+              for piece in pieces),
+            return_exceptions=True
+        )
+
+    # 구간별 결과 -> 구간별 주장 목록 (형식 오류로 실패한 구간은 제외)
+    def _partials(self, results: list) -> list[list[dict]]:
+        partials = []
+        for i, result in enumerate(results):
+            if isinstance(result, StructuredOutputError):
+                logger.warning(f"Skipping transcript piece {i + 1}/{len(results)}: {result}")
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                partials.append(self._claims(result))
+        if not partials:
+            raise StructuredOutputError("모든 자막 구간에서 주장/근거를 추출하지 못했습니다")
+        return partials
+
+    # 같은 주장(공백/대소문자 무시)은 하나만 남기고 max_claims개까지 사용
+    def _claims(self, value: dict) -> list[dict]:
+        claims, seen = [], set()
+        for item in value["claims"]:
+            key = " ".join(item["claim"].split()).lower()
+            if key in seen:
+                continue
+            seen.add(key)
+            claims.append({"claim": item["claim"].strip(), "evidence": [e.strip() for e in item["evidence"]]})
+        if len(claims) > self.max_claims:
+            logger.info(f"Keeping the first {self.max_claims} of {len(claims)} extracted claims.")
+        return claims[:self.max_claims]
+
+    # 모델이 주장 하나({"claim", "evidence"})나 목록만 답해도 {"claims": [...]}로 받아들임
+    @staticmethod
+    def normalize_claims(value):
+        if isinstance(value, list):
+            return {"claims": value}
+        if isinstance(value, dict) and "claims" not in value and "claim" in value:
+            return {"claims": [value]}
+        return value
+
+    # 프롬프트 나머지 부분을 뺀 토큰 예산에 맞게 자막을 나눔 (예산 안에 들어가면 그대로 1개)
+    def transcript_pieces(self, transcript: str) -> list[str]:
+        if self.budget is None:
+            return [transcript]
+        if self.budget.fits(self.claim_evidence_messages(transcript)):
+            return [transcript]
+        available = self.budget.input_limit - self.budget.count_messages(self.claim_evidence_messages(""))
+        return self.budget.split_text(transcript, available)
+
+    # 구간별 주장 목록 -> 하나로 합치는 프롬프트 (예산을 넘으면 뒤쪽 구간부터 제외)
+    def reduce_messages(self, partials: list[list[dict]]) -> list[dict]:
+        prompt = self.prompt_manager.get_prompt("claim_evidence_reduce")
+        while True:
+            messages = [
+                {"role": "system","content": prompt["prompts"]["system"]},
+                {"role": "user","content": prompt["prompts"]["user"].format(
+                    partials=json.dumps(partials, ensure_ascii=False, indent=1),
+                    max_claims=self.max_claims
+                )}
+            ]
+            if self.budget is None or len(partials) <= 1 or self.budget.fits(messages):
+                return messages
+            logger.warning(f"Reduce prompt exceeds token budget. Dropping the last of {len(partials)} partial results.")
+            partials = partials[:-1]
+
+    def claim_evidence_messages(self,transcript:str) -> list[dict]:
         prompt = self.prompt_manager.get_prompt("claim_evidence")
-        
-        messages = [
+        return [
             {"role": "system","content": prompt["prompts"]["system"]},
-            {"role": "user","content": prompt["prompts"]["user"].format(transcript=transcript)}
+            {"role": "user","content": prompt["prompts"]["user"].format(transcript=transcript, max_claims=self.max_claims)}
         ]
 
-        response = self.llm.llm_call(messages)
-        logger.debug(f"LLM response for claim/evidence: {response}")
-        try:
-            return json.loads(response)
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse JSON from LLM response. Response was: {response}", exc_info=True)
-
     # 키워드 추출 함수
-    def extract_keywords(self, claim_evidence: dict) -> list[str]:
+    # 모든 주장에서 한 번에 추출 (논문은 영상 단위로 한 번만 수집)
+    def extract_keywords(self, claims: list[dict]) -> list[str]:
+        value = self.structured.call(
+            self.keywords_messages(claims), KEYWORDS_SCHEMA, "keywords",
+            template_hash=self.prompt_manager.prompt_hash("keywords"),
+            normalize=self.normalize_keywords
+        )
+        return self.clean_keywords(value["keywords"])
+
+    async def aextract_keywords(self, claims: list[dict]) -> list[str]:
+        value = await self.structured.acall(
+            self.keywords_messages(claims), KEYWORDS_SCHEMA, "keywords",
+            template_hash=self.prompt_manager.prompt_hash("keywords"),
+            normalize=self.normalize_keywords
+        )
+        return self.clean_keywords(value["keywords"])
+
+    def keywords_messages(self, claims: list[dict]) -> list[dict]:
         prompt = self.prompt_manager.get_prompt("keywords")
-        claim = claim_evidence.get("claim","")
-        evidence = claim_evidence.get("evidence",[]) 
-        # 주장과 근거를 하나의 문자열로 결합
-        combined_text = claim + "\n" + " ".join(evidence) 
-        messages = [
+        # 주장별로 주장과 근거를 하나의 문자열로 결합
+        combined_text = "\n\n".join(
+            f"{i}. " + c.get("claim","") + "\n" + " ".join(c.get("evidence",[]))
+            for i, c in enumerate(claims, start=1)
+        )
+        return [
             {"role": "system","content": prompt["prompts"]["system"]},
             {"role": "user","content": prompt["prompts"]["user"].format(combined_text=combined_text)}
         ]
-        try:
-            response = self.llm.llm_call(messages)
-            logger.debug(f"LLM response for keywords: {response}")
-            keyword_list = ast.literal_eval(response)
-            if isinstance(keyword_list,list):
-                return keyword_list
-            else:
-                return []
-        except (ValueError, SyntaxError) as e:
-            logger.error(f"Failed to parse list from LLM response. Response was: {response}", exc_info=True)
-            return []
\ No newline at end of file
+
+    # 모델이 목록(["a", "b"])만 답해도 {"keywords": [...]}로 받아들임
+    @staticmethod
+    def normalize_keywords(value):
+        return {"keywords": value} if isinstance(value, list) else value
+
+    # 앞뒤 공백 제거, 대소문자 무시 중복 제거 (순서 유지)
+    @staticmethod
+    def clean_keywords(keywords: list[str]) -> list[str]:
+        cleaned, seen = [], set()
+        for keyword in keywords:
+            keyword = keyword.strip()
+            if keyword.lower() not in seen:
+                seen.add(keyword.lower())
+                cleaned.append(keyword)
+        return cleaned
@@ -1,27 +1,275 @@
-# LiteLLM 라이브러리, 모델 호출 함수 
-from litellm import completion
+from src.utils.cache import SQLiteCache
+from src.utils.tracing import tracer
+from src.utils.concurrency import stage_limiter
+from .token_budget import TokenBudget
+import asyncio
+import functools
+import hashlib
+import json
+import random
+import threading
+import time
 import logging
+from typing import Iterator
 
 logger = logging.getLogger(__name__)
 
+# 재시도하면 성공할 수 있는 오류 (연결 실패, 시간 초과, 서버 과부하)
+# LiteLLM은 import에만 수 초가 걸리므로 모듈 로딩 시점이 아니라 처음 호출할 때 불러옴
+@functools.lru_cache(maxsize=None)
+def retryable_errors() -> tuple:
+    import litellm
+    return (
+        litellm.Timeout,
+        litellm.APIConnectionError,
+        litellm.RateLimitError,
+        litellm.ServiceUnavailableError,
+        litellm.InternalServerError,
+    )
+
 # LiteLLM의 Ollama LLM 인스턴스 생성
 class BaseLLM:
-    def __init__(self,model,api_base):
+    def __init__(self,model,api_base,timeout: float = 120.0,max_retries: int = 3,
+                 backoff_base: float = 1.0,backoff_max: float = 20.0,max_concurrency: int = 4,
+                 cache: SQLiteCache | None = None,budget: TokenBudget | None = None):
         self.model = model
         self.api_base = api_base
+        # 호출 1회 제한 시간(초)과 재시도 설정
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        # 동시에 보낼 수 있는 최대 요청 수
+        self.max_concurrency = max_concurrency
+        # LLM 응답 캐시 (None이면 캐시 사용 안 함)
+        self.cache = cache
+        # 프롬프트 토큰 예산 (출력 토큰 수와 Ollama 컨텍스트 크기를 모델 호출에도 적용, None이면 모델 기본값)
+        self.budget = budget
+        # 비동기 호출은 전용 이벤트 루프 스레드에서 실행 -> 세마포어와 litellm의 연결을 하나의 루프에서 재사용
+        self._loop = None
+        self._semaphore = None
+        self._loop_lock = threading.Lock()
         logger.debug(f"BaseLLM initialized with model: {self.model}")
-    # LiteLLM의 completion 함수(여러 모델을 일관성 있게 가져옴) 호출  
-    def llm_call(self,messages):
 
+    # 재시도 대기 시간: 지수 백오프 + full jitter
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _params(self, messages, **kwargs) -> dict:
+        return dict(
+            model=self.model,
+            messages=messages,
+            api_base=self.api_base,
+            timeout=self.timeout,
+            **{**self._limit_params(), **kwargs}
+        )
+
+    # 토큰 예산을 실제 호출에도 적용: 출력은 max_tokens까지 (Ollama는 num_predict로 변환됨)
+    # Ollama는 num_ctx를 보내지 않으면 서버 기본 컨텍스트에서 프롬프트를 자르므로 예산의 컨텍스트 크기를 num_ctx로 전달
+    def _limit_params(self) -> dict:
+        if self.budget is None:
+            return {}
+        params = {"max_tokens": self.budget.max_output_tokens}
+        if self.model and self.model.split("/")[0] in ("ollama", "ollama_chat"):
+            params["num_ctx"] = self.budget.context_size
+        return params
+
+    # 응답의 토큰 사용량을 호출마다 로그로 남기고 트레이싱 카운터에 기록 (입력, 출력 토큰 수 반환)
+    def _record_usage(self, response) -> tuple[int, int]:
+        usage = getattr(response, "usage", None)
+        if not usage:
+            return 0, 0
+        tokens_in = getattr(usage, "prompt_tokens", 0) or 0
+        tokens_out = getattr(usage, "completion_tokens", 0) or 0
+        tracer.add("llm_tokens_in", tokens_in)
+        tracer.add("llm_tokens_out", tokens_out)
+        logger.info(f"LLM call ({self.model}) tokens in={tokens_in} out={tokens_out}")
+        return tokens_in, tokens_out
 
+    # 캐시 키: 모델 + 프롬프트 템플릿 해시 + 실제 메시지 + 호출 옵션
+    def cache_key(self, messages, template_hash: str | None = None, **kwargs) -> str:
+        payload = json.dumps(
+            {"model": self.model, "template": template_hash, "messages": messages, "params": {**self._limit_params(), **kwargs}},
+            sort_keys=True, ensure_ascii=False, default=str
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
 
+    def _cache_lookup(self, messages, template_hash, use_cache, **kwargs):
+        if self.cache is None or not use_cache:
+            return None, None
+        key = self.cache_key(messages, template_hash, **kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            logger.debug(f"LLM cache hit for model: {self.model}")
+        return key, cached
+
+    # LiteLLM의 completion 함수(여러 모델을 일관성 있게 가져옴) 호출
+    # template_hash: 프롬프트 템플릿 해시 (캐시 키에 포함), use_cache=False 이면 캐시를 건너뛰고 새로 호출
+    def llm_call(self,messages,template_hash: str | None = None,use_cache: bool = True,**kwargs) -> str:
+        key, cached = self._cache_lookup(messages, template_hash, use_cache, **kwargs)
+        if cached is not None:
+            return cached
+        response = self._completion(messages, **kwargs)
+        if key and response:
+            self.cache.set(key, response)
+        return response
+
+    def _completion(self,messages,**kwargs) -> str:
+        # LiteLLM 라이브러리, 모델 호출 함수
+        from litellm import completion
+        for attempt in range(self.max_retries + 1):
+            try:
+                # 여러 요청이 동시에 들어와도 LLM 서버로 가는 동기 호출 수는 "llm" 한도로 제한
+                with stage_limiter.slot("llm"), tracer.span("llm.call", model=self.model):
+                    response = completion(**self._params(messages, **kwargs))
+                    self._record_usage(response)
+                return response.choices[0].message.content
+            except retryable_errors() as e:
+                if attempt == self.max_retries:
+                    logger.error(f"LLM call failed for model: {self.model} after {attempt + 1} attempts", exc_info=True)
+                    raise RuntimeError(f"LLM 호출 실패: {e}")
+                delay = self._backoff(attempt)
+                logger.warning(f"LLM call failed ({type(e).__name__}). Retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+            except Exception as e:
+                logger.error(f"LLM call failed for model: {self.model}", exc_info=True)
+                raise RuntimeError(f"LLM 호출 실패: {e}")
+
+    # 스트리밍 호출: 답변이 생성되는 대로 조각(delta)을 반환
+    # - 첫 조각을 받기 전까지만 재시도 (이미 화면에 보낸 내용을 다시 보낼 수 없으므로)
+    # - 호출한 쪽이 중간에 멈추면(GeneratorExit) HTTP 스트림을 닫아 Ollama가 생성을 멈추도록 함
+    # - usage dict를 넘기면 완료 후 llm_tokens_in/llm_tokens_out을 채움
+    # - 캐시에 있으면 전체 답변을 한 번에 반환하고, 끝까지 받은 답변만 캐시에 저장
+    def llm_stream(self,messages,template_hash: str | None = None,use_cache: bool = True,
+                   usage: dict | None = None,**kwargs) -> Iterator[str]:
+        key, cached = self._cache_lookup(messages, template_hash, use_cache, **kwargs)
+        if cached is not None:
+            yield cached
+            return
+        from litellm import stream_chunk_builder
+        started = time.perf_counter()
+        parts = []
+        # 스트림이 열려 있는 동안 "llm" 자리를 차지 (세마포어라서 다른 스레드에서 이어서 읽어도 됨)
+        with stage_limiter.slot("llm"):
+            stream, chunk = self._open_stream(messages, **kwargs)
+            chunks = [chunk]
+            try:
+                while chunk is not None:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        parts.append(delta)
+                        yield delta
+                    chunk = next(stream, None)
+                    if chunk is not None:
+                        chunks.append(chunk)
+            except Exception as e:
+                logger.error(f"LLM stream failed for model: {self.model}", exc_info=True)
+                raise RuntimeError(f"LLM 호출 실패: {e}")
+            finally:
+                self._close_stream(stream)
+        response = "".join(parts)
+        logger.info(f"LLM stream ({self.model}) finished in {time.perf_counter() - started:.1f}s, {len(chunks)} chunks")
+        # 스트림 조각을 하나의 응답으로 합쳐 토큰 사용량 계산 (서버가 사용량을 보내지 않으면 litellm이 직접 셈)
         try:
-            response = completion(
-                model=self.model,
-                messages=messages,
-                api_base=self.api_base
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            logger.error(f"LLM call failed for model: {self.model}", exc_info=True)
-    
+            tokens_in, tokens_out = self._record_usage(stream_chunk_builder(chunks, messages=messages))
+        except Exception:
+            logger.debug("Could not compute token usage for stream.", exc_info=True)
+            tokens_in, tokens_out = 0, 0
+        if usage is not None:
+            usage["llm_tokens_in"] = usage.get("llm_tokens_in", 0) + tokens_in
+            usage["llm_tokens_out"] = usage.get("llm_tokens_out", 0) + tokens_out
+        if key and response:
+            self.cache.set(key, response)
+
+    # 스트림을 열고 첫 조각까지 받음 (Ollama는 첫 조각을 읽을 때 실제 요청이 나가므로 여기까지 재시도)
+    def _open_stream(self, messages, **kwargs):
+        from litellm import completion
+        for attempt in range(self.max_retries + 1):
+            stream = None
+            try:
+                # 첫 토큰까지 걸린 시간(time to first token)
+                with tracer.span("llm.first_token", model=self.model):
+                    stream = completion(**self._params(messages, stream=True, **kwargs))
+                    return stream, next(iter(stream), None)
+            except retryable_errors() as e:
+                self._close_stream(stream)
+                if attempt == self.max_retries:
+                    logger.error(f"LLM call failed for model: {self.model} after {attempt + 1} attempts", exc_info=True)
+                    raise RuntimeError(f"LLM 호출 실패: {e}")
+                delay = self._backoff(attempt)
+                logger.warning(f"LLM call failed ({type(e).__name__}). Retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                time.sleep(delay)
+            except Exception as e:
+                self._close_stream(stream)
+                logger.error(f"LLM call failed for model: {self.model}", exc_info=True)
+                raise RuntimeError(f"LLM 호출 실패: {e}")
+
+    # litellm 스트림 래퍼 안의 실제 HTTP 스트림을 닫음 (연결이 끊기면 Ollama는 생성을 중단함)
+    @staticmethod
+    def _close_stream(stream):
+        if stream is None:
+            return
+        for target in (getattr(stream, "completion_stream", None), stream):
+            close = getattr(target, "close", None)
+            if callable(close):
+                try:
+                    close()
+                except Exception:
+                    logger.debug("Failed to close LLM stream.", exc_info=True)
+                return
+
+    # 전용 이벤트 루프를 처음 필요할 때 생성
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._loop_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-loop", daemon=True).start()
+                asyncio.run_coroutine_threadsafe(self._init_loop_state(), loop).result()
+                self._loop = loop
+        return self._loop
+
+    # 세마포어는 이 인스턴스의 루프에 묶이므로 루프 안에서 생성
+    # HTTP 연결은 litellm이 내부에서 재사용하므로 프로세스 전역 litellm.aclient_session은 바꾸지 않음
+    # (전역 클라이언트는 처음 만든 루프에 묶여 다른 BaseLLM 인스턴스나 다른 litellm 비동기 호출과 충돌함)
+    async def _init_loop_state(self):
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    # 인스턴스 세마포어와 함께 프로세스 전체의 "llm" 자리도 차지 (다른 요청의 동기/스트리밍 호출과 같은 한도)
+    async def _acall(self, messages, **kwargs) -> str:
+        from litellm import acompletion
+        async with self._semaphore, stage_limiter.aslot("llm"):
+            for attempt in range(self.max_retries + 1):
+                try:
+                    with tracer.span("llm.acall", model=self.model):
+                        response = await acompletion(**self._params(messages, **kwargs))
+                        self._record_usage(response)
+                    return response.choices[0].message.content
+                except retryable_errors() as e:
+                    if attempt == self.max_retries:
+                        logger.error(f"LLM call failed for model: {self.model} after {attempt + 1} attempts", exc_info=True)
+                        raise RuntimeError(f"LLM 호출 실패: {e}")
+                    delay = self._backoff(attempt)
+                    logger.warning(f"LLM call failed ({type(e).__name__}). Retrying in {delay:.1f}s ({attempt + 1}/{self.max_retries})")
+                    await asyncio.sleep(delay)
+                except Exception as e:
+                    logger.error(f"LLM call failed for model: {self.model}", exc_info=True)
+                    raise RuntimeError(f"LLM 호출 실패: {e}")
+
+    # 비동기 호출: 어느 이벤트 루프에서 await 해도 실제 요청은 전용 루프에서 실행됨
+    async def acall(self, messages, template_hash: str | None = None, use_cache: bool = True, **kwargs) -> str:
+        key, cached = self._cache_lookup(messages, template_hash, use_cache, **kwargs)
+        if cached is not None:
+            return cached
+        future = asyncio.run_coroutine_threadsafe(self._acall(messages, **kwargs), self._ensure_loop())
+        response = await asyncio.wrap_future(future)
+        if key and response:
+            self.cache.set(key, response)
+        return response
+
+    # 여러 요청을 동시에 보내고 입력 순서대로 결과 반환 (동시 요청 수는 max_concurrency로 제한)
+    async def abatch(self, messages_list, **kwargs) -> list[str]:
+        return await asyncio.gather(*(self.acall(messages, **kwargs) for messages in messages_list))
+
+    # 동기 코드에서 사용할 수 있는 batch 호출
+    def batch(self, messages_list, **kwargs) -> list[str]:
+        return asyncio.run(self.abatch(messages_list, **kwargs))
@@ -1,27 +1,234 @@
-# LiteLLM 라이브러리, 모델 호출 함수 
-from litellm import completion
+import contextvars
 import logging
+import queue
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Iterator
+from .base_llm import BaseLLM
+from .token_budget import TokenBudget, trim_overlaps
 
 logger = logging.getLogger(__name__)
 
-# LiteLLM의 Ollama LLM 인스턴스 생성
-class BaseLLM:
-    def __init__(self,model,api_base):
-        self.model = model
-        self.api_base = api_base
-        logger.debug(f"BaseLLM initialized with model: {self.model}")
-    # LiteLLM의 completion 함수(여러 모델을 일관성 있게 가져옴) 호출  
-    def llm_call(self,messages):
+# 보고서의 "**판정**: **`대체로 사실`**", "**신뢰도**: **`보통`**" 부분
+VERDICT_PATTERN = re.compile(r"\*\*판정\*\*\s*:\s*[*`\s]*([^*`\n]+)")
+CONFIDENCE_PATTERN = re.compile(r"\*\*신뢰도\*\*\s*:\s*[*`\s]*([^*`\n]+)")
 
+# 검색된 논문 청크를 근거로 주장/근거의 사실 여부를 판단하는 LLM 인스턴스
+class FactCheck:
+    # budget: 프롬프트 토큰 예산 (None이면 검색 결과를 모두 사용)
+    # workers: 주장 여러 개를 동시에 확인할 최대 수 (LLM 동시 요청 수는 BaseLLM/stage_limiter가 따로 제한)
+    def __init__(self,llm:BaseLLM,prompt_manager,budget: TokenBudget | None = None,workers: int = 3):
+        self.llm = llm
+        self.prompt_manager = prompt_manager
+        self.budget = budget
+        self.workers = workers
 
+    # 주장과 근거 dict -> 프롬프트에 넣을 문자열
+    @staticmethod
+    def format_claim_evidence(claim_evidence: dict) -> str:
+        claim = claim_evidence.get("claim","")
+        evidence = claim_evidence.get("evidence",[])
+        evidence_text = "\n".join(f"- {e}" for e in evidence)
+        return f"주장: {claim}\n근거:\n{evidence_text}"
 
+    # 검색 결과 -> [id] 제목 (p.페이지, 절) 청크 형식의 참고 자료 문자열 (보고서에서 [id]로 인용할 수 있도록)
+    @staticmethod
+    def format_search_results(search_results: list) -> str:
+        return "\n\n".join(
+            f"[{r.get('id')}]{' ' + r['title'] if r.get('title') else ''}{FactCheck.format_location(r)}\n{r.get('chunk_text','')}"
+            for r in search_results
+        )
+
+    # 청크의 페이지와 절 정보 (이전 청킹 방식의 결과에는 없음)
+    @staticmethod
+    def format_location(result: dict) -> str:
+        parts = []
+        if result.get("page"):
+            parts.append(f"p.{result['page']}")
+        if result.get("section"):
+            parts.append(result["section"])
+        return f" ({', '.join(parts)})" if parts else ""
+
+    def _messages(self, ce_text: str, data_text: str) -> list[dict]:
+        prompt = self.prompt_manager.get_prompt("fact_check")
+        return [
+            {"role": "system","content": prompt["prompts"]["system"]},
+            {"role": "user","content": prompt["prompts"]["user"].format(ce=ce_text, data=data_text)}
+        ]
+
+    # 검색 결과를 점수가 높은 순으로 토큰 예산 안에 들어가는 만큼만 선택 (겹치는 청크는 먼저 정리)
+    def pack_results(self, claim_evidence: dict, search_results: list) -> list:
+        ordered = sorted(search_results, key=lambda r: r.get("score") or 0, reverse=True)
+        results = trim_overlaps(ordered)
+        if self.budget is None:
+            return results
+        available = self.budget.input_limit - self.budget.count_messages(
+            self._messages(self.format_claim_evidence(claim_evidence), "")
+        )
+        packed, used = [], 0
+        for result in results:
+            # 결과 사이의 빈 줄까지 포함한 토큰 수
+            tokens = self.budget.count(self.format_search_results([result])) + 2
+            if used + tokens > available:
+                continue
+            packed.append(result)
+            used += tokens
+        if len(packed) < len(results):
+            logger.info(f"Packed {len(packed)}/{len(results)} search results into {used}/{available} prompt tokens.")
+        return packed
+
+    def build_messages(self, claim_evidence: dict, search_results: list) -> list[dict]:
+        return self._messages(
+            self.format_claim_evidence(claim_evidence),
+            self.format_search_results(self.pack_results(claim_evidence, search_results))
+        )
+
+    # 사실 여부 검증 보고서 생성
+    def factcheck_llm(self, claim_evidence: dict, search_results: list) -> str:
+        if not search_results:
+            logger.warning("No search results to fact-check against.")
+        response = self.llm.llm_call(
+            self.build_messages(claim_evidence, search_results),
+            template_hash=self.prompt_manager.prompt_hash("fact_check")
+        )
+        logger.debug(f"LLM response for fact-check: {response}")
+        return response
+
+    # 보고서를 생성되는 대로 반환 (지금까지 생성된 전체 Markdown)
+    # 토큰마다 화면을 갱신하지 않도록 min_interval초마다 한 번씩 반환하고, 마지막에는 항상 전체 보고서 반환
+    def factcheck_stream(self, claim_evidence: dict, search_results: list, usage: dict | None = None,
+                         min_interval: float = 0.1) -> Iterator[str]:
+        if not search_results:
+            logger.warning("No search results to fact-check against.")
+        answer, last = "", 0.0
+        with closing(self.llm.llm_stream(
+            self.build_messages(claim_evidence, search_results),
+            template_hash=self.prompt_manager.prompt_hash("fact_check"),
+            usage=usage
+        )) as stream:
+            for delta in stream:
+                answer += delta
+                now = time.perf_counter()
+                if now - last >= min_interval:
+                    last = now
+                    yield answer
+        logger.debug(f"LLM response for fact-check: {answer}")
+        yield answer
+
+    async def afactcheck_llm(self, claim_evidence: dict, search_results: list) -> str:
+        response = await self.llm.acall(
+            self.build_messages(claim_evidence, search_results),
+            template_hash=self.prompt_manager.prompt_hash("fact_check")
+        )
+        logger.debug(f"LLM response for fact-check: {response}")
+        return response
+
+    # 주장별 보고서를 동시에 생성해 하나의 보고서로 합침 (전체 시간 = 가장 오래 걸린 주장의 시간)
+    # 일부 주장만 실패하면 그 주장은 "오류"로 표시하고 나머지 보고서는 유지 (모두 실패하면 예외 전달)
+    def factcheck_claims(self, claims: list[dict], results_per_claim: list[list]) -> str:
+        if len(claims) == 1:
+            return self.factcheck_llm(claims[0], results_per_claim[0])
+        with ThreadPoolExecutor(min(self.workers, len(claims)), thread_name_prefix="factcheck") as pool:
+            # 트레이싱 span을 이어받도록 호출한 쪽의 컨텍스트에서 실행
+            futures = [
+                pool.submit(contextvars.copy_context().run, self.factcheck_llm, claim, results)
+                for claim, results in zip(claims, results_per_claim)
+            ]
+            reports, errors = [None] * len(claims), [None] * len(claims)
+            for i, future in enumerate(futures):
+                try:
+                    reports[i] = future.result()
+                except Exception as e:
+                    logger.error(f"Fact-check failed for claim {i + 1}/{len(claims)}", exc_info=True)
+                    errors[i] = e
+        self._raise_if_all_failed(errors)
+        return self.merge_reports(claims, reports, errors)
+
+    # 주장별 보고서를 동시에 스트리밍하면서 지금까지 생성된 부분을 합친 보고서를 반환
+    # 호출한 쪽이 중간에 멈추면 남은 주장의 스트림도 닫아 LLM 생성을 중단
+    # 실패한 주장은 "오류"로 표시하고 나머지 주장은 계속 생성 (모두 실패하면 예외 전달)
+    # usage: 모든 주장의 토큰 사용량 합계를 채움
+    def factcheck_claims_stream(self, claims: list[dict], results_per_claim: list[list], usage: dict | None = None,
+                                min_interval: float = 0.1) -> Iterator[str]:
+        if len(claims) == 1:
+            yield from self.factcheck_stream(claims[0], results_per_claim[0], usage=usage, min_interval=min_interval)
+            return
+        reports, errors = [None] * len(claims), [None] * len(claims)
+        usages = [{} for _ in claims]
+        updates, stop = queue.Queue(), threading.Event()
+
+        def work(i: int):
+            try:
+                with closing(self.factcheck_stream(claims[i], results_per_claim[i], usage=usages[i], min_interval=min_interval)) as stream:
+                    for report in stream:
+                        if stop.is_set():
+                            return
+                        reports[i] = report
+                        updates.put(None)
+            except Exception as e:
+                logger.error(f"Fact-check failed for claim {i + 1}/{len(claims)}", exc_info=True)
+                errors[i] = e
+            finally:
+                updates.put(i)
+
+        pool = ThreadPoolExecutor(min(self.workers, len(claims)), thread_name_prefix="factcheck")
+        for i in range(len(claims)):
+            pool.submit(contextvars.copy_context().run, work, i)
         try:
-            response = completion(
-                model=self.model,
-                messages=messages,
-                api_base=self.api_base
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            logger.error(f"LLM call failed for model: {self.model}", exc_info=True)
-    
+            finished, last = 0, 0.0
+            while finished < len(claims):
+                if updates.get() is not None:
+                    finished += 1
+                now = time.perf_counter()
+                if now - last >= min_interval:
+                    last = now
+                    yield self.merge_reports(claims, reports, errors)
+        finally:
+            stop.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+        if usage is not None:
+            for part in usages:
+                for key, value in part.items():
+                    usage[key] = usage.get(key, 0) + value
+        self._raise_if_all_failed(errors)
+        yield self.merge_reports(claims, reports, errors)
+
+    # 모든 주장이 실패했으면 합칠 보고서가 없으므로 첫 번째 예외를 그대로 전달
+    @staticmethod
+    def _raise_if_all_failed(errors: list):
+        if errors and all(e is not None for e in errors):
+            raise errors[0]
+
+    # 주장별 보고서 -> 판정 요약 표 + 주장별 보고서
+    # 아직 생성 중인 주장은 "확인 중", 실패한 주장은 "오류"로 표시 (errors: 주장별 예외, 없으면 None)
+    @staticmethod
+    def merge_reports(claims: list[dict], reports: list[str | None], errors: list | None = None) -> str:
+        if len(claims) == 1:
+            return reports[0] or ""
+        errors = errors or [None] * len(claims)
+        rows = ["| # | 주장 | 판정 | 신뢰도 |", "|---|---|---|---|"]
+        sections = []
+        for i, (claim, report, error) in enumerate(zip(claims, reports, errors), start=1):
+            text = claim.get("claim", "").replace("|", "\\|")
+            if error is not None:
+                verdict, confidence = "오류", "-"
+                body = f"_확인 실패: {str(error) or type(error).__name__}_"
+            else:
+                verdict, confidence = FactCheck.verdict(report) if report else ("확인 중", "-")
+                body = report or "_확인 중..._"
+            rows.append(f"| {i} | {text} | {verdict} | {confidence} |")
+            sections.append(f"### 주장 {i}. {claim.get('claim', '')}\n\n{body}")
+        return "## 주장별 판정 요약\n\n" + "\n".join(rows) + "\n\n---\n\n" + "\n\n---\n\n".join(sections)
+
+    # 보고서에서 (판정, 신뢰도) 찾기 (아직 생성되지 않았으면 "-")
+    @staticmethod
+    def verdict(report: str) -> tuple[str, str]:
+        verdict = VERDICT_PATTERN.search(report)
+        confidence = CONFIDENCE_PATTERN.search(report)
+        return (
+            verdict.group(1).strip() if verdict else "-",
+            confidence.group(1).strip() if confidence else "-",
+        )
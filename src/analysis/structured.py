@@ -0,0 +1,209 @@
+# LLM 구조화 출력 (JSON) 요청, 파싱, 검증, 재요청
+# 모델이 JSON 앞뒤에 설명이나 코드 블록(```)을 붙이면 json.loads/ast.literal_eval이 실패해 파이프라인 전체를 다시 실행해야 했으므로
+# JSON 모드/스키마로 출력을 제한하고, 응답에서 스키마에 맞는 첫 번째 JSON 값을 찾은 뒤
+# 실패한 호출만 오류 내용을 알려주고 다시 요청하기 위함
+import ast
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+CLAIM_EVIDENCE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "claim": {"type": "string", "minLength": 1},
+        "evidence": {"type": "array", "items": {"type": "string", "minLength": 1}, "minItems": 1},
+    },
+    "required": ["claim", "evidence"],
+}
+
+# 영상 하나에서 추출한 주장 목록 (주장마다 claim/evidence)
+CLAIMS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "claims": {"type": "array", "items": CLAIM_EVIDENCE_SCHEMA, "minItems": 1},
+    },
+    "required": ["claims"],
+}
+
+KEYWORDS_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "keywords": {"type": "array", "items": {"type": "string", "minLength": 1}, "minItems": 1},
+    },
+    "required": ["keywords"],
+}
+
+_TYPES = {"object": dict, "array": list, "string": str, "number": (int, float), "integer": int, "boolean": bool}
+_DECODER = json.JSONDecoder()
+
+
+class StructuredOutputError(ValueError):
+    """재요청 후에도 스키마에 맞는 응답을 받지 못함"""
+
+
+# 응답 문자열에서 파싱되는 JSON 객체/배열을 앞에서부터 차례로 반환
+# '{' 또는 '['가 나오는 위치마다 raw_decode를 시도하므로 앞뒤의 설명, 코드 블록 표시는 무시됨
+# JSON으로 읽히지 않으면 파이썬 리터럴(작은따옴표 리스트 등)로도 시도
+def iter_json(text: str):
+    if not text:
+        return
+    position = 0
+    while True:
+        starts = [i for i in (text.find("{", position), text.find("[", position)) if i >= 0]
+        if not starts:
+            return
+        start = min(starts)
+        try:
+            value, _ = _DECODER.raw_decode(text, start)
+            yield value
+        except json.JSONDecodeError:
+            literal = _python_literal(text, start)
+            if literal is not None:
+                yield literal
+        position = start + 1
+
+
+# 응답에서 schema를 통과하는 첫 번째 JSON 값 (normalize를 먼저 적용해서 검사)
+# 통과하는 값이 없으면 처음 파싱된 값, 파싱되는 값이 없으면 None
+# ("Based on [1], ... {"keywords": [...]}"처럼 설명 속의 괄호가 먼저 나와도 스키마에 맞는 값을 고름)
+def extract_json(text: str, schema: dict | None = None, normalize=None):
+    first, found = None, False
+    for value in iter_json(text):
+        if normalize:
+            value = normalize(value)
+        if schema is None or not validate(value, schema):
+            return value
+        if not found:
+            first, found = value, True
+    return first
+
+
+# start 위치의 괄호와 짝이 맞는 부분을 ast.literal_eval로 읽기 (실패하면 None)
+def _python_literal(text: str, start: int):
+    pairs = {"{": "}", "[": "]"}
+    stack, quote = [], None
+    for i in range(start, len(text)):
+        c = text[i]
+        if quote:
+            if c == quote and text[i - 1] != "\\":
+                quote = None
+        elif c in "'\"":
+            quote = c
+        elif c in pairs:
+            stack.append(pairs[c])
+        elif c in "}]":
+            if not stack or stack.pop() != c:
+                return None
+            if not stack:
+                try:
+                    value = ast.literal_eval(text[start:i + 1])
+                except (ValueError, SyntaxError):
+                    return None
+                return value if isinstance(value, (dict, list)) else None
+    return None
+
+
+# JSON Schema의 일부(type, properties, required, items, minItems, maxItems, minLength)만 검사
+# 반환: 오류 메시지 목록 (비어 있으면 통과)
+def validate(value, schema: dict, path: str = "$") -> list[str]:
+    expected = schema.get("type")
+    if (expected and not isinstance(value, _TYPES[expected])) or (expected in ("number", "integer") and isinstance(value, bool)):
+        return [f"{path}: {expected} 이어야 합니다 (받은 값: {type(value).__name__})"]
+    errors = []
+    if isinstance(value, dict):
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key}: 필수 항목이 없습니다")
+        for key, sub in schema.get("properties", {}).items():
+            if key in value:
+                errors.extend(validate(value[key], sub, f"{path}.{key}"))
+    elif isinstance(value, list):
+        if len(value) < schema.get("minItems", 0):
+            errors.append(f"{path}: 항목이 {schema['minItems']}개 이상이어야 합니다")
+        if "maxItems" in schema and len(value) > schema["maxItems"]:
+            errors.append(f"{path}: 항목이 {schema['maxItems']}개 이하여야 합니다")
+        if "items" in schema:
+            for i, item in enumerate(value):
+                errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    elif isinstance(value, str) and len(value.strip()) < schema.get("minLength", 0):
+        errors.append(f"{path}: 빈 문자열입니다")
+    return errors
+
+
+# 응답 -> (값, 오류 목록). normalize로 스키마 검사 전에 값을 정리할 수 있음 (예: 리스트 -> {"keywords": 리스트})
+def parse_structured(response: str, schema: dict, normalize=None) -> tuple[object, list[str]]:
+    value = extract_json(response, schema, normalize)
+    if value is None:
+        return None, ["응답에서 JSON을 찾지 못했습니다"]
+    return value, validate(value, schema)
+
+
+# 출력 형식 제한 옵션 (litellm이 Ollama의 format 옵션으로 변환)
+# mode: "schema" = JSON 스키마로 생성 제한, "json" = JSON 모드, "off" = 프롬프트로만 요청
+def response_format(schema: dict, name: str, mode: str = "schema") -> dict:
+    if mode == "schema":
+        return {"response_format": {"type": "json_schema", "json_schema": {"name": name, "schema": schema}}}
+    if mode == "json":
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+
+def repair_messages(messages: list[dict], response: str, errors: list[str]) -> list[dict]:
+    return messages + [
+        {"role": "assistant", "content": response or ""},
+        {"role": "user", "content": (
+            "이전 답변을 요구한 JSON 형식으로 읽을 수 없습니다.\n"
+            + "\n".join(f"- {e}" for e in errors)
+            + "\n설명이나 코드 블록 없이, 요구한 형식의 JSON 하나만 다시 답변하세요."
+        )},
+    ]
+
+
+class StructuredCaller:
+    """
+    BaseLLM 호출 + 구조화 출력 파싱
+    - 첫 호출은 캐시를 사용하고, 검증에 실패하면 오류 내용을 덧붙여 캐시 없이 max_repairs번까지 그 호출만 다시 요청
+    - 재요청으로 얻은 올바른 응답은 원래 호출의 캐시 키에 저장해 잘못된 응답이 캐시에서 다시 나오지 않도록 함
+    """
+    def __init__(self, llm, mode: str = "schema", max_repairs: int = 2):
+        self.llm = llm
+        self.mode = mode
+        self.max_repairs = max_repairs
+
+    def call(self, messages: list[dict], schema: dict, name: str, template_hash: str | None = None, normalize=None):
+        options = response_format(schema, name, self.mode)
+        response = self.llm.llm_call(messages, template_hash=template_hash, **options)
+        value, errors = parse_structured(response, schema, normalize)
+        attempt = 0
+        while errors and attempt < self.max_repairs:
+            attempt += 1
+            logger.warning(f"Invalid {name} output ({'; '.join(errors)}). Repair attempt {attempt}/{self.max_repairs}.")
+            response = self.llm.llm_call(repair_messages(messages, response, errors), use_cache=False, **options)
+            value, errors = parse_structured(response, schema, normalize)
+            if not errors:
+                self._replace_cached(messages, template_hash, response, options)
+        if errors:
+            raise StructuredOutputError(f"{name} 출력 형식 오류: {'; '.join(errors)}")
+        return value
+
+    async def acall(self, messages: list[dict], schema: dict, name: str, template_hash: str | None = None, normalize=None):
+        options = response_format(schema, name, self.mode)
+        response = await self.llm.acall(messages, template_hash=template_hash, **options)
+        value, errors = parse_structured(response, schema, normalize)
+        attempt = 0
+        while errors and attempt < self.max_repairs:
+            attempt += 1
+            logger.warning(f"Invalid {name} output ({'; '.join(errors)}). Repair attempt {attempt}/{self.max_repairs}.")
+            response = await self.llm.acall(repair_messages(messages, response, errors), use_cache=False, **options)
+            value, errors = parse_structured(response, schema, normalize)
+            if not errors:
+                self._replace_cached(messages, template_hash, response, options)
+        if errors:
+            raise StructuredOutputError(f"{name} 출력 형식 오류: {'; '.join(errors)}")
+        return value
+
+    def _replace_cached(self, messages, template_hash, response, options):
+        cache = getattr(self.llm, "cache", None)
+        if cache is not None:
+            cache.set(self.llm.cache_key(messages, template_hash, **options), response)
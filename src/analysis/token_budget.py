@@ -0,0 +1,120 @@
+# 프롬프트 토큰 예산 관리
+# 긴 자막이나 많은 검색 결과를 그대로 프롬프트에 넣으면 모델 컨텍스트를 넘거나 Ollama의 prefill이 매우 느려지므로
+# 모델 컨텍스트 크기 안에서 입력을 나누거나(map-reduce) 점수 순으로 골라 넣기 위함
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+# 문장 경계 (마침표/물음표/느낌표 뒤 공백 또는 줄바꿈)
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?。])\s+|\n+")
+
+
+class TokenBudget:
+    """
+    모델 컨텍스트 크기 - 출력용 토큰 = 입력(프롬프트)에 쓸 수 있는 토큰 수
+    - 토큰 수는 litellm.token_counter로 계산 (모델 토크나이저를 모르면 litellm 기본 토크나이저 사용)
+    - context_size를 주지 않으면 litellm 모델 정보에서 찾고, 없으면 default_context_size 사용
+      (BaseLLM에 넘기면 max_output_tokens는 max_tokens로, Ollama 모델은 context_size를 num_ctx로 호출마다 전달)
+    """
+    def __init__(self, model: str, context_size: int | None = None, max_output_tokens: int = 1024,
+                 default_context_size: int = 8192):
+        self.model = model
+        self._context_size = context_size
+        self.default_context_size = default_context_size
+        self.max_output_tokens = max_output_tokens
+
+    # litellm import가 무거우므로 모델 정보 조회는 처음 사용할 때 한 번만
+    @property
+    def context_size(self) -> int:
+        if self._context_size is None:
+            self._context_size = self.model_context_size(self.model, self.default_context_size)
+        return self._context_size
+
+    @staticmethod
+    def model_context_size(model: str, default: int) -> int:
+        try:
+            import litellm
+            info = litellm.get_model_info(model)
+            return info.get("max_input_tokens") or info.get("max_tokens") or default
+        except Exception:
+            logger.info(f"Unknown context size for model '{model}'. Using {default} tokens.")
+            return default
+
+    @property
+    def input_limit(self) -> int:
+        return self.context_size - self.max_output_tokens
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        try:
+            from litellm import token_counter
+            return token_counter(model=self.model, text=text)
+        except Exception:
+            # 토크나이저를 쓸 수 없으면 대략적인 값 (한국어/영어 혼합 기준 3글자당 1토큰)
+            return len(text) // 3 + 1
+
+    def count_messages(self, messages: list[dict]) -> int:
+        try:
+            from litellm import token_counter
+            return token_counter(model=self.model, messages=messages)
+        except Exception:
+            return sum(self.count(m.get("content", "")) + 4 for m in messages)
+
+    def fits(self, messages: list[dict]) -> bool:
+        return self.count_messages(messages) <= self.input_limit
+
+    # 긴 텍스트를 문장 경계에서 나눠 각 조각이 max_tokens 이하가 되도록 함
+    # 한 문장이 max_tokens보다 길면 글자 수 기준으로 자름
+    def split_text(self, text: str, max_tokens: int) -> list[str]:
+        if max_tokens <= 0:
+            raise ValueError("토큰 예산이 부족합니다. LLM_CONTEXT_SIZE를 늘리거나 LLM_MAX_OUTPUT_TOKENS를 줄이세요.")
+        pieces, current, current_tokens = [], [], 0
+        for sentence in (s.strip() for s in SENTENCE_BOUNDARY.split(text)):
+            if not sentence:
+                continue
+            tokens = self.count(sentence)
+            if tokens > max_tokens:
+                # 토큰당 평균 글자 수로 잘라서 여러 조각으로 만듦
+                step = max(1, int(len(sentence) * max_tokens / tokens * 0.9))
+                parts = [sentence[i:i + step] for i in range(0, len(sentence), step)]
+            else:
+                parts = [sentence]
+            for part in parts:
+                part_tokens = self.count(part) if len(parts) > 1 else tokens
+                if current and current_tokens + part_tokens > max_tokens:
+                    pieces.append(" ".join(current))
+                    current, current_tokens = [], 0
+                current.append(part)
+                current_tokens += part_tokens
+        if current:
+            pieces.append(" ".join(current))
+        logger.info(f"Split text of {len(text)} chars into {len(pieces)} pieces of at most {max_tokens} tokens.")
+        return pieces
+
+
+# 검색 결과 청크 사이의 중복 제거
+# - 이미 고른 청크에 완전히 포함된 청크는 제외
+# - 같은 논문의 이웃 청크는 청킹 overlap만큼 앞뒤가 겹치므로, 점수가 낮은 쪽에서 겹치는 부분을 잘라냄
+def trim_overlaps(results: list[dict], min_overlap: int = 50, max_overlap: int = 500) -> list[dict]:
+    kept = []
+    for result in results:
+        text = result.get("chunk_text") or ""
+        if not text or any(text in k["chunk_text"] for k in kept):
+            continue
+        for other in kept:
+            if other.get("id") != result.get("id"):
+                continue
+            a = other["chunk_text"]
+            # a의 끝과 text의 앞이 겹치는 경우, text의 끝과 a의 앞이 겹치는 경우
+            for n in range(min(len(a), len(text), max_overlap), min_overlap - 1, -1):
+                if a.endswith(text[:n]):
+                    text = text[n:]
+                    break
+                if a.startswith(text[-n:]):
+                    text = text[:-n]
+                    break
+        if text.strip():
+            kept.append({**result, "chunk_text": text})
+    return kept
@@ -1 +1,6 @@
-from .arxiv_collect import ArxivCollector
\ No newline at end of file
+from .arxiv_collect import ArxivCollector
+from .paper_cache import PaperCache
+from .rate_limit import HostRateLimiter
+from .pdf_extract import PdfExtractor
+from .corpus import LocalCorpus, CorpusPaper
+from .corpus_sync import CorpusSync
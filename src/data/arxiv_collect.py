@@ -1,43 +1,165 @@
 import arxiv
-import tempfile
-# pdf에서 텍스트만 추출
-import fitz
-# 대소문자 구분없이 Reference 내용을 제거하기 위함
-import re
+import time
+import urllib.request
+import contextvars
+from collections import deque
+# 키워드 검색과 PDF 다운로드를 동시에 처리하기 위한 스레드 풀
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from .base_data import BaseData
+from .paper_cache import PaperCache
+from .rate_limit import HostRateLimiter, ARXIV_API_HOST
+from .pdf_extract import PdfExtractor
+from .corpus import LocalCorpus, CorpusPaper
+from src.utils.tracing import tracer
+from src.utils.concurrency import stage_limiter
 import logging
 
 logger = logging.getLogger(__name__)
 
+# PDF를 한 번에 읽는 크기 (읽을 때마다 제한 시간을 확인)
+DOWNLOAD_CHUNK_BYTES = 64 * 1024
+
 class ArxivCollector(BaseData):
-    def __init__(self, arxiv_client :arxiv.Client ,max_result=10):
+    def __init__(self, arxiv_client :arxiv.Client ,max_result=10, cache: PaperCache | None = None,
+                 max_workers: int = 1, paper_timeout: float = 60.0, rate_limiter: HostRateLimiter | None = None,
+                 extractor: PdfExtractor | None = None, corpus: LocalCorpus | None = None, min_local_hits: int = 3):
         self.client = arxiv_client
         self.max_result = max_result
+        # 본문 캐시 (없으면 매번 PDF를 내려받아 파싱)
+        self.cache = cache
+        # max_workers > 1 이면 검색과 다운로드를 동시에 수행
+        self.max_workers = max_workers
+        # 논문 1편(다운로드 + 파싱)에 허용하는 최대 시간(초), 작업자가 논문 처리를 시작한 시점부터 get_body 안에서 적용
+        self.paper_timeout = paper_timeout
+        self.rate_limiter = rate_limiter or HostRateLimiter()
+        # PDF 파싱 엔진 (기본값: 호출한 스레드에서 바로 파싱)
+        self.extractor = extractor or PdfExtractor(max_workers=0)
+        # 로컬 논문 목록: 키워드로 min_local_hits편 이상 찾으면 arXiv API를 검색하지 않음 (None이면 항상 API 검색)
+        self.corpus = corpus
+        self.min_local_hits = min_local_hits
 
     def collect(self, queries: list[str]) -> list[dict]:
+        all_papers = list(self.iter_collect(queries))
+        logger.info(f"Total {len(all_papers)} papers collected.")
+        return all_papers
+
+    # 논문이 하나씩 준비되는 대로 정규화된 dict를 반환하는 제너레이터
+    # 다음 단계(청킹, 임베딩, 업로드)가 전체 수집이 끝나기를 기다리지 않도록 함
+    # sources를 넘기면 키워드별 검색된 논문 id 목록을 채움 (여러 영상의 키워드를 합쳐 한 번에 수집할 때 영상별 범위를 나누기 위함)
+    def iter_collect(self, queries: list[str], sources: dict | None = None):
         logger.info(f"Starting paper collection for queries: {queries}")
-        all_papers =[]
+        if self.max_workers > 1:
+            records = self._iter_concurrent(queries, sources)
+        else:
+            records = self._iter_serial(queries, sources)
+        for record in records:
+            yield self.normalize([record])[0]
+        if self.cache:
+            logger.info(f"Paper cache stats: {self.cache.stats()}")
+
+    def _iter_serial(self, queries: list[str], sources: dict | None = None):
+        seen = set()
         for query in queries:
             try:
-                logger.info(f"Searching arxiv for query: '{query}'")
-                search = arxiv.Search(
-                    query=f'all:"{query}"',
-                    max_results = self.max_result,
-                    sort_by=arxiv.SortCriterion.Relevance
-                )
-                for paper in self.client.results(search):
-                    body_text = self.extract_text_from_pdf(paper)
-                    all_papers.append({
-                        "id": paper.entry_id,
-                        "title": paper.title,
-                        "date": paper.published,
-                        "body": body_text,
-                        "source" : "arxiv"
-                    })
+                results = self.find(query)
+            except Exception as e:
+                logger.error(f"Failed to collect papers for query '{query}'", exc_info=True)
+                continue
+            if sources is not None:
+                sources[query] = [paper.entry_id for paper in results]
+            for paper in results:
+                if paper.entry_id in seen:
+                    continue
+                seen.add(paper.entry_id)
+                yield self.to_record(paper, self.get_body(paper))
+
+    # 키워드 순서, 검색 순위대로 중복 없이 논문을 나열
+    def _iter_candidates(self, search_futures, sources: dict | None = None):
+        seen = set()
+        for query, future in search_futures:
+            try:
+                results = future.result()
             except Exception as e:
                 logger.error(f"Failed to collect papers for query '{query}'", exc_info=True)
-        logger.info(f"Total {len(all_papers)} papers collected. Normalizing data...")
-        return self.normalize(all_papers)
+                continue
+            if sources is not None:
+                sources[query] = [paper.entry_id for paper in results]
+            for paper in results:
+                # 이미 처리 중인 논문은 다시 제출하지 않음
+                if paper.entry_id in seen:
+                    logger.debug(f"Duplicate paper '{paper.entry_id}' from query '{query}'. Skipping.")
+                    continue
+                seen.add(paper.entry_id)
+                yield paper
+
+    # 키워드 검색과 논문 처리를 스레드 풀에서 동시에 수행
+    # 결과 순서는 (키워드 순서, 검색 순위)로 고정되며 여러 키워드에서 나온 같은 논문은 한 번만 처리
+    # 동시에 처리 중인 논문 수를 제한해 메모리 사용량이 수집량에 비례해 늘지 않도록 함
+    # 제한 시간은 get_body 안에서 적용되므로 (대기열에서 기다린 시간은 포함되지 않음) 여기서는 결과를 기다리기만 함
+    def _iter_concurrent(self, queries: list[str], sources: dict | None = None):
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="arxiv")
+        window = deque()
+        try:
+            search_futures = [(query, pool.submit(contextvars.copy_context().run, self.find, query)) for query in queries]
+            candidates = self._iter_candidates(search_futures, sources)
+            while True:
+                # 작업자 수의 2배까지 미리 제출
+                while len(window) < self.max_workers * 2:
+                    paper = next(candidates, None)
+                    if paper is None:
+                        break
+                    window.append((paper, pool.submit(contextvars.copy_context().run, self.get_body, paper)))
+                if not window:
+                    break
+                paper, future = window.popleft()
+                try:
+                    body_text = future.result()
+                except Exception as e:
+                    logger.error(f"Failed to process paper '{paper.entry_id}'", exc_info=True)
+                    continue
+                yield self.to_record(paper, body_text)
+        finally:
+            # 소비하는 쪽이 중간에 멈추면 남은 작업을 기다리지 않도록 대기 없이 종료
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    # 로컬 목록을 먼저 검색하고 부족할 때만 arXiv API 검색
+    # API 검색 결과는 로컬 목록에 추가되어 다음 요청부터는 로컬에서 찾을 수 있음 (본문 임베딩은 백그라운드 동기화가 처리)
+    def find(self, query: str) -> list:
+        if self.corpus is None:
+            return self.search(query)
+        local = self.corpus.search(query, limit=self.max_result)
+        if len(local) >= min(self.min_local_hits, self.max_result):
+            tracer.add("corpus_hits")
+            logger.info(f"Found {len(local)} papers for query '{query}' in local corpus.")
+            return local
+        tracer.add("corpus_misses")
+        results = self.search(query)
+        try:
+            self.corpus.upsert([CorpusPaper.from_result(paper) for paper in results])
+        except Exception:
+            logger.warning("Failed to add search results to local corpus.", exc_info=True)
+        return results
+
+    @tracer.traced("arxiv.search")
+    def search(self, query: str) -> list[arxiv.Result]:
+        logger.info(f"Searching arxiv for query: '{query}'")
+        search = arxiv.Search(
+            query=f'all:"{query}"',
+            max_results = self.max_result,
+            sort_by=arxiv.SortCriterion.Relevance
+        )
+        self.rate_limiter.wait(ARXIV_API_HOST)
+        return list(self.client.results(search))
+
+    @staticmethod
+    def to_record(paper: arxiv.Result, body_text: str) -> dict:
+        return {
+            "id": paper.entry_id,
+            "title": paper.title,
+            "date": paper.published,
+            "body": body_text,
+            "source" : "arxiv"
+        }
     # self없이 정적 메소드로 정의
     @staticmethod
     def normalize(papers_raw: list[dict]) -> list[dict]:
@@ -57,24 +179,68 @@ class ArxivCollector(BaseData):
             })
         return normalized
 
+    # 캐시에 본문이 있으면 다운로드/파싱 없이 바로 반환
+    # 다운로드와 파싱을 합쳐 paper_timeout초 안에 끝나지 않으면 중단하고 빈 문자열 반환 (작업자를 계속 붙잡지 않도록)
+    def get_body(self, paper: arxiv.Result) -> str:
+        if self.cache:
+            cached = self.cache.get(paper.entry_id)
+            if cached is not None:
+                return cached
+        body_text = self.extract_text_from_pdf(paper, deadline=time.monotonic() + self.paper_timeout)
+        # 추출 실패(빈 문자열)는 일시적인 오류일 수 있으므로 캐시하지 않음
+        if self.cache and body_text:
+            self.cache.put(paper.entry_id, body_text)
+        return body_text
+
+    # 요청 간격 제한과 타임아웃을 적용해 PDF를 메모리로 다운로드
+    # 크기 제한을 넘는 문서는 끝까지 받지 않고 중단
+    # urlopen의 timeout은 소켓 읽기 한 번에만 적용되므로, 조금씩 계속 들어오는 응답도 deadline이 지나면 중단
+    @tracer.traced("arxiv.download")
+    def download_pdf(self, paper: arxiv.Result, deadline: float | None = None) -> bytes:
+        if deadline is None:
+            deadline = time.monotonic() + self.paper_timeout
+        self.rate_limiter.wait(paper.pdf_url)
+        max_bytes = self.extractor.max_bytes
+        parts, size = [], 0
+        with stage_limiter.slot("download"), urllib.request.urlopen(paper.pdf_url, timeout=self._remaining(deadline)) as response:
+            length = response.headers.get("Content-Length")
+            if length and int(length) > max_bytes:
+                raise ValueError(f"PDF size {length} bytes exceeds limit of {max_bytes} bytes")
+            while size <= max_bytes:
+                part = response.read(min(DOWNLOAD_CHUNK_BYTES, max_bytes + 1 - size))
+                if not part:
+                    break
+                parts.append(part)
+                size += len(part)
+                self._remaining(deadline)
+        data = b"".join(parts)
+        if len(data) > max_bytes:
+            raise ValueError(f"PDF exceeds limit of {max_bytes} bytes")
+        tracer.add("bytes_downloaded", len(data))
+        return data
+
+    # deadline까지 남은 시간(초), 이미 지났으면 TimeoutError
+    def _remaining(self, deadline: float) -> float:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError(f"Timed out after {self.paper_timeout}s")
+        return remaining
+
     # arxiv 객체를 받아 원본 텍스트만 추출
-    def extract_text_from_pdf(self,paper: arxiv.Result) -> str:
+    # deadline(time.monotonic 기준)까지 다운로드와 파싱이 끝나지 않으면 빈 문자열
+    def extract_text_from_pdf(self,paper: arxiv.Result, deadline: float | None = None) -> str:
         if not paper.pdf_url:
             logger.warning(f"No PDF URL found for paper '{paper.title}'. Skipping.")
             return ""
+        if deadline is None:
+            deadline = time.monotonic() + self.paper_timeout
         try:
-            with tempfile.TemporaryDirectory() as tmp_dir:
-                pdf_path = paper.download_pdf(dirpath=tmp_dir)
-                # pdf 파일 열기
-                doc = fitz.open(pdf_path)
-                full_text = ""
-                # 페이지 순회하며 텍스트 추출 및 결합
-                for page in doc:
-                    full_text += page.get_text()
-                doc.close()
-                match = re.search(r'\n\s*references\s*\n', full_text, re.IGNORECASE)
-                return full_text[:match.start()].strip() if match else full_text
-                
+            data = self.download_pdf(paper, deadline)
+            with tracer.span("pdf.extract", bytes=len(data)):
+                return self.extractor.extract(data, timeout=self._remaining(deadline))
+        except (TimeoutError, FutureTimeoutError):
+            logger.warning(f"Timed out after {self.paper_timeout}s processing paper '{paper.entry_id}'. Skipping.")
+            return ""
         except Exception as e:
             logger.error(f"Failed to process PDF for paper '{paper.title}' (ID: {paper.entry_id})", exc_info=True)
-            return ""
\ No newline at end of file
+            return ""
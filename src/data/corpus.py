@@ -0,0 +1,216 @@
+# 로컬 arXiv 논문 목록 (메타데이터 + 제목/초록 전문 검색 인덱스)
+# 요청마다 arXiv API를 검색하면 검색 지연과 요청 간격 제한이 팩트체크 시간에 그대로 더해지므로
+# 미리 수집해 둔 논문 메타데이터에서 키워드를 먼저 찾고, 없을 때만 API를 사용하기 위함
+import logging
+import sqlite3
+import threading
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class CorpusPaper:
+    """
+    로컬 목록에 저장된 논문 1편
+    ArxivCollector가 arxiv.Result 대신 그대로 사용할 수 있도록 같은 속성 이름(entry_id, title, published, pdf_url) 사용
+    """
+    entry_id: str
+    title: str
+    summary: str
+    published: datetime
+    updated: datetime
+    pdf_url: str | None
+    categories: str = ""
+
+    @classmethod
+    def from_result(cls, paper) -> "CorpusPaper":
+        return cls(
+            entry_id=paper.entry_id,
+            title=paper.title,
+            summary=getattr(paper, "summary", "") or "",
+            published=paper.published,
+            updated=getattr(paper, "updated", None) or paper.published,
+            pdf_url=paper.pdf_url,
+            categories=" ".join(getattr(paper, "categories", None) or []),
+        )
+
+
+class LocalCorpus:
+    """
+    sqlite 파일 하나에 저장
+    - papers: 메타데이터와 임베딩 완료 여부(ingested)
+    - papers_fts: 제목/초록 FTS5 인덱스 (제목 일치에 가중치 2배)
+    - sync_state: 분야(category)별 수집 체크포인트 (마지막으로 수집한 논문의 updated 시각)
+      한 번에 체크포인트까지 받지 못했으면 남은 구간(체크포인트 ~ cursor)과 구간을 다 받은 뒤 쓸 체크포인트(target)도 저장
+    """
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.executescript(
+                """
+                PRAGMA journal_mode=WAL;
+                CREATE TABLE IF NOT EXISTS papers (
+                    entry_id TEXT PRIMARY KEY,
+                    title TEXT,
+                    summary TEXT,
+                    categories TEXT,
+                    published TEXT,
+                    updated TEXT,
+                    pdf_url TEXT,
+                    ingested INTEGER NOT NULL DEFAULT 0
+                );
+                CREATE INDEX IF NOT EXISTS papers_ingested ON papers(ingested);
+                CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+                    title, summary, content='papers', content_rowid='rowid'
+                );
+                CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+                    INSERT INTO papers_fts(rowid, title, summary) VALUES (new.rowid, new.title, new.summary);
+                END;
+                CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+                    INSERT INTO papers_fts(papers_fts, rowid, title, summary) VALUES ('delete', old.rowid, old.title, old.summary);
+                END;
+                CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE OF title, summary ON papers BEGIN
+                    INSERT INTO papers_fts(papers_fts, rowid, title, summary) VALUES ('delete', old.rowid, old.title, old.summary);
+                    INSERT INTO papers_fts(rowid, title, summary) VALUES (new.rowid, new.title, new.summary);
+                END;
+                CREATE TABLE IF NOT EXISTS sync_state (category TEXT PRIMARY KEY, checkpoint TEXT, synced_at TEXT);
+                """
+            )
+            # 이어받기 정보가 없던 이전 버전의 파일에 열 추가
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(sync_state)")}
+            for column in ("cursor", "target"):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE sync_state ADD COLUMN {column} TEXT")
+            self._conn.commit()
+
+    # 메타데이터 저장 (이미 있는 논문은 내용만 갱신하고 임베딩 완료 여부는 유지, 새로 추가된 수 반환)
+    def upsert(self, papers: list[CorpusPaper]) -> int:
+        if not papers:
+            return 0
+        with self._lock:
+            before = self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0]
+            self._conn.executemany(
+                """
+                INSERT INTO papers(entry_id, title, summary, categories, published, updated, pdf_url)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(entry_id) DO NOTHING
+                """,
+                [(p.entry_id, p.title, p.summary, p.categories, p.published.isoformat(), p.updated.isoformat(), p.pdf_url)
+                 for p in papers]
+            )
+            added = self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0] - before
+            self._conn.executemany(
+                "UPDATE papers SET title = ?, summary = ?, categories = ?, updated = ?, pdf_url = ? WHERE entry_id = ? AND updated < ?",
+                [(p.title, p.summary, p.categories, p.updated.isoformat(), p.pdf_url, p.entry_id, p.updated.isoformat())
+                 for p in papers]
+            )
+            self._conn.commit()
+        return added
+
+    @staticmethod
+    def _row_to_paper(row) -> CorpusPaper:
+        entry_id, title, summary, categories, published, updated, pdf_url = row
+        return CorpusPaper(
+            entry_id=entry_id, title=title, summary=summary or "",
+            published=datetime.fromisoformat(published), updated=datetime.fromisoformat(updated),
+            pdf_url=pdf_url, categories=categories or "",
+        )
+
+    # 키워드를 구(phrase)로 제목/초록에서 검색 (arXiv API의 all:"키워드" 검색과 같은 방식), BM25 순위
+    # 본문을 가져오지 못한 논문(ingested = -1)은 다시 받아도 실패하므로 제외 (로컬 결과 수에 세지 않도록)
+    def search(self, query: str, limit: int = 10) -> list[CorpusPaper]:
+        phrase = '"' + query.replace('"', '""').strip() + '"'
+        with self._lock:
+            try:
+                rows = self._conn.execute(
+                    """
+                    SELECT p.entry_id, p.title, p.summary, p.categories, p.published, p.updated, p.pdf_url
+                    FROM papers_fts JOIN papers p ON p.rowid = papers_fts.rowid
+                    WHERE papers_fts MATCH ? AND p.ingested >= 0
+                    ORDER BY bm25(papers_fts, 2.0, 1.0)
+                    LIMIT ?
+                    """,
+                    (phrase, limit)
+                ).fetchall()
+            except sqlite3.OperationalError:
+                logger.warning(f"Invalid corpus search query '{query}'", exc_info=True)
+                return []
+        return [self._row_to_paper(row) for row in rows]
+
+    # 아직 본문 추출/임베딩이 안 된 논문 (최근 논문부터)
+    def pending(self, limit: int = 100) -> list[CorpusPaper]:
+        with self._lock:
+            rows = self._conn.execute(
+                """
+                SELECT entry_id, title, summary, categories, published, updated, pdf_url
+                FROM papers WHERE ingested = 0 ORDER BY updated DESC LIMIT ?
+                """,
+                (limit,)
+            ).fetchall()
+        return [self._row_to_paper(row) for row in rows]
+
+    # ingested: 1 = 임베딩 완료, -1 = 본문을 가져오지 못함 (다시 시도하지 않음)
+    def mark_ingested(self, entry_ids: list[str], state: int = 1):
+        if not entry_ids:
+            return
+        with self._lock:
+            self._conn.executemany("UPDATE papers SET ingested = ? WHERE entry_id = ?", [(state, e) for e in entry_ids])
+            self._conn.commit()
+
+    def checkpoint(self, category: str) -> datetime | None:
+        with self._lock:
+            row = self._conn.execute("SELECT checkpoint FROM sync_state WHERE category = ?", (category,)).fetchone()
+        return datetime.fromisoformat(row[0]) if row and row[0] else None
+
+    # 체크포인트까지 모두 받았을 때만 호출 (남은 구간 정보는 지움)
+    def set_checkpoint(self, category: str, checkpoint: datetime):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sync_state(category, checkpoint, synced_at, cursor, target) VALUES (?, ?, ?, NULL, NULL)",
+                (category, checkpoint.isoformat(), datetime.now().isoformat())
+            )
+            self._conn.commit()
+
+    # 아직 받지 못한 구간: (cursor = 이 시각 이전부터 체크포인트까지 남음, target = 구간을 다 받은 뒤의 체크포인트), 없으면 (None, None)
+    def resume_state(self, category: str) -> tuple[datetime | None, datetime | None]:
+        with self._lock:
+            row = self._conn.execute("SELECT cursor, target FROM sync_state WHERE category = ?", (category,)).fetchone()
+        if not row or not row[0]:
+            return None, None
+        return datetime.fromisoformat(row[0]), datetime.fromisoformat(row[1])
+
+    # 체크포인트는 그대로 두고 남은 구간만 기록
+    def set_resume(self, category: str, cursor: datetime, target: datetime):
+        with self._lock:
+            self._conn.execute(
+                """
+                INSERT INTO sync_state(category, checkpoint, synced_at, cursor, target) VALUES (?, NULL, ?, ?, ?)
+                ON CONFLICT(category) DO UPDATE SET synced_at = excluded.synced_at, cursor = excluded.cursor, target = excluded.target
+                """,
+                (category, datetime.now().isoformat(), cursor.isoformat(), target.isoformat())
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT ingested, COUNT(*) FROM papers GROUP BY ingested").fetchall())
+            sync = dict(self._conn.execute("SELECT category, checkpoint FROM sync_state").fetchall())
+            resume = dict(self._conn.execute("SELECT category, cursor FROM sync_state WHERE cursor IS NOT NULL").fetchall())
+        return {
+            "papers": sum(counts.values()),
+            "ingested": counts.get(1, 0),
+            "pending": counts.get(0, 0),
+            "failed": counts.get(-1, 0),
+            "checkpoints": sync,
+            "resume_cursors": resume,
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,191 @@
+"""
+로컬 arXiv 논문 목록 동기화
+설정한 분야(category)의 새 논문 메타데이터를 체크포인트 이후만 가져와 LocalCorpus에 추가하고,
+아직 임베딩하지 않은 논문은 본문 추출 -> 청킹 -> 임베딩 -> 업로드까지 미리 처리해 둠
+요청 처리 중에는 로컬 목록에서 찾은 논문의 본문/벡터가 이미 있으므로 네트워크 없이 검색할 수 있음
+
+사용 예:
+    python -m src.data.corpus_sync --categories cs.CL,cs.AI          # 한 번 동기화 후 종료 (cron 등에서 사용)
+    python -m src.data.corpus_sync --categories cs.CL --loop          # CORPUS_SYNC_INTERVAL마다 반복
+앱(main.py)은 CORPUS_CATEGORIES가 설정되어 있으면 같은 작업을 백그라운드 스레드에서 실행함
+"""
+import argparse
+import logging
+import sys
+import threading
+from datetime import datetime, timedelta, timezone
+
+from src.utils.tracing import tracer
+from .arxiv_collect import ArxivCollector
+from .corpus import LocalCorpus, CorpusPaper
+from .rate_limit import ARXIV_API_HOST
+
+logger = logging.getLogger(__name__)
+
+
+class CorpusSync:
+    """
+    - sync_category: lastUpdatedDate 내림차순으로 목록을 받아 체크포인트보다 오래된 논문이 나오면 중단
+      체크포인트는 체크포인트까지 모두 받은 뒤에만 갱신하므로 중간에 멈추면 다음 동기화에서 다시 받음 (이미 있는 논문은 건너뜀)
+      max_per_sync에서 끊기면 체크포인트는 그대로 두고 남은 구간을 저장해 다음 동기화에서 그 구간부터 이어 받음
+    - ingest_pending: 임베딩 전 논문을 batch_size편씩 VectorDB.upload_stream으로 처리
+    - start: sync_all + ingest_pending을 interval초마다 반복하는 백그라운드 스레드
+    """
+    def __init__(self, corpus: LocalCorpus, collector: ArxivCollector, db_manager, categories: list[str],
+                 max_per_sync: int = 2000, batch_size: int = 50):
+        self.corpus = corpus
+        self.collector = collector
+        self.db_manager = db_manager
+        self.categories = categories
+        self.max_per_sync = max_per_sync
+        self.batch_size = batch_size
+        self._stop = threading.Event()
+        self._thread = None
+
+    def sync_category(self, category: str) -> int:
+        import arxiv
+        checkpoint = self.corpus.checkpoint(category)
+        cursor, target = self.corpus.resume_state(category)
+        query = f"cat:{category}"
+        if checkpoint and cursor:
+            # 지난번에 max_per_sync에서 끊긴 구간(체크포인트 ~ cursor)부터 이어서 받음
+            query += f" AND lastUpdatedDate:[{self._query_date(checkpoint)} TO {self._query_date(cursor)}]"
+        search = arxiv.Search(
+            query=query,
+            max_results=self.max_per_sync,
+            sort_by=arxiv.SortCriterion.LastUpdatedDate,
+            sort_order=arxiv.SortOrder.Descending
+        )
+        added, newest, oldest, fetched, reached, batch = 0, target or checkpoint, None, 0, False, []
+        with tracer.span("corpus.sync", category=category):
+            self.collector.rate_limiter.wait(ARXIV_API_HOST)
+            for paper in self.collector.client.results(search):
+                if self._stop.is_set():
+                    return added
+                updated = paper.updated or paper.published
+                if checkpoint and updated <= checkpoint:
+                    reached = True
+                    break
+                fetched += 1
+                newest = max(newest, updated) if newest else updated
+                oldest = min(oldest, updated) if oldest else updated
+                batch.append(CorpusPaper.from_result(paper))
+                if len(batch) >= 100:
+                    added += self.corpus.upsert(batch)
+                    batch = []
+            added += self.corpus.upsert(batch)
+        # 체크포인트까지 닿았거나 결과가 max_per_sync보다 적게 끝났을 때만 체크포인트 갱신
+        # (처음 동기화하는 분야는 최신 max_per_sync편만 받고 바로 체크포인트를 정함)
+        if not checkpoint or reached or fetched < self.max_per_sync:
+            if newest:
+                self.corpus.set_checkpoint(category, newest)
+            logger.info(f"Synced category '{category}': {added} new papers (checkpoint {newest}).")
+        else:
+            # 같은 분(minute)에 갱신된 논문만 반복해서 받는 경우를 막기 위해 cursor는 항상 앞으로 당김
+            if cursor and oldest >= cursor:
+                oldest = cursor - timedelta(minutes=1)
+            self.corpus.set_resume(category, oldest, newest)
+            logger.info(f"Synced category '{category}': {added} new papers, resuming before {oldest} next time "
+                        f"(checkpoint {checkpoint}).")
+        return added
+
+    # arXiv 검색식의 날짜 범위 형식 (UTC, 분 단위)
+    @staticmethod
+    def _query_date(value: datetime) -> str:
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc)
+        return value.strftime("%Y%m%d%H%M")
+
+    def sync_all(self) -> int:
+        added = 0
+        for category in self.categories:
+            try:
+                added += self.sync_category(category)
+            except Exception:
+                logger.error(f"Failed to sync category '{category}'", exc_info=True)
+        return added
+
+    # 임베딩 전 논문을 처리 (본문을 가져오지 못한 논문은 다시 시도하지 않도록 표시)
+    def ingest_pending(self, limit: int | None = None) -> int:
+        self.db_manager.setup_qdrant()
+        ingested = 0
+        while not self._stop.is_set() and (limit is None or ingested < limit):
+            papers = self.corpus.pending(self.batch_size)
+            if not papers:
+                break
+            uploaded = set()
+            with tracer.span("corpus.ingest", papers=len(papers)):
+                self.db_manager.upload_stream(self._records(papers), paper_ids=uploaded)
+            self.corpus.mark_ingested(sorted(uploaded))
+            self.corpus.mark_ingested([p.entry_id for p in papers if p.entry_id not in uploaded], state=-1)
+            ingested += len(uploaded)
+        logger.info(f"Ingested {ingested} papers. Corpus: {self.corpus.stats()}")
+        return ingested
+
+    # 본문을 가져온 논문만 다음 단계로 넘김 (PaperCache에 저장되므로 요청 처리 때는 다운로드 없음)
+    def _records(self, papers: list[CorpusPaper]):
+        for paper in papers:
+            if self._stop.is_set():
+                return
+            body = self.collector.get_body(paper)
+            if body:
+                yield ArxivCollector.normalize([ArxivCollector.to_record(paper, body)])[0]
+
+    def run_once(self):
+        self.sync_all()
+        self.ingest_pending()
+
+    def start(self, interval: float):
+        if self._thread is not None:
+            return
+        def loop():
+            while not self._stop.is_set():
+                try:
+                    self.run_once()
+                except Exception:
+                    logger.error("Corpus sync failed", exc_info=True)
+                self._stop.wait(interval)
+        self._thread = threading.Thread(target=loop, name="corpus-sync", daemon=True)
+        self._thread.start()
+        logger.info(f"Started background corpus sync for {self.categories} every {interval:.0f}s.")
+
+    def stop(self):
+        self._stop.set()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="로컬 arXiv 논문 목록 동기화와 사전 임베딩")
+    parser.add_argument("--categories", default=None, help="쉼표로 구분한 arXiv 분야 (기본: CORPUS_CATEGORIES)")
+    parser.add_argument("--loop", action="store_true", help="종료하지 않고 CORPUS_SYNC_INTERVAL마다 반복")
+    parser.add_argument("--no-ingest", action="store_true", help="메타데이터만 동기화하고 임베딩은 하지 않음")
+    args = parser.parse_args(argv)
+
+    from main import App
+    from src.utils.logger import setup_logger
+    setup_logger()
+    app = App()
+    app.configure_runtime()
+    categories = [c.strip() for c in (args.categories or ",".join(app.settings.CORPUS_CATEGORIES)).split(",") if c.strip()]
+    if app.corpus is None:
+        logger.error("CORPUS_ENABLED=false 입니다.")
+        return 1
+    sync = CorpusSync(
+        corpus=app.corpus,
+        collector=app.data_collector,
+        db_manager=app.db_manager,
+        categories=categories,
+        max_per_sync=app.settings.CORPUS_SYNC_MAX
+    )
+    if args.loop:
+        sync.start(app.settings.CORPUS_SYNC_INTERVAL)
+        sync._thread.join()
+        return 0
+    sync.sync_all()
+    if not args.no_ingest:
+        sync.ingest_pending()
+    print(app.corpus.stats())
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
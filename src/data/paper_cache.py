@@ -0,0 +1,139 @@
+# 논문 본문 디스크 캐시
+# 같은 논문(entry_id + 버전)을 다시 만나면 PDF 다운로드와 fitz 파싱을 건너뛰기 위함
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class PaperCache:
+    """
+    arXiv 논문의 참고문헌이 제거된 본문을 디스크에 저장하는 캐시
+    - 인덱스: sqlite (키 -> 본문 해시, 크기, 마지막 접근 시각)
+    - 본문: 내용 해시(sha256)를 파일 이름으로 저장 -> 같은 본문은 한 번만 저장됨
+    - 전체 크기가 max_bytes를 넘으면 가장 오래전에 사용된 항목부터 삭제 (LRU)
+    """
+    def __init__(self, cache_dir: str, max_bytes: int = 1024 * 1024 * 1024):
+        self.cache_dir = Path(cache_dir)
+        self.blob_dir = self.cache_dir / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        # 여러 스레드에서 동시에 접근할 수 있으므로 잠금 사용
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.cache_dir / "index.sqlite3", check_same_thread=False)
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                digest TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries(last_access);
+            CREATE TABLE IF NOT EXISTS counters (
+                name TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            """
+        )
+        self._conn.commit()
+        logger.debug(f"PaperCache initialized at '{self.cache_dir}' (max {self.max_bytes} bytes)")
+
+    # entry_id(http://arxiv.org/abs/2101.00001v2) -> 2101.00001v2
+    @staticmethod
+    def cache_key(entry_id: str) -> str:
+        return entry_id.rstrip("/").split("/abs/")[-1]
+
+    def _blob_path(self, digest: str) -> Path:
+        return self.blob_dir / digest[:2] / f"{digest}.txt"
+
+    def _incr(self, name: str, amount: int = 1):
+        self._conn.execute(
+            "INSERT INTO counters(name, value) VALUES(?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount)
+        )
+
+    def get(self, entry_id: str) -> str | None:
+        key = self.cache_key(entry_id)
+        with self._lock:
+            row = self._conn.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+            body = None
+            if row:
+                try:
+                    body = self._blob_path(row[0]).read_text(encoding="utf-8")
+                except OSError:
+                    # 본문 파일이 사라진 경우 인덱스도 정리
+                    logger.warning(f"Cache blob missing for '{key}'. Dropping entry.")
+                    self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            if body is None:
+                self._incr("misses")
+                self._conn.commit()
+                logger.debug(f"Paper cache miss: {key}")
+                return None
+            self._conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._incr("hits")
+            self._conn.commit()
+        logger.debug(f"Paper cache hit: {key}")
+        return body
+
+    def put(self, entry_id: str, body: str):
+        key = self.cache_key(entry_id)
+        data = body.encode("utf-8")
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        with self._lock:
+            if not path.exists():
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # 임시 파일에 쓴 뒤 교체하여 중간에 실패해도 깨진 파일이 남지 않도록 함
+                tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+                tmp_path.write_bytes(data)
+                os.replace(tmp_path, path)
+            old = self._conn.execute("SELECT digest FROM entries WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries(key, digest, size, last_access) VALUES(?, ?, ?, ?)",
+                (key, digest, len(data), time.time())
+            )
+            if old and old[0] != digest:
+                self._remove_blob_if_unused(old[0])
+            self._evict()
+            self._conn.commit()
+
+    def _remove_blob_if_unused(self, digest: str):
+        in_use = self._conn.execute("SELECT 1 FROM entries WHERE digest = ? LIMIT 1", (digest,)).fetchone()
+        if not in_use:
+            self._blob_path(digest).unlink(missing_ok=True)
+
+    # 전체 크기가 한도를 넘으면 마지막 접근 시각이 오래된 것부터 삭제
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute("SELECT key, digest, size FROM entries ORDER BY last_access ASC").fetchall()
+        evicted = 0
+        for key, digest, size in rows:
+            if total <= self.max_bytes:
+                break
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._remove_blob_if_unused(digest)
+            total -= size
+            evicted += 1
+        self._incr("evictions", evicted)
+        logger.info(f"Evicted {evicted} papers from cache (now {total} bytes).")
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {
+            "hits": counters.get("hits", 0),
+            "misses": counters.get("misses", 0),
+            "evictions": counters.get("evictions", 0),
+            "entries": entries,
+            "bytes": size,
+        }
@@ -0,0 +1,81 @@
+# PDF 본문 추출 엔진
+# fitz 파싱은 CPU를 많이 쓰고 GIL을 잡고 있으므로 별도 프로세스 풀에서 실행하여 요청 스레드를 막지 않도록 함
+import logging
+import multiprocessing
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# 대소문자 구분없이 References 제목 줄을 찾아 그 뒤(참고문헌)는 버리기 위함
+REFERENCES_PATTERN = re.compile(r"^\s*(references|bibliography)\s*$", re.IGNORECASE | re.MULTILINE)
+
+
+# 프로세스 풀에서 실행되므로 최상위 함수로 정의 (pickle 가능해야 함)
+# 페이지 텍스트를 리스트에 모아 한 번에 합치고, References 제목이 나오면 이후 페이지는 읽지 않음
+# 청킹 단계에서 페이지 번호를 알 수 있도록 페이지 사이에 \f(form feed)를 넣음
+def extract_pdf_text(data: bytes, max_pages: int = 50) -> str:
+    # pdf에서 텍스트만 추출 (파싱하는 프로세스에서만 불러옴)
+    import fitz
+    pages = []
+    with fitz.open(stream=data, filetype="pdf") as doc:
+        for index, page in enumerate(doc):
+            if index >= max_pages:
+                break
+            text = page.get_text()
+            match = REFERENCES_PATTERN.search(text)
+            if match:
+                pages.append(text[:match.start()])
+                break
+            pages.append(text)
+    return "\f".join(pages).strip()
+
+
+class PdfExtractor:
+    """
+    PDF 바이트 -> 참고문헌이 제거된 본문
+    - max_workers > 0 이면 프로세스 풀에서 파싱, 0이면 호출한 스레드에서 바로 파싱
+    - max_bytes보다 큰 문서는 파싱하지 않고, max_pages 이후 페이지는 읽지 않음
+    - timeout(초) 안에 파싱이 끝나지 않으면 TimeoutError 발생 (extract에 timeout을 넘기면 그 값을 사용)
+    - 호출한 스레드에서 파싱하는 경우(max_workers=0)에는 중간에 중단할 수 없으므로 max_pages로만 제한됨
+    """
+    def __init__(self, max_workers: int = 2, max_pages: int = 50, max_bytes: int = 30 * 1024 * 1024, timeout: float = 60.0):
+        self.max_workers = max_workers
+        self.max_pages = max_pages
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # 스레드가 많은 프로세스에서 fork하면 잠금 상태가 복사될 수 있으므로 spawn 사용
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def extract(self, data: bytes, timeout: float | None = None) -> str:
+        if len(data) > self.max_bytes:
+            raise ValueError(f"PDF size {len(data)} bytes exceeds limit of {self.max_bytes} bytes")
+        if self.max_workers <= 0:
+            return extract_pdf_text(data, self.max_pages)
+        try:
+            future = self._get_pool().submit(extract_pdf_text, data, self.max_pages)
+            return future.result(timeout=self.timeout if timeout is None else min(timeout, self.timeout))
+        except BrokenProcessPool:
+            # 작업 프로세스가 비정상 종료되면 풀을 새로 만들도록 초기화
+            logger.warning("PDF extraction process pool is broken. Recreating it.")
+            with self._lock:
+                self._pool = None
+            raise
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
@@ -0,0 +1,42 @@
+# 호스트별 요청 간격 제한
+# arXiv 이용 약관(API 요청은 3초에 1회 이하)을 지키면서 여러 스레드가 동시에 요청할 수 있도록 함
+import threading
+import time
+import logging
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+ARXIV_API_HOST = "export.arxiv.org"
+
+
+class HostRateLimiter:
+    """
+    호스트마다 마지막 요청 예약 시각을 기록해 두고, 다음 요청이 최소 간격 이후에 시작되도록 대기시킴
+    - intervals: 호스트별 최소 간격(초), 없으면 default_interval 사용
+    """
+    def __init__(self, default_interval: float = 1.0, intervals: dict[str, float] | None = None):
+        self.default_interval = default_interval
+        self.intervals = {ARXIV_API_HOST: 3.0}
+        if intervals:
+            self.intervals.update(intervals)
+        self._next_allowed: dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def host_of(url: str) -> str:
+        return urlparse(url).hostname or url
+
+    # 호스트 이름 또는 URL을 받아 요청 가능한 시각까지 대기
+    def wait(self, host_or_url: str):
+        host = self.host_of(host_or_url) if "://" in host_or_url else host_or_url
+        interval = self.intervals.get(host, self.default_interval)
+        # 잠금 안에서는 예약만 하고, 실제 대기는 잠금 밖에서 수행
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_allowed.get(host, now))
+            self._next_allowed[host] = start + interval
+        delay = start - now
+        if delay > 0:
+            logger.debug(f"Rate limiting '{host}': waiting {delay:.2f}s")
+            time.sleep(delay)
@@ -0,0 +1,313 @@
+# 프로세스 내부 벡터 인덱스 (Qdrant 서버 없이 사용)
+# 요청마다 새로 수집한 수백 개 청크만 검색하므로 네트워크 왕복과 서버 의존성 없이 NumPy로 직접 계산하기 위함
+# - 벡터: 디스크의 float32 행렬을 memmap으로 열어 복사 없이 사용 (정규화해서 저장 -> 코사인 = 내적)
+# - payload: sqlite (포인트 id, 논문 id, 제목, 날짜, 청크 본문, 페이지/절/위치, 청킹 방식 버전, IVF 군집 번호)
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.utils.chunking import CHUNKER_VERSION
+from src.utils.processing import TextProcessor
+from src.utils.tracing import tracer
+from .qdrant import VectorDB
+
+logger = logging.getLogger(__name__)
+
+# 한 번에 내적을 계산할 행 수 (메모리 사용량 제한)
+SEARCH_BLOCK_ROWS = 65536
+
+
+class LocalVectorDB(VectorDB):
+    """
+    VectorDB와 같은 setup_qdrant / upload_data / upload_stream / search_data / migrate_from 인터페이스를 가진 로컬 인덱스
+    - path/collection_name 폴더에 vectors.f32(memmap)와 payload.sqlite3로 저장되어 재시작 후에도 유지됨
+    - 기본은 전수(exact) 코사인 top-k
+    - nlist > 0이면 포인트가 nlist * 40개 이상 쌓였을 때 k-means로 IVF 군집을 만들고,
+      검색 시 가까운 nprobe개 군집만 계산 (논문 id로 범위를 제한한 검색은 항상 전수 계산)
+    - BM25 희소 벡터는 지원하지 않으므로 밀집 벡터 검색만 사용
+    - 청킹 방식(CHUNKER_VERSION)이 바뀌기 전에 저장된 청크는 검색에서 제외
+    """
+    def __init__(self, path: str, text_processer: TextProcessor, collection_name: str, vector_size: int,
+                 nlist: int = 0, nprobe: int = 8):
+        super().__init__(client=None, text_processer=text_processer, collection_name=collection_name, vector_size=vector_size)
+        self.root = Path(path) / collection_name
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self._conn = None
+        self._vectors = None
+        self._centroids = None
+        # 이전 청킹 방식으로 만든 청크가 남아 있는지 (없으면 전체 검색에 행 필터를 쓰지 않음)
+        self._stale = False
+        self._lock = threading.RLock()
+
+    # 저장 폴더를 열고 없으면 생성
+    def setup_qdrant(self, sparse: bool | None = None):
+        with self._lock:
+            if self._conn is not None:
+                return
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.root / "payload.sqlite3", check_same_thread=False)
+            self._conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS points (
+                    row INTEGER PRIMARY KEY,
+                    point_id TEXT UNIQUE NOT NULL,
+                    paper_id TEXT,
+                    title TEXT,
+                    date TEXT,
+                    chunk_text TEXT,
+                    cluster INTEGER,
+                    page INTEGER,
+                    section TEXT,
+                    chunk_offset INTEGER,
+                    chunker_version INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS points_paper ON points(paper_id);
+                CREATE INDEX IF NOT EXISTS points_cluster ON points(cluster);
+                CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+                """
+            )
+            # 청크 위치/청킹 방식 버전 정보가 없던 이전 버전의 인덱스에 열 추가
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(points)")}
+            for column, kind in (("page", "INTEGER"), ("section", "TEXT"), ("chunk_offset", "INTEGER"), ("chunker_version", "INTEGER")):
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE points ADD COLUMN {column} {kind}")
+            self._stale = self._conn.execute(
+                "SELECT 1 FROM points WHERE chunker_version IS NOT ? LIMIT 1", (CHUNKER_VERSION,)
+            ).fetchone() is not None
+            stored = self._conn.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+            if stored and int(stored[0]) != self.vector_size:
+                raise ValueError(f"Local index '{self.root}' has vector size {stored[0]}, expected {self.vector_size}")
+            self._conn.execute("INSERT OR IGNORE INTO meta(key, value) VALUES('dim', ?)", (str(self.vector_size),))
+            self._conn.commit()
+            self._open_vectors(max(self.count(), 1024))
+            centroids_path = self.root / "centroids.npy"
+            if centroids_path.exists():
+                self._centroids = np.load(centroids_path)
+            logger.info(f"Opened local vector index '{self.root}' ({self.count()} points).")
+
+    def count(self) -> int:
+        row = self._conn.execute("SELECT MAX(row) FROM points").fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    # vectors.f32를 최소 capacity행 크기로 열기 (부족하면 파일 크기를 두 배씩 늘림)
+    def _open_vectors(self, capacity: int):
+        path = self.root / "vectors.f32"
+        row_bytes = self.vector_size * 4
+        current = path.stat().st_size // row_bytes if path.exists() else 0
+        if current < capacity:
+            new_capacity = max(capacity, current * 2, 1024)
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            with open(path, "ab") as f:
+                f.truncate(new_capacity * row_bytes)
+            current = new_capacity
+        if self._vectors is None or self._vectors.shape[0] != current:
+            self._vectors = np.memmap(path, dtype=np.float32, mode="r+", shape=(current, self.vector_size))
+
+    def has_sparse(self) -> bool:
+        return False
+
+    # Qdrant 컬렉션의 포인트(벡터 + payload)를 비어 있는 로컬 인덱스로 복사 (임베딩을 다시 계산하지 않음)
+    # 로컬 인덱스는 BM25를 사용하지 않으므로 희소 벡터는 버림
+    def migrate_from(self, source_collection: str, batch_size: int = 256, source_client=None) -> int:
+        if source_client is None:
+            raise ValueError("로컬 인덱스로 복사하려면 원본 Qdrant 클라이언트(source_client)가 필요합니다.")
+        self.setup_qdrant()
+        if self.count():
+            raise ValueError(f"대상 로컬 인덱스 '{self.root}'가 비어 있지 않습니다.")
+        copied = 0
+        offset = None
+        while True:
+            records, offset = source_client.scroll(
+                collection_name=source_collection,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if records:
+                self._upsert([
+                    SimpleNamespace(id=r.id, vector=self.dense_vector(r.vector), payload=r.payload or {})
+                    for r in records
+                ])
+                copied += len(records)
+                logger.info(f"Copied {copied} points from '{source_collection}' to '{self.root}'.")
+            if offset is None:
+                break
+        return copied
+
+    # 희소 벡터가 있는 컬렉션은 {"": 밀집 벡터, "bm25": 희소 벡터} 형태로 반환됨
+    @staticmethod
+    def dense_vector(vector):
+        if isinstance(vector, dict):
+            return vector[""] if "" in vector else next(v for v in vector.values() if isinstance(v, list))
+        return vector
+
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        if not ids:
+            return set()
+        with self._lock:
+            placeholders = ",".join("?" * len(ids))
+            rows = self._conn.execute(f"SELECT point_id FROM points WHERE point_id IN ({placeholders})", ids).fetchall()
+        return {row[0] for row in rows}
+
+    @staticmethod
+    def _normalize(matrix: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+    # 포인트 저장: 같은 포인트 id는 기존 행을 덮어쓰고, 새 포인트는 끝에 추가
+    # 한 배치 안에 같은 id가 여러 번 있으면 마지막 것만 저장 (행이 따로 잡혀 payload 없는 벡터가 남지 않도록)
+    def _upsert(self, points: list):
+        points = list({str(p.id): p for p in points}.values())
+        if not points:
+            return
+        with self._lock, tracer.span("local_index.upsert", points=len(points)):
+            vectors = self._normalize(np.asarray([p.vector for p in points], dtype=np.float32))
+            existing = dict(self._conn.execute(
+                f"SELECT point_id, row FROM points WHERE point_id IN ({','.join('?' * len(points))})",
+                [str(p.id) for p in points]
+            ).fetchall())
+            next_row = self.count()
+            rows = []
+            for point in points:
+                if str(point.id) in existing:
+                    rows.append(existing[str(point.id)])
+                else:
+                    rows.append(next_row)
+                    next_row += 1
+            self._open_vectors(next_row)
+            self._vectors[rows] = vectors
+            self._vectors.flush()
+            clusters = self._assign(vectors) if self._centroids is not None else [None] * len(points)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO points(row, point_id, paper_id, title, date, chunk_text, cluster, page, section, chunk_offset,"
+                " chunker_version) VALUES(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (row, str(p.id), p.payload.get("paper_id"), p.payload.get("title"), p.payload.get("date"),
+                     p.payload.get("chunk_text"), None if cluster is None else int(cluster),
+                     p.payload.get("page"), p.payload.get("section"), p.payload.get("offset"),
+                     p.payload.get("chunker_version"))
+                    for row, p, cluster in zip(rows, points, clusters)
+                ]
+            )
+            self._conn.commit()
+            # 옮겨 온 포인트에 이전 방식의 청크가 섞여 있을 수 있음
+            self._stale = self._stale or any(p.payload.get("chunker_version") != CHUNKER_VERSION for p in points)
+            if self.nlist and self._centroids is None and next_row >= self.nlist * 40:
+                self.build_ivf()
+
+    # 가장 가까운 군집 번호
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        return np.argmax(vectors @ self._centroids.T, axis=1)
+
+    # k-means(코사인)로 IVF 군집 중심을 학습하고 모든 포인트의 군집 번호 갱신
+    def build_ivf(self, iterations: int = 10, sample_size: int = 50000, seed: int = 0):
+        with self._lock, tracer.span("local_index.build_ivf", nlist=self.nlist):
+            count = self.count()
+            rng = np.random.default_rng(seed)
+            sample = self._vectors[np.sort(rng.choice(count, size=min(count, sample_size), replace=False))]
+            centroids = sample[rng.choice(len(sample), size=self.nlist, replace=False)].copy()
+            for _ in range(iterations):
+                labels = np.argmax(sample @ centroids.T, axis=1)
+                for c in range(self.nlist):
+                    members = sample[labels == c]
+                    if len(members):
+                        centroids[c] = members.mean(axis=0)
+                centroids = self._normalize(centroids)
+            self._centroids = centroids
+            np.save(self.root / "centroids.npy", centroids)
+            for start in range(0, count, SEARCH_BLOCK_ROWS):
+                end = min(start + SEARCH_BLOCK_ROWS, count)
+                labels = self._assign(self._vectors[start:end])
+                self._conn.executemany(
+                    "UPDATE points SET cluster = ? WHERE row = ?",
+                    [(int(label), row) for row, label in zip(range(start, end), labels)]
+                )
+            self._conn.commit()
+            logger.info(f"Built IVF index with {self.nlist} clusters over {count} points.")
+
+    # 검색 대상 행: 논문 id 범위 > IVF 군집 > 전체 순서로 결정 (None이면 전체)
+    # 이전 청킹 방식의 청크가 남아 있으면 현재 버전의 행만 남김
+    def _candidate_rows(self, queries: np.ndarray, paper_ids) -> np.ndarray | None:
+        version = " AND chunker_version = ?" if self._stale else ""
+        version_args = [CHUNKER_VERSION] if self._stale else []
+        if paper_ids:
+            ids = list(paper_ids)
+            rows = self._conn.execute(
+                f"SELECT row FROM points WHERE paper_id IN ({','.join('?' * len(ids))}){version}", ids + version_args
+            ).fetchall()
+            return np.array(sorted(r[0] for r in rows), dtype=np.int64)
+        if self._centroids is not None:
+            probes = np.argsort(-(queries @ self._centroids.T), axis=1)[:, :self.nprobe]
+            clusters = sorted({int(c) for c in probes.ravel()})
+            rows = self._conn.execute(
+                f"SELECT row FROM points WHERE cluster IN ({','.join('?' * len(clusters))}){version}", clusters + version_args
+            ).fetchall()
+            return np.array(sorted(r[0] for r in rows), dtype=np.int64)
+        if self._stale:
+            rows = self._conn.execute("SELECT row FROM points WHERE chunker_version = ?", version_args).fetchall()
+            return np.array(sorted(r[0] for r in rows), dtype=np.int64)
+        return None
+
+    # 질의별 (행 번호, 점수) top-k: 블록 단위로 내적을 계산하고 블록마다 상위 k개만 남김
+    def _top_k(self, queries: np.ndarray, rows: np.ndarray | None, k: int) -> list[list[tuple[int, float]]]:
+        total = self.count() if rows is None else len(rows)
+        best_rows = np.empty((len(queries), 0), dtype=np.int64)
+        best_scores = np.empty((len(queries), 0), dtype=np.float32)
+        for start in range(0, total, SEARCH_BLOCK_ROWS):
+            end = min(start + SEARCH_BLOCK_ROWS, total)
+            block_rows = np.arange(start, end) if rows is None else rows[start:end]
+            # 필터가 없으면 memmap 슬라이스를 그대로 사용 (복사 없음)
+            block = self._vectors[start:end] if rows is None else self._vectors[block_rows]
+            scores = queries @ block.T
+            best_rows = np.concatenate([best_rows, np.broadcast_to(block_rows, scores.shape)], axis=1)
+            best_scores = np.concatenate([best_scores, scores], axis=1)
+            if best_scores.shape[1] > k:
+                keep = np.argpartition(-best_scores, k - 1, axis=1)[:, :k]
+                best_rows = np.take_along_axis(best_rows, keep, axis=1)
+                best_scores = np.take_along_axis(best_scores, keep, axis=1)
+        results = []
+        for q_rows, q_scores in zip(best_rows, best_scores):
+            order = np.argsort(-q_scores)
+            results.append([(int(q_rows[i]), float(q_scores[i])) for i in order])
+        return results
+
+    def _query_batch(self, texts: list[str], vectors, paper_ids, keywords, limit: int) -> list:
+        if self._conn is None:
+            self.setup_qdrant()
+        with self._lock, tracer.span("local_index.search", queries=len(texts)):
+            queries = self._normalize(np.asarray(vectors, dtype=np.float32))
+            top = self._top_k(queries, self._candidate_rows(queries, paper_ids), limit)
+            needed = sorted({row for hits in top for row, _ in hits})
+            payloads = {}
+            if needed:
+                for row, point_id, paper_id, title, date, chunk_text, page, section, offset, version in self._conn.execute(
+                    "SELECT row, point_id, paper_id, title, date, chunk_text, page, section, chunk_offset, chunker_version FROM points"
+                    f" WHERE row IN ({','.join('?' * len(needed))})",
+                    needed
+                ):
+                    payloads[row] = (point_id, {
+                        "paper_id": paper_id, "title": title, "date": date, "chunk_text": chunk_text,
+                        "page": page, "section": section, "offset": offset, "chunker_version": version
+                    })
+        # Qdrant 검색 결과와 같은 모양(id, payload, score)으로 맞춰 VectorDB의 RRF/정리 로직을 그대로 사용
+        return [
+            [SimpleNamespace(id=payloads[row][0], payload=payloads[row][1], score=score) for row, score in hits if row in payloads]
+            for hits in top
+        ]
+
+    def close(self):
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+                self._vectors = None
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
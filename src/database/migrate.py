@@ -0,0 +1,73 @@
+"""
+기존 Qdrant 컬렉션을 다른 저장 프로필의 새 컬렉션 또는 로컬 인덱스(VECTOR_BACKEND=local)로 복사
+임베딩을 다시 계산하지 않고 저장된 벡터와 payload를 그대로 옮김
+
+사용 예:
+    python -m src.database.migrate --source papers --target papers_int8 --profile int8
+    python -m src.database.migrate --source papers --target papers --backend local   # LOCAL_INDEX_DIR/papers 로 복사
+복사가 끝나면 .env의 QDRANT_COLLECTION_NAME을 새 컬렉션 이름으로 바꾸면 됨
+"""
+import argparse
+import logging
+import sys
+
+from configs.settings import Settings
+from src.database.qdrant import VectorDB
+from src.database.local_index import LocalVectorDB
+from src.database.profiles import COLLECTION_PROFILES
+from src.utils.logger import setup_logger
+
+logger = logging.getLogger(__name__)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Qdrant 컬렉션을 새 저장 프로필로 다시 만들기")
+    parser.add_argument("--source", default=None, help="원본 컬렉션 (기본: QDRANT_COLLECTION_NAME)")
+    parser.add_argument("--target", required=True, help="새로 만들 컬렉션 이름")
+    parser.add_argument("--backend", default="qdrant", choices=["qdrant", "local"], help="복사할 대상 저장소")
+    parser.add_argument("--profile", default=None, choices=list(COLLECTION_PROFILES), help="새 컬렉션의 저장 프로필 (--backend qdrant일 때 필수)")
+    parser.add_argument("--batch-size", type=int, default=256, help="한 번에 복사할 포인트 수")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    if args.backend == "qdrant" and not args.profile:
+        logger.error("--backend qdrant 에는 --profile 이 필요합니다.")
+        return 2
+    setup_logger()
+    settings = Settings()
+    source = args.source or settings.COLLECTION_NAME
+    client = settings.qdrant_client
+    if not client.collection_exists(collection_name=source):
+        logger.error(f"Source collection '{source}' does not exist.")
+        return 1
+    vector_size = client.get_collection(collection_name=source).config.params.vectors.size
+    if args.backend == "local":
+        target = LocalVectorDB(
+            path=settings.LOCAL_INDEX_DIR,
+            text_processer=None,
+            collection_name=args.target,
+            vector_size=vector_size,
+            nlist=settings.LOCAL_INDEX_NLIST
+        )
+        copied = target.migrate_from(source, batch_size=args.batch_size, source_client=client)
+        target.close()
+        print(f"Copied {copied} points from '{source}' to local index '{target.root}'.")
+        print(f"Set VECTOR_BACKEND=local and QDRANT_COLLECTION_NAME={args.target} to use it.")
+        return 0
+    target = VectorDB(
+        client=client,
+        text_processer=None,
+        collection_name=args.target,
+        vector_size=vector_size,
+        profile=args.profile
+    )
+    copied = target.migrate_from(source, batch_size=args.batch_size)
+    print(f"Copied {copied} points from '{source}' to '{args.target}' (profile: {args.profile}).")
+    print(f"Set QDRANT_COLLECTION_NAME={args.target} and QDRANT_COLLECTION_PROFILE={args.profile} to use it.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
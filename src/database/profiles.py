@@ -0,0 +1,98 @@
+# Qdrant 컬렉션 저장 방식 프로필
+# 컬렉션이 커질수록 Qdrant 노드의 메모리가 한계가 되므로, 양자화/디스크 저장/HNSW 설정을 프로필 이름 하나로 선택하기 위함
+import logging
+
+logger = logging.getLogger(__name__)
+
+# quantization: None | "int8" | "binary"
+# on_disk: 원본 float32 벡터를 디스크(mmap)에 저장, on_disk_payload: payload(청크 본문)를 디스크에 저장
+# rescore/oversampling: 양자화 벡터로 후보를 oversampling배 더 뽑은 뒤 원본 벡터로 다시 점수 계산
+# hnsw_m/hnsw_ef_construct: None이면 Qdrant 기본값 사용
+COLLECTION_PROFILES = {
+    # 기존 동작: 메모리의 float32 벡터, 기본 HNSW
+    "default": {
+        "quantization": None, "on_disk": False, "on_disk_payload": False,
+        "hnsw_m": None, "hnsw_ef_construct": None, "rescore": False, "oversampling": 1.0,
+    },
+    # int8 스칼라 양자화 벡터만 메모리에 두고 원본은 디스크에서 재점수 (메모리 약 1/4)
+    "int8": {
+        "quantization": "int8", "on_disk": True, "on_disk_payload": True,
+        "hnsw_m": 16, "hnsw_ef_construct": 100, "rescore": True, "oversampling": 2.0,
+    },
+    # 1bit 이진 양자화 (메모리 약 1/32). 차원이 큰 모델(>= 768)에서 정확도 손실이 작음
+    "binary": {
+        "quantization": "binary", "on_disk": True, "on_disk_payload": True,
+        "hnsw_m": 16, "hnsw_ef_construct": 100, "rescore": True, "oversampling": 3.0,
+    },
+    # 양자화 없이 벡터/payload 모두 디스크에 두고 HNSW 연결 수를 줄임 (작은 노드용)
+    "compact": {
+        "quantization": None, "on_disk": True, "on_disk_payload": True,
+        "hnsw_m": 8, "hnsw_ef_construct": 64, "rescore": False, "oversampling": 1.0,
+    },
+}
+
+
+def get_profile(name: str) -> dict:
+    try:
+        return COLLECTION_PROFILES[name]
+    except KeyError:
+        raise ValueError(f"알 수 없는 컬렉션 프로필 '{name}'. 사용 가능: {', '.join(COLLECTION_PROFILES)}")
+
+
+# create_collection에 넘길 인자 (vectors_config, hnsw_config, quantization_config, on_disk_payload)
+# sparse=True이면 BM25 희소 벡터 설정도 추가 (IDF는 Qdrant가 컬렉션 통계로 계산)
+def collection_params(profile: dict, vector_size: int, sparse: bool = False) -> dict:
+    from qdrant_client import models
+    from src.utils.sparse import SPARSE_VECTOR_NAME
+    params = {
+        "vectors_config": models.VectorParams(
+            size=vector_size,
+            distance=models.Distance.COSINE,
+            on_disk=profile["on_disk"]
+        ),
+        "on_disk_payload": profile["on_disk_payload"],
+    }
+    if sparse:
+        params["sparse_vectors_config"] = {
+            SPARSE_VECTOR_NAME: models.SparseVectorParams(
+                index=models.SparseIndexParams(on_disk=profile["on_disk"]),
+                modifier=models.Modifier.IDF
+            )
+        }
+    if profile["hnsw_m"] or profile["hnsw_ef_construct"]:
+        params["hnsw_config"] = models.HnswConfigDiff(m=profile["hnsw_m"], ef_construct=profile["hnsw_ef_construct"])
+    if profile["quantization"] == "int8":
+        params["quantization_config"] = models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, quantile=0.99, always_ram=True)
+        )
+    elif profile["quantization"] == "binary":
+        params["quantization_config"] = models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    return params
+
+
+# 검색 시 사용할 SearchParams (양자화 프로필이 아니면 None)
+def search_params(profile: dict):
+    if not profile["quantization"]:
+        return None
+    from qdrant_client import models
+    return models.SearchParams(
+        quantization=models.QuantizationSearchParams(
+            rescore=profile["rescore"],
+            oversampling=profile["oversampling"]
+        )
+    )
+
+
+# 프로필별 메모리(RAM) 사용량 추정치 (byte): 벡터 + 양자화 벡터 + HNSW 링크
+# Qdrant 내부 구조를 단순화한 값이므로 프로필 간 비교용으로만 사용
+def estimate_memory(profile: dict, vector_size: int, points: int) -> int:
+    total = 0 if profile["on_disk"] else points * vector_size * 4
+    if profile["quantization"] == "int8":
+        total += points * vector_size
+    elif profile["quantization"] == "binary":
+        total += points * ((vector_size + 7) // 8)
+    # 기본 m=16, 레벨 0은 2*m개 링크, 링크당 4byte
+    total += points * 2 * (profile["hnsw_m"] or 16) * 4
+    return total
@@ -1,72 +1,316 @@
 # Qdrant 연결 - > 외부 데이터 저장, 임베딩 벡터 저장, 유사도 측정 목적
-from qdrant_client import models,QdrantClient
+# qdrant_client는 import 비용이 커서 실제로 사용하는 메서드 안에서 불러옴
+from typing import TYPE_CHECKING
 from src.utils.processing import TextProcessor
+from src.utils.pipeline import buffered
+from src.utils.tracing import tracer
+from src.utils.sparse import SPARSE_VECTOR_NAME
+from src.utils.chunking import CHUNKER_VERSION
+from .profiles import get_profile, collection_params, search_params
 import logging
 
 logger = logging.getLogger(__name__)
 
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+
 class VectorDB:
     # Qdrant 컬렉션 생성을 위한 클라이언트와, 컬렉션 이름, 벡터 크기를 초기화
-    def __init__(self,client:QdrantClient,text_processer:TextProcessor,collection_name: str,vector_size: int):
+    # profile: 새 컬렉션을 만들 때 사용할 저장 방식 (src/database/profiles.py의 COLLECTION_PROFILES)
+    def __init__(self,client: "QdrantClient",text_processer:TextProcessor,collection_name: str,vector_size: int,profile: str = "default"):
         self.client = client
         self.collection_name = collection_name
         self.vector_size = vector_size
         self.text_processer = text_processer
+        self.profile_name = profile
+        self.profile = get_profile(profile)
+        # 컬렉션에 BM25 희소 벡터가 설정돼 있는지 (처음 확인할 때 조회)
+        self._has_sparse = None
+
+    # 희소 벡터 없이 만들어진 기존 컬렉션은 밀집 벡터 검색만 사용
+    def has_sparse(self) -> bool:
+        if self.text_processer is None or self.text_processer.sparse_encoder is None:
+            return False
+        if self._has_sparse is None:
+            try:
+                info = self.client.get_collection(collection_name=self.collection_name)
+            except Exception as e:
+                logger.warning(f"Failed to read config of '{self.collection_name}': {e}")
+                return False
+            self._has_sparse = SPARSE_VECTOR_NAME in (info.config.params.sparse_vectors or {})
+            if not self._has_sparse:
+                logger.info(f"Collection '{self.collection_name}' has no sparse vectors. Using dense search only.")
+        return self._has_sparse
 
     # 컬렉션 있는지 확인하고 없으면 생성
-    def setup_qdrant(self):
+    # sparse: 희소 벡터 설정 여부 (None이면 text_processer에 희소 벡터 인코더가 있는지로 결정)
+    def setup_qdrant(self, sparse: bool | None = None):
+        if sparse is None:
+            sparse = self.text_processer is not None and self.text_processer.sparse_encoder is not None
         try:
             # 컬렉션 존재 여부 확인
+            self._has_sparse = None
             if not self.client.collection_exists(collection_name=self.collection_name):
                 self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config= models.VectorParams(size=self.vector_size,distance=models.Distance.COSINE)
-            )
-                logger.info(f"Collection '{self.collection_name}' created successfully.")
+                    **collection_params(self.profile, self.vector_size, sparse=sparse)
+                )
+                self.create_payload_indexes()
+                logger.info(f"Collection '{self.collection_name}' created successfully (profile: {self.profile_name}).")
             else:
                 logger.info(f"Using existing collection: '{self.collection_name}'")
         except Exception as e:
+            # 여러 요청이 동시에 컬렉션을 만들려고 한 경우에는 이미 생성된 컬렉션을 사용
+            if self.client.collection_exists(collection_name=self.collection_name):
+                logger.info(f"Collection '{self.collection_name}' was created by another request.")
+                return
             logger.error(f"Failed to setup collection '{self.collection_name}'", exc_info=True)
     
+    # 요청별 검색 범위 필터(paper_id), 청킹 방식 버전, 날짜 조건에 쓰이는 payload 인덱스 생성
+    def create_payload_indexes(self, collection_name: str | None = None):
+        from qdrant_client import models
+        collection_name = collection_name or self.collection_name
+        for field, schema in (
+            ("paper_id", models.PayloadSchemaType.KEYWORD),
+            ("chunker_version", models.PayloadSchemaType.INTEGER),
+            ("date", models.PayloadSchemaType.DATETIME),
+        ):
+            try:
+                self.client.create_payload_index(collection_name=collection_name, field_name=field, field_schema=schema)
+            except Exception as e:
+                logger.warning(f"Failed to create payload index '{field}' on '{collection_name}': {e}")
+
+    # 기존 컬렉션의 포인트(벡터 + payload)를 현재 프로필로 만든 새 컬렉션(self.collection_name)으로 복사
+    # 임베딩을 다시 계산하지 않으므로 벡터 크기와 임베딩 모델은 같아야 함
+    # source_client: 원본 컬렉션이 있는 Qdrant 클라이언트 (기본: 대상과 같은 클라이언트)
+    def migrate_from(self, source_collection: str, batch_size: int = 256, source_client: "QdrantClient | None" = None) -> int:
+        from qdrant_client import models
+        source_client = source_client or self.client
+        if source_client is self.client and source_collection == self.collection_name:
+            raise ValueError("원본과 대상 컬렉션 이름이 같습니다.")
+        if self.client.collection_exists(collection_name=self.collection_name):
+            raise ValueError(f"대상 컬렉션 '{self.collection_name}'이 이미 존재합니다.")
+        # 원본에 BM25 희소 벡터가 있으면 새 컬렉션에도 같이 옮김
+        source_info = source_client.get_collection(collection_name=source_collection)
+        self.setup_qdrant(sparse=SPARSE_VECTOR_NAME in (source_info.config.params.sparse_vectors or {}))
+        copied = 0
+        offset = None
+        while True:
+            records, offset = source_client.scroll(
+                collection_name=source_collection,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True
+            )
+            if records:
+                with tracer.span("qdrant.migrate", points=len(records)):
+                    self.client.upsert(
+                        collection_name=self.collection_name,
+                        wait=True,
+                        points=[models.PointStruct(id=r.id, vector=r.vector, payload=r.payload) for r in records]
+                    )
+                copied += len(records)
+                logger.info(f"Copied {copied} points from '{source_collection}' to '{self.collection_name}'.")
+            if offset is None:
+                break
+        return copied
+
+    # 주어진 포인트 id 중 컬렉션에 이미 저장된 id만 반환
+    def existing_ids(self, ids: list[str]) -> set[str]:
+        if not ids:
+            return set()
+        try:
+            records = self.client.retrieve(
+                collection_name=self.collection_name,
+                ids=ids,
+                with_payload=False,
+                with_vectors=False
+            )
+        except Exception as e:
+            # 조회에 실패하면 전부 새로 임베딩 (upsert라 중복 포인트는 생기지 않음)
+            logger.warning(f"Failed to check existing points in '{self.collection_name}'", exc_info=True)
+            return set()
+        return {str(record.id) for record in records}
+
+    # 포인트 한 배치 저장 (다른 저장소 백엔드는 이 메서드를 바꿔서 사용)
+    def _upsert(self, points: list):
+        with tracer.span("qdrant.upsert", points=len(points)):
+            self.client.upsert(
+                collection_name=self.collection_name,
+                wait=True,
+                points=points
+            )
+
     # 수집한 외부 데이터 qdrant에 업로드
     # 데이터가 많을 경우 생길 수 있는 메모리 문제를 방지하기 위해 배치 단위로 업로드
     def upload_data(self,data,batch_size: int = 500):
         # qdrant 컬렉션 구조에 맞게 전처리
-        collection = self.text_processer.process_for_qdrant(data)
+        collection = self.text_processer.process_for_qdrant(data, existing_ids=self.existing_ids, sparse=self.has_sparse())
         if not collection:
-            logger.warning("No data to upload after processing.")
+            logger.warning("No new data to upload after processing.")
             return
         try:
             for i in range(0, len(collection), batch_size):
-                batch = collection[i:i + batch_size]
-                self.client.upsert(
-                    collection_name=self.collection_name,
-                    wait=True,
-                    points=batch
-                )
+                self._upsert(collection[i:i + batch_size])
             logger.info(f"Successfully uploaded {len(collection)} points.")
         except Exception as e:
             logger.error(f"Failed to upload data to collection '{self.collection_name}'", exc_info=True)
             raise RuntimeError(f"데이터 업로드 실패: {e}")
 
-    # 벡터 유사도가 가장 높은 데이터 찾기 (RAG)
-    def search_data(self, claim_evidence, limit=5) -> list:
-        logger.info(f"Searching for similar data in '{self.collection_name}'")
+    # 수집 -> 청킹/임베딩 -> 업로드를 단계별 스레드로 겹쳐서 실행
+    # 각 단계 사이에는 크기가 제한된 버퍼만 두기 때문에 전체 논문/포인트를 한 번에 메모리에 올리지 않음
+    # papers: 논문 dict를 하나씩 반환하는 iterable (예: ArxivCollector.iter_collect)
+    # paper_ids: 전달하면 이번 요청에서 다룬 논문 id(이미 저장돼 있던 논문 포함)를 모음 -> search_data의 검색 범위로 사용
+    def upload_stream(self,papers,batch_size: int = 500,paper_buffer: int = 4,point_buffer: int = 2,paper_ids: set | None = None) -> int:
+        if paper_ids is not None:
+            papers = self._track_ids(papers, paper_ids)
+        paper_stream = buffered(papers, maxsize=paper_buffer, name="collect")
+        point_stream = buffered(
+            self.text_processer.iter_points(paper_stream, existing_ids=self.existing_ids, sparse=self.has_sparse()),
+            maxsize=point_buffer,
+            name="embed"
+        )
+        uploaded = 0
+        try:
+            for points in point_stream:
+                for i in range(0, len(points), batch_size):
+                    self._upsert(points[i:i + batch_size])
+                uploaded += len(points)
+                logger.debug(f"Uploaded {len(points)} points ({uploaded} total).")
+        except Exception as e:
+            logger.error(f"Failed to upload data to collection '{self.collection_name}'", exc_info=True)
+            raise RuntimeError(f"데이터 업로드 실패: {e}")
+        finally:
+            point_stream.close()
+        if not uploaded:
+            logger.warning("No new data to upload after processing.")
+        else:
+            logger.info(f"Successfully uploaded {uploaded} points.")
+        return uploaded
+
+    @staticmethod
+    def _track_ids(papers, paper_ids: set):
+        for paper in papers:
+            paper_ids.add(paper['id'])
+            yield paper
+
+    # 검색 대상을 현재 청킹 방식으로 만든 청크(paper_ids를 주면 그 논문들의 청크)로 제한하는 필터
+    # 청킹 방식이 바뀌기 전에 저장된 청크는 포인트 id가 달라 그대로 남아 있으므로 검색에서 제외
+    @staticmethod
+    def paper_filter(paper_ids=None):
+        from qdrant_client import models
+        must = [models.FieldCondition(key="chunker_version", match=models.MatchValue(value=CHUNKER_VERSION))]
+        if paper_ids:
+            must.append(models.FieldCondition(key="paper_id", match=models.MatchAny(any=list(paper_ids))))
+        return models.Filter(must=must)
 
-        query_vector = self.text_processer.claim_evidence_embedding(claim_evidence)
-        # qdrant의 search api를 사용하여 유사도 검색 수행
-        search_results = self.client.search(
-            collection_name=self.collection_name,
-            query_vector = query_vector,
+    # 여러 질의의 검색 결과 순위를 Reciprocal Rank Fusion으로 합침: 점수 = Σ 1 / (k + 순위)
+    # 반환: [(포인트, 점수, 이 포인트를 찾은 질의 번호 목록)] 점수 내림차순
+    @staticmethod
+    def rrf_merge(rankings: list, k: int = 60) -> list[tuple]:
+        scores, points, matched = {}, {}, {}
+        for query_index, ranking in enumerate(rankings):
+            for rank, point in enumerate(ranking):
+                key = str(point.id)
+                scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+                points.setdefault(key, point)
+                matched.setdefault(key, []).append(query_index)
+        return [(points[key], scores[key], matched[key]) for key in sorted(scores, key=scores.get, reverse=True)]
+
+    # 질의 하나에 대한 검색 요청: 희소 벡터가 있으면 밀집/키워드(BM25) 검색 결과를 Qdrant에서 RRF로 합침
+    def _query_request(self, vector, sparse_query, query_filter, limit: int):
+        from qdrant_client import models
+        params = search_params(self.profile)
+        if not sparse_query or not sparse_query[0]:
+            return models.QueryRequest(query=vector, filter=query_filter, params=params, limit=limit, with_payload=True)
+        indices, values = sparse_query
+        return models.QueryRequest(
+            prefetch=[
+                models.Prefetch(query=vector, filter=query_filter, params=params, limit=limit),
+                models.Prefetch(
+                    query=models.SparseVector(indices=indices, values=values),
+                    using=SPARSE_VECTOR_NAME,
+                    filter=query_filter,
+                    limit=limit
+                ),
+            ],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            filter=query_filter,
             limit=limit,
             with_payload=True
         )
-        logger.info(f"Found {len(search_results)} search results.")
-        id_and_chunks = [
-            {
-                "id": result.payload.get('paper_id'),
-                "chunk_text": result.payload.get('chunk_text')
-            }
-            for result in search_results
+
+    # 주장/근거와 가장 관련 있는 청크 찾기 (RAG)
+    # - 주장과 각 근거를 따로 임베딩하고, 질의마다 밀집 + 키워드(BM25) 검색을 한 번의 배치 요청으로 실행
+    # - 질의별 결과를 RRF로 합친 뒤 논문당 최대 per_paper개 청크만 남김
+    # paper_ids를 주면 해당 논문들 안에서만 검색 (여러 사용자가 같은 컬렉션을 공유해도 다른 요청의 논문은 제외)
+    # keywords는 키워드 검색 질의에 추가 (한국어 주장과 영어 논문 사이의 단어 불일치를 보완)
+    def search_data(self, claim_evidence, limit=5, paper_ids=None, keywords=None, per_paper: int = 1, candidates: int = 4) -> list:
+        return self.search_claims([claim_evidence or {}], limit, paper_ids, keywords, per_paper, candidates)[0]
+
+    # 주장 여러 개를 한 번에 검색 -> 주장별 검색 결과 목록
+    # 모든 주장의 질의를 한 번에 임베딩하고 한 번의 배치 요청으로 검색한 뒤, 주장마다 따로 RRF로 합침
+    def search_claims(self, claims: list[dict], limit=5, paper_ids=None, keywords=None, per_paper: int = 1, candidates: int = 4) -> list[list]:
+        logger.info(f"Searching for similar data in '{self.collection_name}' for {len(claims)} claims")
+        if paper_ids is not None and not paper_ids:
+            logger.warning("No papers were collected for this request. Skipping search.")
+            return [[] for _ in claims]
+        claim_texts = [self.text_processer.query_texts(claim) for claim in claims]
+        texts = [text for group in claim_texts for text in group]
+        if not texts:
+            logger.warning("No claim/evidence text to search with.")
+            return [[] for _ in claims]
+
+        vectors = self.text_processer.query_embeddings(texts)
+        rankings = self._query_batch(texts, vectors, paper_ids, keywords, limit * candidates)
+        results, start = [], 0
+        for group in claim_texts:
+            end = start + len(group)
+            results.append(self.format_results(self.rrf_merge(rankings[start:end]), group, limit, per_paper) if group else [])
+            start = end
+        return results
+
+    # 질의별 검색 결과 목록 (각 결과는 id, payload 속성을 가진 포인트)을 한 번의 배치 요청으로 가져옴
+    def _query_batch(self, texts: list[str], vectors, paper_ids, keywords, limit: int) -> list:
+        encoder = self.text_processer.sparse_encoder if self.has_sparse() else None
+        keyword_text = " ".join(keywords or [])
+        query_filter = self.paper_filter(paper_ids)
+        requests = [
+            self._query_request(
+                vector.tolist(),
+                encoder.encode_query(f"{text} {keyword_text}") if encoder else None,
+                query_filter,
+                limit
+            )
+            for text, vector in zip(texts, vectors)
         ]
-        return id_and_chunks
\ No newline at end of file
+        with tracer.span("qdrant.search", queries=len(requests), hybrid=encoder is not None):
+            responses = self.client.query_batch_points(collection_name=self.collection_name, requests=requests)
+        return [response.points for response in responses]
+
+    # RRF로 합친 결과에서 논문당 최대 per_paper개 청크만 남겨 limit개 반환
+    @staticmethod
+    def format_results(fused: list[tuple], texts: list[str], limit: int, per_paper: int) -> list:
+        results = []
+        per_paper_count = {}
+        for point, score, matched in fused:
+            paper_id = point.payload.get('paper_id')
+            if per_paper_count.get(paper_id, 0) >= per_paper:
+                continue
+            per_paper_count[paper_id] = per_paper_count.get(paper_id, 0) + 1
+            results.append({
+                "id": paper_id,
+                "point_id": str(point.id),
+                "title": point.payload.get('title'),
+                "date": point.payload.get('date'),
+                "chunk_text": point.payload.get('chunk_text'),
+                "page": point.payload.get('page'),
+                "section": point.payload.get('section'),
+                "score": round(score, 6),
+                "matched_queries": [texts[i] for i in matched],
+            })
+            if len(results) >= limit:
+                break
+        logger.info(f"Found {len(results)} search results from {len(texts)} queries.")
+        return results
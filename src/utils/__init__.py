@@ -1,3 +1,7 @@
 from .prompt_manager import PromptManager
 from .video_transcript import YouTubeTranscriber
-from .processing import TextProcessor
\ No newline at end of file
+from .processing import TextProcessor
+from .cache import SQLiteCache
+from .stt import ChunkedTranscriber,OpenAIWhisperBackend,LocalWhisperBackend
+from .result_store import ResultStore
+from .sparse import SparseEncoder
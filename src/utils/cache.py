@@ -0,0 +1,89 @@
+# sqlite 기반 key-value 캐시
+# LLM 응답처럼 계산 비용이 큰 결과를 로컬 파일에 저장해 재실행 시 바로 반환하기 위함
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteCache:
+    """
+    JSON으로 직렬화 가능한 값을 저장하는 영구 캐시
+    - ttl(초)이 지난 항목은 조회 시 만료 처리되고, purge_expired로 한 번에 삭제 가능
+      (프롬프트가 바뀌어 다시 조회되지 않는 키도 지워지도록 캐시를 열 때와 set purge_every번마다 purge_expired 실행)
+    - ttl이 None이면 만료되지 않음
+    """
+    def __init__(self, path: str, ttl: float | None = None, purge_every: int = 1000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.purge_every = purge_every
+        self._sets = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        # 여러 프로세스가 같은 파일을 읽고 쓸 수 있도록 WAL 모드 사용
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created REAL NOT NULL,
+                expires REAL
+            )
+            """
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.purge_expired()
+
+    def get(self, key: str, max_age: float | None = None):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, created, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created, expires = row
+            # 만료됐거나 호출자가 지정한 최대 나이보다 오래된 항목은 없는 것으로 취급
+            if (expires is not None and expires <= now) or (max_age is not None and now - created > max_age):
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(value)
+
+    def set(self, key: str, value, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        expires = now + ttl if ttl is not None else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache(key, value, created, expires) VALUES(?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, expires)
+            )
+            self._conn.commit()
+            self._sets += 1
+            purge = bool(self.purge_every) and self._sets % self.purge_every == 0
+        if purge:
+            self.purge_expired()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    # 만료된 항목 일괄 삭제
+    def purge_expired(self) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires <= ?", (time.time(),))
+            self._conn.commit()
+        if cursor.rowcount:
+            logger.info(f"Purged {cursor.rowcount} expired entries from '{self.path}'.")
+        return cursor.rowcount
@@ -0,0 +1,170 @@
+# 논문 본문 청킹 엔진
+# 글자 수로만 자르면 PDF의 머리글/바닥글, 페이지 번호, 수식 조각이 그대로 임베딩되어 검색 결과 자리를 차지하고
+# 청크가 어느 페이지/절에서 나왔는지 알 수 없으므로
+# 페이지(\f)와 절 제목 경계를 지켜서 나누고, 정보가 거의 없는 청크는 임베딩 전에 걸러내기 위함
+import logging
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+logger = logging.getLogger(__name__)
+
+# PdfExtractor가 페이지 사이에 넣는 구분자
+PAGE_BREAK = "\f"
+
+# 청킹 방식이 바뀌면 값을 올림 (포인트 id와 payload에 포함되어 이전 방식의 청크는 검색에서 제외됨)
+CHUNKER_VERSION = 3
+
+# 절 제목: "3 Method", "2.1. Related Work", "IV. RESULTS" 또는 번호 없는 주요 제목
+# 번호 있는 제목은 대문자로 시작해야 하므로 대소문자 무시는 번호 없는 제목에만 적용 ("10 participants were ..." 같은 본문 줄 제외)
+SECTION_PATTERN = re.compile(
+    r"^\s*(?:(?:\d+(?:\.\d+)*\.?|[IVX]+\.)\s+[A-Z][A-Za-z][^\n]{0,70}"
+    r"|(?i:abstract|introduction|background|related work|method(?:s|ology)?|experiments?|results?|discussion"
+    r"|conclusions?|limitations|acknowledge?ments?|appendix)\s*)$"
+)
+# 페이지 번호, arXiv 식별 문구 등 본문이 아닌 줄
+NOISE_LINE_PATTERN = re.compile(
+    r"^\s*(?:\d{1,4}|page \d+(?: of \d+)?|arxiv:\d{4}\.\d{4,5}(?:v\d+)?\b.*|preprint\b.*|under review\b.*)\s*$",
+    re.IGNORECASE
+)
+
+
+@dataclass
+class Chunk:
+    text: str
+    # 청크가 시작하는 페이지 (1부터), 절 제목 (없으면 빈 문자열), 정리된 본문에서의 시작 위치
+    page: int
+    section: str
+    offset: int
+
+
+class StructuredChunker:
+    """
+    본문 -> Chunk 목록
+    1. 페이지마다 반복되는 머리글/바닥글(전체 페이지의 절반 이상에서 같은 줄), 페이지 번호, 수식/표 조각 줄 제거
+    2. 절 제목에서 나눈 구간마다 RecursiveCharacterTextSplitter로 분할 (청크가 절 경계를 넘지 않음)
+    3. min_chars보다 짧거나, 글자 비율이 낮거나(수식/표 조각), 줄이 지나치게 짧은 청크 제외
+    - 분할기는 처음 사용할 때 한 번만 만들고 재사용
+    - 페이지 구분자가 없는 본문(이전 캐시)은 한 페이지로 처리
+    """
+    def __init__(self, size: int = 1500, overlap: int = 100, min_chars: int = 80,
+                 min_alpha_ratio: float = 0.6, min_avg_line: float = 12.0):
+        self.size = size
+        self.overlap = overlap
+        self.min_chars = min_chars
+        self.min_alpha_ratio = min_alpha_ratio
+        self.min_avg_line = min_avg_line
+        self._splitter = None
+        self._lock = threading.Lock()
+
+    @property
+    def splitter(self):
+        if self._splitter is None:
+            with self._lock:
+                if self._splitter is None:
+                    # langchain 패키지는 import가 느리므로 처음 청킹할 때 불러옴
+                    from langchain_text_splitters import RecursiveCharacterTextSplitter
+                    self._splitter = RecursiveCharacterTextSplitter(
+                        chunk_size=self.size,
+                        chunk_overlap=self.overlap,
+                        length_function=len
+                    )
+        return self._splitter
+
+    # 전체 페이지의 절반 이상(최소 3페이지)에서 반복되는 줄 = 머리글/바닥글
+    @staticmethod
+    def repeated_lines(pages: list[list[str]]) -> set[str]:
+        if len(pages) < 3:
+            return set()
+        counts = Counter(line for lines in pages for line in {l.strip() for l in lines if l.strip()})
+        threshold = max(3, len(pages) // 2)
+        return {line for line, count in counts.items() if count >= threshold}
+
+    # 글자가 거의 없는 짧은 줄 (수식, 표의 숫자 행 등)
+    @staticmethod
+    def is_debris(line: str) -> bool:
+        visible = [c for c in line if not c.isspace()]
+        return len(visible) < 40 and sum(c.isalpha() for c in visible) < len(visible) * 0.3
+
+    # 본문 -> [(페이지 번호, 정리된 줄 목록)]
+    def clean_pages(self, text: str) -> list[tuple[int, list[str]]]:
+        pages = [page.splitlines() for page in text.split(PAGE_BREAK)]
+        repeated = self.repeated_lines(pages)
+        cleaned = []
+        for number, lines in enumerate(pages, start=1):
+            kept = [
+                l for l in lines
+                if l.strip() not in repeated and not NOISE_LINE_PATTERN.match(l) and not self.is_debris(l)
+            ]
+            cleaned.append((number, kept))
+        return cleaned
+
+    # 절 제목 줄: 패턴과 일치하면서 짧고(8단어 이하) 마침표로 끝나지 않는 줄 (번호로 시작하는 본문 줄과 구분)
+    @staticmethod
+    def is_heading(line: str) -> bool:
+        stripped = line.strip()
+        return (
+            bool(SECTION_PATTERN.match(stripped))
+            and len(stripped.split()) <= 8
+            and not stripped.endswith((".", ",", ";", ":"))
+        )
+
+    # 정리된 페이지 -> [(절 제목, 절 본문 시작 위치, 절 본문)], [(페이지 시작 위치, 페이지 번호)]
+    # 절 본문은 페이지 사이를 줄바꿈으로 이어 붙이고, 위치로 페이지를 찾을 수 있도록 페이지 시작 위치를 기록
+    def sections(self, pages: list[tuple[int, list[str]]]) -> tuple[list[tuple[str, int, str]], list[tuple[int, int]]]:
+        sections, page_starts = [], []
+        title, start, buffer, position = "", 0, [], 0
+        for number, lines in pages:
+            page_starts.append((position, number))
+            for line in lines:
+                if self.is_heading(line):
+                    if buffer:
+                        sections.append((title, start, "\n".join(buffer)))
+                    title, start, buffer = line.strip(), position + len(line) + 1, []
+                else:
+                    buffer.append(line)
+                position += len(line) + 1
+        if buffer:
+            sections.append((title, start, "\n".join(buffer)))
+        return sections, page_starts
+
+    @staticmethod
+    def page_at(page_starts: list[tuple[int, int]], offset: int) -> int:
+        page = 1
+        for start, number in page_starts:
+            if start > offset:
+                break
+            page = number
+        return page
+
+    # 수식/표/참조 조각처럼 임베딩해도 검색에 도움이 되지 않는 청크인지 판단
+    def is_informative(self, text: str) -> bool:
+        stripped = text.strip()
+        if len(stripped) < self.min_chars:
+            return False
+        visible = [c for c in stripped if not c.isspace()]
+        if sum(c.isalpha() for c in visible) / len(visible) < self.min_alpha_ratio:
+            return False
+        lines = [l for l in stripped.splitlines() if l.strip()]
+        return len(stripped) / len(lines) >= self.min_avg_line
+
+    # 반환: (임베딩할 청크 목록, 걸러낸 청크 수)
+    def split(self, text: str) -> tuple[list[Chunk], int]:
+        if not text:
+            return [], 0
+        sections, page_starts = self.sections(self.clean_pages(text))
+        chunks, dropped = [], 0
+        for title, start, body in sections:
+            cursor = 0
+            for piece in self.splitter.split_text(body):
+                found = body.find(piece, cursor)
+                local = found if found >= 0 else cursor
+                cursor = local + 1
+                if not self.is_informative(piece):
+                    dropped += 1
+                    continue
+                offset = start + local
+                chunks.append(Chunk(text=piece, page=self.page_at(page_starts, offset), section=title, offset=offset))
+        logger.debug(f"Created {len(chunks)} chunks ({dropped} low-information chunks dropped).")
+        return chunks, dropped
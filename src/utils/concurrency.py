@@ -0,0 +1,98 @@
+# 단계별 동시 실행 수 제한
+# 여러 사용자의 요청이 동시에 들어올 때 CPU를 많이 쓰는 임베딩과 I/O 위주의 다운로드를 서로 다른 한도로 제한하기 위함
+import asyncio
+import threading
+import logging
+from contextlib import contextmanager, asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class StageLimiter:
+    """
+    단계 이름(download, embed, llm 등)마다 동시에 실행할 수 있는 작업 수를 제한
+    - configure로 한도를 지정하지 않은 단계는 제한 없음
+    - waiting/busy로 대기 상태를 확인해 UI에 대기 정보를 보여줄 수 있음
+    """
+    def __init__(self):
+        self._limits: dict[str, int] = {}
+        self._semaphores: dict[str, threading.BoundedSemaphore] = {}
+        self._active: dict[str, int] = {}
+        self._waiting: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, limits: dict[str, int]):
+        with self._lock:
+            for stage, limit in limits.items():
+                if limit and limit > 0:
+                    self._limits[stage] = limit
+                    self._semaphores[stage] = threading.BoundedSemaphore(limit)
+                    self._active.setdefault(stage, 0)
+                    self._waiting.setdefault(stage, 0)
+        logger.info(f"Stage concurrency limits: {self._limits}")
+
+    @contextmanager
+    def slot(self, stage: str):
+        semaphore = self._semaphores.get(stage)
+        if semaphore is None:
+            yield
+            return
+        with self._lock:
+            self._waiting[stage] += 1
+        try:
+            semaphore.acquire()
+        finally:
+            with self._lock:
+                self._waiting[stage] -= 1
+        with self._lock:
+            self._active[stage] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[stage] -= 1
+            semaphore.release()
+
+    # 비동기 코드용 slot: 이벤트 루프를 막지 않도록 세마포어는 작업 스레드에서 기다림
+    # (slot과 같은 세마포어를 쓰므로 동기/비동기 호출을 합쳐서 한도가 적용됨)
+    @asynccontextmanager
+    async def aslot(self, stage: str):
+        semaphore = self._semaphores.get(stage)
+        if semaphore is None:
+            yield
+            return
+        with self._lock:
+            self._waiting[stage] += 1
+        acquire = asyncio.ensure_future(asyncio.to_thread(semaphore.acquire))
+        try:
+            await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # 기다리는 중에 취소되어도 작업 스레드는 결국 자리를 얻으므로 얻는 즉시 반납
+            acquire.add_done_callback(lambda f: semaphore.release() if not f.cancelled() and f.exception() is None else None)
+            raise
+        finally:
+            with self._lock:
+                self._waiting[stage] -= 1
+        with self._lock:
+            self._active[stage] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[stage] -= 1
+            semaphore.release()
+
+    # 해당 단계에서 빈 자리를 기다리는 작업 수
+    def waiting(self, stage: str) -> int:
+        with self._lock:
+            return self._waiting.get(stage, 0)
+
+    # 해당 단계의 모든 자리가 사용 중인지 여부
+    def busy(self, stage: str) -> bool:
+        with self._lock:
+            limit = self._limits.get(stage)
+            return limit is not None and self._active.get(stage, 0) >= limit
+
+
+# 모든 모듈이 공유하는 단계별 제한
+stage_limiter = StageLimiter()
@@ -0,0 +1,87 @@
+# 여러 논문의 청크를 모아 고정 크기 배치로 임베딩하는 엔진
+# GPU가 없는 환경에서 작은 encode 호출을 여러 번 하는 대신 길이가 비슷한 청크끼리 묶어 CPU 스레드를 최대한 활용
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from .concurrency import stage_limiter
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingEngine:
+    """
+    SentenceTransformer 임베딩을 배치 단위로 계산하고 결과를 캐시함
+    - encode 결과는 항상 float32 NumPy 배열 (n, dim)
+    - 캐시 키: 모델 이름 + 청크 텍스트 해시 -> 라이선스 문구, arXiv 헤더처럼 반복되는 청크는 한 번만 계산
+    - 캐시는 최대 cache_size개까지 유지하며 가장 오래 사용되지 않은 항목부터 삭제 (LRU)
+    """
+    def __init__(self, model, model_name: str = "", batch_size: int = 64, cache_size: int = 10000):
+        self.model = model
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha1(f"{self.model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def _cache_get(self, key: str):
+        with self._lock:
+            vector = self._cache.get(key)
+            if vector is not None:
+                self._cache.move_to_end(key)
+            return vector
+
+    def _cache_put(self, key: str, vector: np.ndarray):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[key] = vector
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        if not texts:
+            return np.empty((0, 0), dtype=np.float32)
+        keys = [self._key(text) for text in texts]
+        vectors: dict[str, np.ndarray] = {}
+        # 캐시에 없는 텍스트만 중복 없이 모음
+        pending: dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in pending:
+                continue
+            cached = self._cache_get(key)
+            if cached is not None:
+                vectors[key] = cached
+            else:
+                pending[key] = text
+        self.hits += len(texts) - len(pending)
+        self.misses += len(pending)
+
+        if pending:
+            # 길이순으로 정렬해 배치 안의 패딩을 줄임
+            items = sorted(pending.items(), key=lambda item: len(item[1]))
+            for i in range(0, len(items), self.batch_size):
+                batch = items[i:i + self.batch_size]
+                # CPU/GPU를 많이 쓰는 구간이므로 여러 요청이 동시에 인코딩하지 않도록 "embed" 한도 적용
+                with stage_limiter.slot("embed"):
+                    encoded = self.model.encode(
+                        [text for _, text in batch],
+                        batch_size=self.batch_size,
+                        convert_to_numpy=True,
+                        show_progress_bar=False
+                    )
+                encoded = np.asarray(encoded, dtype=np.float32)
+                for (key, _), vector in zip(batch, encoded):
+                    vectors[key] = vector
+                    self._cache_put(key, vector)
+            logger.debug(f"Encoded {len(pending)} new chunks in batches of {self.batch_size} (cache hits: {len(texts) - len(pending)}).")
+        return np.stack([vectors[key] for key in keys]).astype(np.float32, copy=False)
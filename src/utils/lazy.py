@@ -0,0 +1,46 @@
+# 무거운 객체(임베딩 모델, DB/API 클라이언트)를 처음 사용할 때 생성하기 위한 지연 로딩 도구
+# 앱 시작 시 모델 로딩과 import를 기다리지 않고 UI를 먼저 띄우기 위함
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class LazyObject:
+    """
+    factory()의 결과를 처음 속성에 접근할 때 한 번만 만들어 두고, 이후에는 그 객체로 속성 접근을 넘김
+    - 여러 스레드가 동시에 접근해도 factory는 한 번만 실행됨 (나머지는 생성이 끝날 때까지 대기)
+    - loaded로 생성 여부를 확인할 수 있어 readiness 확인에 사용
+    """
+    def __init__(self, factory, name: str = ""):
+        self._factory = factory
+        self._name = name or getattr(factory, "__name__", "object")
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def resolve(self):
+        if self._loaded:
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                start = time.perf_counter()
+                self._value = self._factory()
+                self.load_seconds = time.perf_counter() - start
+                self._loaded = True
+                logger.info(f"Loaded '{self._name}' in {self.load_seconds:.1f}s")
+        return self._value
+
+    def __getattr__(self, attr):
+        # __init__에서 정의한 속성은 여기까지 오지 않으므로 나머지는 실제 객체의 속성
+        return getattr(self.resolve(), attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._loaded else "not loaded"
+        return f"<LazyObject {self._name} ({state})>"
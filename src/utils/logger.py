@@ -31,6 +31,7 @@ def setup_logger():
     # 현재 파일의 절대 경로  
     path = Path(__file__).resolve().parents[2]
     log_dir = path /'log'
+    log_dir.mkdir(exist_ok=True)
 
     # 로그를 파일로 보내는 역할을 하는 RotatingFileHandler 객체를 만듬
     file_handler = RotatingFileHandler(
@@ -0,0 +1,63 @@
+# 파이프라인 단계 사이의 크기 제한 버퍼
+# 앞 단계를 별도 스레드에서 실행하여 뒷 단계와 겹쳐서(overlap) 처리되도록 함
+import contextvars
+import queue
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class _Failure:
+    def __init__(self, exc: BaseException):
+        self.exc = exc
+
+
+def buffered(iterable, maxsize: int = 1, name: str = "stage"):
+    """
+    iterable을 백그라운드 스레드에서 소비하고, 최대 maxsize개까지만 미리 만들어 두는 제너레이터
+    - 버퍼가 가득 차면 앞 단계가 대기하므로 메모리 사용량은 버퍼 크기로 제한됨
+    - 앞 단계에서 발생한 예외는 소비하는 쪽에서 그대로 다시 발생
+    - 소비하는 쪽이 중간에 멈추면 앞 단계도 멈춤
+    """
+    buffer = queue.Queue(maxsize=maxsize)
+    stop = threading.Event()
+
+    def put(item) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    break
+            else:
+                put(_DONE)
+        except BaseException as e:
+            put(_Failure(e))
+        finally:
+            close = getattr(iterable, "close", None)
+            if close:
+                close()
+
+    # 트레이싱 span 등 호출한 쪽의 컨텍스트를 그대로 이어받아 실행
+    thread = threading.Thread(target=contextvars.copy_context().run, args=(produce,), name=f"pipeline-{name}", daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Failure):
+                raise item.exc
+            yield item
+    finally:
+        stop.set()
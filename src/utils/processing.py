@@ -1,39 +1,64 @@
-# 원본 텍스트 청크 단위로 분할하기 위한 라이브러리
-# langchain으로 rag를 구현할 때 사용하면 호환성이 좋으나 공백,특수문자를 이해한 청크 분할이 가능하므로 랭체인 텍스트 분할 라이브러리 사용
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from qdrant_client import models
+import numpy as np
 import uuid
 import logging
+from .embedding import EmbeddingEngine
+from .sparse import SparseEncoder, SPARSE_VECTOR_NAME
+from .chunking import StructuredChunker, Chunk, CHUNKER_VERSION
+from .tracing import tracer
 
 logger = logging.getLogger(__name__)
 
+# 포인트 id 생성용 네임스페이스 (값을 바꾸면 기존 포인트와 id가 모두 달라짐)
+POINT_ID_NAMESPACE = uuid.UUID("6f1c2a52-9d1e-4c1b-8f0a-3b7e6c5d4a21")
+
 # 텍스트 청킹 및 임베딩과 관련된 모든 작업
 class TextProcessor:
-    def __init__(self, embedding_model):
+    def __init__(self, embedding_model, model_name: str = "", chunk_size: int = 1500, chunk_overlap: int = 100,
+                 batch_size: int = 64, embedding_cache_size: int = 10000, sparse_encoder: SparseEncoder | None = None):
         self.embedding_model = embedding_model
-    
-    # 논문 데이터 원본 청크 단위로 분할
-    @staticmethod
-    def chunk_text(text: str,size: int = 1500,overlap: int=100) -> list[str]:
-        if not text:
-            return []
-        # 텍스트 분할기 선언
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size = size,
-            chunk_overlap = overlap,
-            length_function = len
+        # 키워드 검색(BM25)용 희소 벡터 인코더 (None이면 밀집 벡터만 사용)
+        self.sparse_encoder = sparse_encoder
+        # 포인트 id에 반영되는 설정 -> 청킹/임베딩 설정이 바뀌면 새 포인트로 저장됨
+        self.model_name = model_name
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        # 페이지/절 경계를 지키고 머리글/바닥글, 수식 조각을 걸러내는 청킹 엔진 (분할기는 한 번만 생성)
+        self.chunker = StructuredChunker(size=chunk_size, overlap=chunk_overlap)
+        # 여러 논문의 청크를 batch_size 단위로 모아서 임베딩
+        self.batch_size = batch_size
+        self.embedder = EmbeddingEngine(
+            model=embedding_model,
+            model_name=model_name,
+            batch_size=batch_size,
+            cache_size=embedding_cache_size
         )
-        chunks = text_splitter.split_text(text)
-        logger.debug(f"Created {len(chunks)} chunks.")
-        return chunks # [청크1,청크2...] 형식
 
-    def embed_documents(self,chunks) -> list[float]:
+    # 논문 id, 청크 번호, 청킹/임베딩 설정으로 항상 같은 포인트 id를 생성
+    def point_id(self, paper_id: str, chunk_index: int) -> str:
+        name = f"{paper_id}|{chunk_index}|{self.chunk_size}|{self.chunk_overlap}|{self.model_name}|v{CHUNKER_VERSION}"
+        return str(uuid.uuid5(POINT_ID_NAMESPACE, name))
+
+    # 논문 본문 -> 페이지/절/위치 정보를 가진 청크 목록 (정보가 거의 없는 청크는 제외)
+    def chunk_document(self, text: str) -> list[Chunk]:
+        chunks, dropped = self.chunker.split(text)
+        if dropped:
+            tracer.add("chunks_dropped", dropped)
+        return chunks
+
+    # 논문 데이터 원본 청크 단위로 분할 -> [청크1,청크2...] 형식
+    def chunk_text(self, text: str) -> list[str]:
+        return [chunk.text for chunk in self.chunk_document(text)]
+
+    # 청크 리스트 -> float32 배열 (청크 수, 벡터 크기)
+    def embed_documents(self,chunks) -> np.ndarray:
         if not chunks:
             logger.warning("embed_documents called with no chunks.")
-            return []
+            return np.empty((0, 0), dtype=np.float32)
         logger.info(f"Embedding {len(chunks)} text chunks...")
-        # encode메서드에 청크 텍스트 리스트를 통째로 전달함 -> 라이브러리가 내부적으로 GPU를 활용하여 모든 청크를 처리함
-        embedding_vector = self.embedding_model.encode(chunks)
+        # 배치 임베딩 엔진 사용 -> 길이순 배치, 반복되는 청크는 캐시에서 가져옴
+        with tracer.span("embed", chunks=len(chunks)):
+            embedding_vector = self.embedder.encode(chunks)
+            tracer.add("chunks_embedded", len(chunks))
         logger.info("Embedding complete.")
         return embedding_vector
 
@@ -47,30 +72,99 @@ class TextProcessor:
             logger.warning("No claim/evidence text to embed.")
             return []
         logger.debug(f"Text for embedding: '{combined_text[:100]}...'")
-        embedding_vector = self.embedding_model.encode(combined_text)
+        embedding_vector = self.embedder.encode([combined_text])[0]
         logger.info("Claim/evidence embedding complete.")
         return embedding_vector
+
+    # 검색 질의 목록: 주장과 각 근거를 따로 (하나로 합친 평균 벡터는 여러 근거를 잘 찾지 못함)
+    @staticmethod
+    def query_texts(ce: dict) -> list[str]:
+        texts = [ce.get("claim", "")] + list(ce.get("evidence") or [])
+        return [text.strip() for text in texts if text and text.strip()]
+
+    # 질의별 밀집 벡터를 한 번의 배치로 계산 -> (질의 수, 벡터 크기)
+    def query_embeddings(self, texts: list[str]) -> np.ndarray:
+        with tracer.span("embed.query", queries=len(texts)):
+            return self.embedder.encode(texts)
     
-    def process_for_qdrant(self,data)-> list[models.PointStruct]:
+    # existing_ids: 포인트 id 목록을 받아 이미 컬렉션에 있는 id 집합을 반환하는 함수
+    def process_for_qdrant(self,data,existing_ids=None,sparse: bool = False)-> list:
         points = []
+        for paper_points in self.iter_points(data, existing_ids=existing_ids, sparse=sparse):
+            points.extend(paper_points)
+        logger.info(f"Successfully created {len(points)} Qdrant points from {len(data)} papers.")
+        return points
+
+    # 논문을 하나씩 청킹하고, 여러 논문의 청크를 batch_size 이상 모이면 한 번에 임베딩하여
+    # 논문별 포인트 리스트를 반환하는 제너레이터
+    # data는 리스트뿐 아니라 수집 단계의 제너레이터도 받을 수 있음
+    # sparse=True이면 밀집 벡터와 함께 BM25 희소 벡터도 저장 (컬렉션에 희소 벡터 설정이 있어야 함)
+    def iter_points(self,data,existing_ids=None,sparse: bool = False):
+        skipped = 0
+        seen = set()
+        # 임베딩 대기 중인 (논문, 청크, 포인트 id) 목록과 청크 수
+        pending = []
+        pending_chunks = 0
         for paper in data:
-            chunks = self.chunk_text(paper.get('body',''))
+            # 여러 키워드에서 같은 논문이 중복 수집된 경우 한 번만 처리
+            if paper['id'] in seen:
+                continue
+            seen.add(paper['id'])
+            chunks = self.chunk_document(paper.get('body',''))
             if not chunks:
                 continue
-            embeddings = self.embed_documents(chunks)
-            for i,chunk in enumerate(chunks):
+            ids = [self.point_id(paper['id'], i) for i in range(len(chunks))]
+            # 이미 저장된 청크는 임베딩하지 않음
+            if existing_ids is not None:
+                stored = existing_ids(ids)
+                missing = [i for i, point_id in enumerate(ids) if point_id not in stored]
+                skipped += len(ids) - len(missing)
+                if not missing:
+                    logger.debug(f"Paper '{paper['id']}' is already indexed. Skipping embedding.")
+                    continue
+                chunks = [chunks[i] for i in missing]
+                ids = [ids[i] for i in missing]
+            pending.append((paper, chunks, ids))
+            pending_chunks += len(chunks)
+            if pending_chunks >= self.batch_size:
+                yield from self._embed_pending(pending, sparse)
+                pending, pending_chunks = [], 0
+        if pending:
+            yield from self._embed_pending(pending, sparse)
+        if skipped:
+            logger.info(f"Skipped {skipped} chunks that are already indexed.")
+
+    # 대기 중인 여러 논문의 청크를 한 번에 임베딩한 뒤 논문별로 포인트를 만들어 반환
+    def _embed_pending(self, pending, sparse: bool = False):
+        from qdrant_client import models
+        sparse = sparse and self.sparse_encoder is not None
+        embeddings = self.embed_documents([chunk.text for _, chunks, _ in pending for chunk in chunks])
+        offset = 0
+        for paper, chunks, ids in pending:
+            points = []
+            for chunk, point_id, vector in zip(chunks, ids, embeddings[offset:offset + len(chunks)]):
                 # Qdrant가 요구하는 DB 구조
+                if sparse:
+                    indices, values = self.sparse_encoder.encode_document(chunk.text)
+                    point_vector = {"": vector.tolist(), SPARSE_VECTOR_NAME: models.SparseVector(indices=indices, values=values)}
+                else:
+                    point_vector = vector.tolist()
                 points.append(
                     models.PointStruct(
-                        id=str(uuid.uuid4()), 
-                        vector=embeddings[i],
+                        id=point_id,
+                        vector=point_vector,
                         payload={
                             "paper_id": paper['id'],
                             "title": paper['title'],
                             "date": paper['date'],
-                            "chunk_text" : chunk
+                            "chunk_text" : chunk.text,
+                            "page": chunk.page,
+                            "section": chunk.section,
+                            "offset": chunk.offset,
+                            # 검색은 현재 버전의 청크만 대상으로 함 (VectorDB.paper_filter)
+                            "chunker_version": CHUNKER_VERSION
                         }
                     )
                 )
-        logger.info(f"Successfully created {len(points)} Qdrant points from {len(data)} papers.")
-        return points
+            offset += len(chunks)
+            yield points
@@ -1,5 +1,6 @@
 import os
 import yaml
+import hashlib
 import logging
 
 logger = logging.getLogger(__name__)
@@ -7,6 +8,8 @@ logger = logging.getLogger(__name__)
 # 프롬프트를 관리하는 유틸리티 클래스
 class PromptManager:
     def __init__(self,prompt_dir):
+        # 프롬프트 파일 내용의 해시 (LLM 응답 캐시 키에 포함 -> YAML을 수정하면 이전 캐시가 무효화됨)
+        self.hashes = {}
         self.prompts = self.load_prompt_dir(prompt_dir)
 
     def load_prompt_dir(self, prompt_dir) -> dict:
@@ -21,8 +24,10 @@ class PromptManager:
                 prompt_key = os.path.splitext(filename)[0]
                 # 운영 체제에 맞는 경로를 사용하여 파일 경로를 생성
                 file_path = os.path.join(prompt_dir, filename)
-                with open(file_path,'r',encoding='utf-8') as file:
-                    loaded_prompts[prompt_key] = yaml.safe_load(file)
+                with open(file_path,'rb') as file:
+                    content = file.read()
+                self.hashes[prompt_key] = hashlib.sha256(content).hexdigest()
+                loaded_prompts[prompt_key] = yaml.safe_load(content.decode('utf-8'))
         logger.info(f"Successfully loaded {len(loaded_prompts)} prompts: {list(loaded_prompts.keys())}")
         return loaded_prompts
 
@@ -33,4 +38,8 @@ class PromptManager:
             return self.prompts[prompt_key]
         except (KeyError, ValueError):
             logger.warning(f"Prompt key '{prompt_key}' not found in loaded prompts.")
-            raise ValueError(f"프롬프트 '{prompt_key}'를 찾을 수 없습니다. 올바른 형식은 '파일명.프롬프트명'입니다.")
\ No newline at end of file
+            raise ValueError(f"프롬프트 '{prompt_key}'를 찾을 수 없습니다. 올바른 형식은 '파일명.프롬프트명'입니다.")
+
+    # 프롬프트 파일 내용의 sha256 해시
+    def prompt_hash(self, prompt_key) -> str:
+        return self.hashes.get(prompt_key, "")
@@ -0,0 +1,46 @@
+# 영상별 팩트체크 결과 저장소
+# 이미 분석한 영상은 최종 결과를 바로 반환하고, 중간에 실패한 실행은 마지막으로 완료된 단계부터 이어서 실행하기 위함
+import hashlib
+import json
+import logging
+import time
+from .cache import SQLiteCache
+
+logger = logging.getLogger(__name__)
+
+
+class ResultStore:
+    """
+    (영상 id, 파이프라인 설정 지문) -> 단계별 결과 dict
+    - 저장 항목: claims(주장 목록), keywords, paper_ids, search_results(주장별 검색 결과, 검색된 청크 id 포함), answer
+    - 모델/프롬프트/검색 설정이 바뀌면 지문이 달라져 이전 결과는 사용되지 않음
+    - max_age(초)보다 오래된 결과는 없는 것으로 취급 (None이면 제한 없음)
+    """
+    def __init__(self, cache: SQLiteCache, fingerprint: str, max_age: float | None = None):
+        self.cache = cache
+        self.fingerprint = fingerprint
+        self.max_age = max_age
+
+    # 결과에 영향을 주는 설정값들의 해시
+    @staticmethod
+    def config_fingerprint(**config) -> str:
+        payload = json.dumps(config, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def key(self, video_id: str) -> str:
+        return f"{video_id}:{self.fingerprint}"
+
+    # 저장된 단계별 결과 (없거나 오래됐으면 빈 dict)
+    def load(self, video_id: str) -> dict:
+        record = self.cache.get(self.key(video_id), max_age=self.max_age)
+        if record:
+            logger.info(f"Loaded stored results for video {video_id}: {[k for k in record if k != 'updated']}")
+        return record or {}
+
+    # 단계가 끝날 때마다 지금까지의 결과 전체를 저장
+    def save(self, video_id: str, record: dict):
+        record["updated"] = time.time()
+        self.cache.set(self.key(video_id), record)
+
+    def clear(self, video_id: str):
+        self.cache.delete(self.key(video_id))
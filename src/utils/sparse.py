@@ -0,0 +1,55 @@
+# BM25 방식의 희소(sparse) 벡터 인코더
+# 단어를 해시해 차원 번호로 쓰므로 사전(vocabulary)을 따로 저장할 필요가 없음
+# IDF는 Qdrant가 컬렉션 전체 통계로 계산하므로(Modifier.IDF) 여기서는 문서 쪽 TF 가중치만 계산
+import hashlib
+import re
+from collections import Counter
+
+# 컬렉션에서 희소 벡터를 저장하는 이름 (밀집 벡터는 기존처럼 이름 없는 기본 벡터)
+SPARSE_VECTOR_NAME = "bm25"
+
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+# 검색에 도움이 되지 않는 자주 나오는 영어 단어
+STOPWORDS = frozenset("""
+a an and are as at be by can for from has have in into is it its of on or that the their this to was were which with we our
+""".split())
+
+
+class SparseEncoder:
+    """
+    텍스트 -> (indices, values) 희소 벡터
+    - 문서: BM25의 TF 포화 식 tf * (k1 + 1) / (tf + k1 * (1 - b + b * len / avg_len))
+    - 질의: 등장한 단어마다 1.0 (Qdrant IDF와 곱해져 BM25 점수가 됨)
+    """
+    def __init__(self, dim: int = 2 ** 20, k1: float = 1.2, b: float = 0.75, avg_len: float = 250.0):
+        self.dim = dim
+        self.k1 = k1
+        self.b = b
+        self.avg_len = avg_len
+
+    @staticmethod
+    def tokenize(text: str) -> list[str]:
+        return [t for t in TOKEN_PATTERN.findall(text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+    # 같은 단어는 항상 같은 차원 번호 (프로세스가 바뀌어도 같도록 hash() 대신 md5 사용)
+    def index(self, token: str) -> int:
+        return int.from_bytes(hashlib.md5(token.encode("utf-8")).digest()[:4], "little") % self.dim
+
+    # 해시 충돌로 같은 차원에 여러 단어가 오면 값을 더함
+    def _to_sparse(self, weights: dict[str, float]) -> tuple[list[int], list[float]]:
+        merged: dict[int, float] = {}
+        for token, weight in weights.items():
+            idx = self.index(token)
+            merged[idx] = merged.get(idx, 0.0) + weight
+        indices = sorted(merged)
+        return indices, [merged[i] for i in indices]
+
+    def encode_document(self, text: str) -> tuple[list[int], list[float]]:
+        tokens = self.tokenize(text)
+        counts = Counter(tokens)
+        norm = self.k1 * (1 - self.b + self.b * len(tokens) / self.avg_len)
+        return self._to_sparse({t: tf * (self.k1 + 1) / (tf + norm) for t, tf in counts.items()})
+
+    def encode_query(self, text: str) -> tuple[list[int], list[float]]:
+        return self._to_sparse({t: 1.0 for t in set(self.tokenize(text))})
@@ -0,0 +1,191 @@
+# 긴 영상의 음성을 구간별로 나눠 동시에 STT 처리하기 위한 모듈
+# 무음 구간 근처에서 오디오를 자르고, 구간 사이에 겹치는 부분을 두어 경계에서 단어가 잘리지 않도록 함
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+logger = logging.getLogger(__name__)
+
+SILENCE_END_PATTERN = re.compile(r"silence_end:\s*([\d.]+)\s*\|\s*silence_duration:\s*([\d.]+)")
+
+
+# OpenAI Whisper API 백엔드
+class OpenAIWhisperBackend:
+    def __init__(self, client, model: str = "whisper-1"):
+        self.client = client
+        self.model = model
+
+    def transcribe(self, audio_path: str) -> str:
+        with open(audio_path, "rb") as f:
+            result = self.client.audio.transcriptions.create(model=self.model, file=f)
+        return result.text.strip()
+
+
+# 로컬 faster-whisper 백엔드 (API 키나 네트워크 없이 테스트할 때 사용)
+class LocalWhisperBackend:
+    def __init__(self, model_size: str = "base", device: str = "cpu", compute_type: str = "int8"):
+        self.model_size = model_size
+        self.device = device
+        self.compute_type = compute_type
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        # 모델은 처음 사용할 때 한 번만 로드
+        with self._lock:
+            if self._model is None:
+                try:
+                    from faster_whisper import WhisperModel
+                except ImportError as e:
+                    raise RuntimeError("로컬 STT를 사용하려면 'faster-whisper' 패키지를 설치해야 합니다.") from e
+                self._model = WhisperModel(self.model_size, device=self.device, compute_type=self.compute_type)
+        return self._model
+
+    def transcribe(self, audio_path: str) -> str:
+        segments, _ = self.model.transcribe(audio_path)
+        return " ".join(segment.text.strip() for segment in segments).strip()
+
+
+# ffprobe로 오디오 길이(초) 확인
+def probe_duration(audio_path: str) -> float:
+    result = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", audio_path],
+        check=True, capture_output=True, text=True
+    )
+    return float(result.stdout.strip())
+
+
+# ffmpeg silencedetect로 무음 구간 목록 [(시작, 끝), ...] 반환
+def detect_silences(audio_path: str, noise_db: int = -30, min_silence: float = 0.5) -> list[tuple[float, float]]:
+    result = subprocess.run(
+        ["ffmpeg", "-hide_banner", "-nostats", "-i", audio_path,
+         "-af", f"silencedetect=noise={noise_db}dB:d={min_silence}", "-f", "null", "-"],
+        capture_output=True, text=True
+    )
+    silences = []
+    for match in SILENCE_END_PATTERN.finditer(result.stderr):
+        end, duration = float(match.group(1)), float(match.group(2))
+        silences.append((end - duration, end))
+    return silences
+
+
+# 목표 길이마다 자를 위치를 정하되, 목표 지점 직전의 무음 구간이 있으면 그 가운데에서 자름
+# 반환값: 겹침이 포함된 구간 목록 [(시작, 끝), ...]
+def plan_segments(duration: float, silences: list[tuple[float, float]], segment_seconds: float,
+                  overlap_seconds: float, search_ratio: float = 0.2) -> list[tuple[float, float]]:
+    cuts = [0.0]
+    while duration - cuts[-1] > segment_seconds:
+        target = cuts[-1] + segment_seconds
+        window_start = target - segment_seconds * search_ratio
+        candidates = [(s + e) / 2 for s, e in silences if window_start <= (s + e) / 2 <= target]
+        cuts.append(max(candidates) if candidates else target)
+    cuts.append(duration)
+    return [
+        (max(0.0, start - overlap_seconds), min(duration, end + overlap_seconds))
+        for start, end in zip(cuts, cuts[1:])
+    ]
+
+
+# ffmpeg로 구간 잘라내기 (재인코딩 없이 스트림 복사)
+def cut_segment(audio_path: str, start: float, end: float, output_path: str) -> str:
+    subprocess.run(
+        ["ffmpeg", "-hide_banner", "-loglevel", "error", "-y", "-ss", f"{start:.3f}", "-to", f"{end:.3f}",
+         "-i", audio_path, "-c", "copy", output_path],
+        check=True, capture_output=True, text=True
+    )
+    return output_path
+
+
+# 단어 비교용 정규화: 소문자, 문장 부호 제거 ("Dog," == "dog.")
+def normalize_word(word: str) -> str:
+    return "".join(c for c in word.lower() if c.isalnum())
+
+
+# 겹침 후보 비교: 구간 경계에서 잘린 단어(뒤 구간의 첫 단어는 뒷부분만, 앞 구간의 마지막 단어는 앞부분만 남을 수 있음)는
+# 일부만 일치해도 같은 단어로 보고, 나머지 단어는 size // 8개까지 다른 단어를 허용 (STT 인식 차이)
+def _overlap_matches(tail: list[str], head: list[str]) -> bool:
+    size = len(tail)
+    mismatches = 0
+    for i, (a, b) in enumerate(zip(tail, head)):
+        if a == b:
+            continue
+        if i == 0 and a and b and a.endswith(b):
+            continue
+        if i == size - 1 and a and b and b.startswith(a):
+            continue
+        mismatches += 1
+        if mismatches > size // 8:
+            return False
+    return True
+
+
+# 앞 구간의 끝과 뒤 구간의 시작에서 겹치는 단어를 찾아 한 번만 남기고 이어 붙임
+# 겹친 부분은 앞 구간의 단어를 쓰되, 마지막 단어는 앞 구간에서 잘렸을 수 있으므로 뒤 구간의 단어를 씀
+def stitch(texts: list[str], max_overlap_words: int = 60, min_overlap_words: int = 2) -> str:
+    merged: list[str] = []
+    for text in texts:
+        words = text.split()
+        if not merged:
+            merged.extend(words)
+            continue
+        limit = min(max_overlap_words, len(merged), len(words))
+        tail = [normalize_word(w) for w in merged[-limit:]] if limit else []
+        head = [normalize_word(w) for w in words[:limit]]
+        overlap = 0
+        for size in range(limit, min_overlap_words - 1, -1):
+            if _overlap_matches(tail[len(tail) - size:], head[:size]):
+                overlap = size
+                break
+        if overlap:
+            merged = merged[:-1]
+            merged.extend(words[overlap - 1:])
+        else:
+            merged.extend(words)
+    return " ".join(merged)
+
+
+class ChunkedTranscriber:
+    """
+    오디오를 겹치는 구간으로 나눠 STT 백엔드로 동시에 변환
+    - backend: transcribe(audio_path) -> str 메소드를 가진 객체 (OpenAIWhisperBackend, LocalWhisperBackend 등)
+    - segment_seconds보다 짧은 오디오는 나누지 않고 한 번에 처리
+    """
+    def __init__(self, backend, segment_seconds: float = 600, overlap_seconds: float = 5, max_workers: int = 4):
+        self.backend = backend
+        self.segment_seconds = segment_seconds
+        self.overlap_seconds = overlap_seconds
+        self.max_workers = max_workers
+
+    # 구간이 변환되는 대로 (구간 번호, 텍스트)를 반환 (완료 순서)
+    def iter_transcribe(self, audio_path: str):
+        duration = probe_duration(audio_path)
+        if duration <= self.segment_seconds:
+            yield 0, self.backend.transcribe(audio_path)
+            return
+        segments = plan_segments(duration, detect_silences(audio_path), self.segment_seconds, self.overlap_seconds)
+        logger.info(f"Splitting {duration:.0f}s audio into {len(segments)} segments for STT.")
+        ext = os.path.splitext(audio_path)[1]
+        with tempfile.TemporaryDirectory() as tmp, ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stt") as pool:
+            futures = {}
+            for index, (start, end) in enumerate(segments):
+                path = cut_segment(audio_path, start, end, os.path.join(tmp, f"segment_{index:04d}{ext}"))
+                futures[pool.submit(self.backend.transcribe, path)] = index
+            for future in as_completed(futures):
+                index = futures[future]
+                logger.debug(f"STT segment {index + 1}/{len(segments)} done.")
+                yield index, future.result()
+
+    # 모든 구간을 변환한 뒤 순서대로 겹침을 제거하여 이어 붙임
+    # on_partial: 구간이 끝날 때마다 (구간 번호, 텍스트)로 호출되는 함수
+    def transcribe(self, audio_path: str, on_partial=None) -> str:
+        results = {}
+        for index, text in self.iter_transcribe(audio_path):
+            results[index] = text
+            if on_partial:
+                on_partial(index, text)
+        return stitch([results[i] for i in sorted(results)])
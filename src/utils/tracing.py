@@ -0,0 +1,174 @@
+# 단계별 소요 시간과 자원 사용량을 기록하는 가벼운 트레이싱 모듈
+# - span: 구간의 실제 시간(wall), CPU 시간, 카운터(다운로드 바이트, 임베딩 청크 수, LLM 토큰 수 등)를 기록
+# - 완료된 span은 JSON-lines 파일로 내보내고, 누적 값은 Prometheus 텍스트 형식으로 제공
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# 현재 실행 중인 span (스레드/코루틴마다 따로 관리)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    def __init__(self, name: str, parent=None, **attrs):
+        self.name = name
+        self.parent = parent
+        self.attrs = attrs
+        self.counters = defaultdict(float)
+        self.start = time.time()
+        self.wall = 0.0
+        self.cpu = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, counter: str, value: float = 1):
+        with self._lock:
+            self.counters[counter] += value
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "parent": self.parent.name if self.parent else None,
+            "start": self.start,
+            "wall_s": round(self.wall, 6),
+            "cpu_s": round(self.cpu, 6),
+            "counters": dict(self.counters),
+            **({"attrs": self.attrs} if self.attrs else {}),
+        }
+
+
+class Tracer:
+    def __init__(self):
+        self.export_path: Path | None = None
+        self._lock = threading.Lock()
+        # span 이름별 누적 통계와 전체 카운터
+        self._stats = defaultdict(lambda: {"count": 0, "wall": 0.0, "cpu": 0.0, "max": 0.0, "errors": 0})
+        self._counters = defaultdict(float)
+
+    # span을 JSON-lines로 저장할 파일 지정
+    def configure(self, export_path: str | None = None):
+        if export_path:
+            self.export_path = Path(export_path)
+            self.export_path.parent.mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        parent = _current_span.get()
+        span = Span(name, parent=parent, **attrs)
+        token = _current_span.set(span)
+        start_wall = time.perf_counter()
+        # 스레드 CPU 시간: 같은 프로세스의 다른 요청이 사용한 CPU는 포함하지 않음
+        start_cpu = time.thread_time()
+        failed = False
+        try:
+            yield span
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            span.wall = time.perf_counter() - start_wall
+            span.cpu = time.thread_time() - start_cpu
+            _current_span.reset(token)
+            self._finish(span, failed)
+
+    def _finish(self, span: Span, failed: bool):
+        with self._lock:
+            stats = self._stats[span.name]
+            stats["count"] += 1
+            stats["wall"] += span.wall
+            stats["cpu"] += span.cpu
+            stats["max"] = max(stats["max"], span.wall)
+            stats["errors"] += int(failed)
+            if self.export_path:
+                record = span.to_dict()
+                record["error"] = failed
+                with open(self.export_path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        logger.debug(f"[span] {span.name} wall={span.wall:.3f}s cpu={span.cpu:.3f}s {dict(span.counters)}")
+
+    # 카운터 증가: 전체 누적값과 현재 span 및 상위 span 모두에 반영
+    def add(self, counter: str, value: float = 1):
+        with self._lock:
+            self._counters[counter] += value
+        span = _current_span.get()
+        while span is not None:
+            span.add(counter, value)
+            span = span.parent
+
+    # 함수 전체를 span으로 기록하는 데코레이터
+    def traced(self, name: str):
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            stats = {name: dict(values) for name, values in self._stats.items()}
+            counters = dict(self._counters)
+        lines = [
+            "# HELP factcheck_span_total Number of finished spans.",
+            "# TYPE factcheck_span_total counter",
+        ]
+        lines += [f'factcheck_span_total{{span="{n}"}} {s["count"]}' for n, s in stats.items()]
+        lines += ["# HELP factcheck_span_errors_total Number of spans that raised.", "# TYPE factcheck_span_errors_total counter"]
+        lines += [f'factcheck_span_errors_total{{span="{n}"}} {s["errors"]}' for n, s in stats.items()]
+        lines += ["# HELP factcheck_span_wall_seconds_total Wall time spent in spans.", "# TYPE factcheck_span_wall_seconds_total counter"]
+        lines += [f'factcheck_span_wall_seconds_total{{span="{n}"}} {s["wall"]:.6f}' for n, s in stats.items()]
+        lines += ["# HELP factcheck_span_cpu_seconds_total Thread CPU time spent in spans.", "# TYPE factcheck_span_cpu_seconds_total counter"]
+        lines += [f'factcheck_span_cpu_seconds_total{{span="{n}"}} {s["cpu"]:.6f}' for n, s in stats.items()]
+        lines += ["# HELP factcheck_span_wall_seconds_max Slowest span.", "# TYPE factcheck_span_wall_seconds_max gauge"]
+        lines += [f'factcheck_span_wall_seconds_max{{span="{n}"}} {s["max"]:.6f}' for n, s in stats.items()]
+        lines += ["# HELP factcheck_counter_total Resource counters (bytes downloaded, chunks embedded, LLM tokens).", "# TYPE factcheck_counter_total counter"]
+        lines += [f'factcheck_counter_total{{name="{n}"}} {v:g}' for n, v in counters.items()]
+        return "\n".join(lines) + "\n"
+
+    # /metrics 경로로 Prometheus 텍스트를 제공하는 HTTP 서버를 백그라운드 스레드로 실행
+    # readiness: {구성 요소: 로딩 여부, "ready": bool}을 반환하는 함수 -> /ready 경로로 제공 (준비 전에는 503)
+    def serve_metrics(self, port: int, host: str = "0.0.0.0", readiness=None) -> ThreadingHTTPServer:
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                if path == "/ready" and readiness is not None:
+                    status = readiness()
+                    body = json.dumps(status).encode("utf-8")
+                    self.send_response(200 if status.get("ready") else 503)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                if path != "/metrics":
+                    self.send_error(404)
+                    return
+                body = tracer.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug(f"metrics: {format % args}")
+
+        server = ThreadingHTTPServer((host, port), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+        logger.info(f"Serving Prometheus metrics on http://{host}:{port}/metrics")
+        return server
+
+
+# 모든 모듈이 공유하는 트레이서
+tracer = Tracer()
@@ -1,39 +1,159 @@
 import subprocess, glob, tempfile
 import os
+import re
 import logging
+from urllib.parse import urlparse, parse_qs
+from .cache import SQLiteCache
+from .stt import ChunkedTranscriber
+from .tracing import tracer
+from .concurrency import stage_limiter
 
 logger = logging.getLogger(__name__)
 
+# 유튜브 영상 id 형식 (11자리)
+VIDEO_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{11}$")
+# 자막 파일(vtt)에서 제거할 시간 정보/태그
+VTT_TIMESTAMP_PATTERN = re.compile(r"\d{2}:\d{2}[:.]\d{2}[.,]\d{3}\s*-->")
+VTT_TAG_PATTERN = re.compile(r"<[^>]+>")
+
 # URL을 받아 텍스트로 변환하는 객체
 class YouTubeTranscriber:
-    def __init__(self,openai_client):
+    def __init__(self,openai_client,cache: SQLiteCache | None = None,prefer_subtitles: bool = True,
+                 subtitle_langs: tuple[str, ...] = ("ko", "en"),reencode_audio: bool = False,
+                 stt_engine: ChunkedTranscriber | None = None):
         # openai client 저장
         self.client = openai_client
+        # 영상 id -> 자막 텍스트 캐시
+        self.cache = cache
+        # True면 STT 전에 yt-dlp로 기존 자막(업로드/자동 생성)을 먼저 시도
+        self.prefer_subtitles = prefer_subtitles
+        self.subtitle_langs = subtitle_langs
+        # False면 mp3로 재인코딩하지 않고 원본 오디오 컨테이너(m4a/webm)를 그대로 사용
+        self.reencode_audio = reencode_audio
+        # 긴 오디오를 구간별로 나눠 동시에 변환하는 STT 엔진 (없으면 Whisper API에 파일 전체를 한 번에 전송)
+        self.stt_engine = stt_engine
+
+    # 다양한 형태의 유튜브 URL(youtu.be, watch?v=, shorts, embed, 추가 쿼리 파라미터)에서 영상 id 추출
+    @staticmethod
+    def video_id(url: str) -> str | None:
+        url = url.strip()
+        if VIDEO_ID_PATTERN.match(url):
+            return url
+        parsed = urlparse(url if "://" in url else f"https://{url}")
+        host = (parsed.hostname or "").lower().removeprefix("www.").removeprefix("m.").removeprefix("music.")
+        segments = [s for s in parsed.path.split("/") if s]
+        candidate = None
+        if host == "youtu.be" and segments:
+            candidate = segments[0]
+        elif host.endswith("youtube.com") or host.endswith("youtube-nocookie.com"):
+            query = parse_qs(parsed.query)
+            if "v" in query:
+                candidate = query["v"][0]
+            elif len(segments) >= 2 and segments[0] in ("shorts", "embed", "live", "v"):
+                candidate = segments[1]
+        if candidate and VIDEO_ID_PATTERN.match(candidate):
+            return candidate
+        return None
+
     # yt-dlp 라이브러리로 유튜브 영상 음성 데이터 다운로드
+    @tracer.traced("youtube.download_audio")
     def download_audio(self,url: str, output: str) :
         logger.info(f"Starting audio download for URL: {url}")
-        cmd = [
-            "yt-dlp", 
-            "-f", "bestaudio",
-            "--extract-audio",
-            "--audio-format", "mp3",  # mp3로 강제 변환
-            "--audio-quality", "0",   # 최고 품질
-            "-o", f"{output}.%(ext)s", 
-            url
-        ]
+        if self.reencode_audio:
+            cmd = [
+                "yt-dlp",
+                "-f", "bestaudio",
+                "--extract-audio",
+                "--audio-format", "mp3",  # mp3로 강제 변환
+                "--audio-quality", "0",   # 최고 품질
+                "-o", f"{output}.%(ext)s",
+                url
+            ]
+        else:
+            # Whisper가 m4a/webm을 그대로 지원하므로 ffmpeg 재인코딩 없이 원본 오디오 스트림만 받음
+            cmd = [
+                "yt-dlp",
+                "-f", "bestaudio[ext=m4a]/bestaudio",
+                "-o", f"{output}.%(ext)s",
+                url
+            ]
         try:
             #터미널 코드 내에서 명령어 실행
-            result = subprocess.run(cmd, check=True, capture_output=True, text=True)
+            with stage_limiter.slot("download"):
+                result = subprocess.run(cmd, check=True, capture_output=True, text=True)
             logger.info("yt-dlp audio download completed successfully.")
         except subprocess.CalledProcessError as e:
             logger.error(f"yt-dlp execution failed.", exc_info=True)
             raise RuntimeError(f"오디오 다운로드 실패: {e.stderr}")
-        
+
         paths = glob.glob(f"{output}.*")
         return paths[0]
 
+    # yt-dlp로 영상에 있는 자막만 내려받아 텍스트로 변환 (자막이 없으면 빈 문자열 반환)
+    # 1. 업로드 자막: 설정한 언어 중 있는 것
+    # 2. 자동 생성 자막: 영상 원래 언어의 음성 인식 자막({언어}-orig)만 사용
+    #    (다른 언어 영상의 "ko" 자동 자막은 기계 번역이므로 사용하지 않고 STT로 넘어감)
+    @tracer.traced("youtube.subtitles")
+    def download_subtitles(self,url: str, output: str) -> str:
+        logger.info(f"Trying to fetch existing subtitles for URL: {url}")
+        text = self._fetch_subtitles(url, f"{output}_manual", "--write-subs", list(self.subtitle_langs))
+        if not text:
+            text = self._fetch_subtitles(url, f"{output}_auto", "--write-auto-subs", [f"{lang}-orig" for lang in self.subtitle_langs])
+        if not text:
+            logger.info("No subtitles available.")
+        return text
+
+    # 자막 한 종류(option: --write-subs/--write-auto-subs)를 langs 언어로 내려받아 langs 순서대로 첫 번째 자막 반환
+    def _fetch_subtitles(self, url: str, output: str, option: str, langs: list[str]) -> str:
+        cmd = [
+            "yt-dlp",
+            "--skip-download",
+            option,
+            "--sub-langs", ",".join(langs),
+            "--sub-format", "vtt",
+            "-o", f"{output}.%(ext)s",
+            url
+        ]
+        try:
+            with stage_limiter.slot("download"):
+                subprocess.run(cmd, check=True, capture_output=True, text=True)
+        except subprocess.CalledProcessError as e:
+            logger.warning(f"Failed to fetch subtitles: {e.stderr}")
+            return ""
+        # 설정한 언어 순서대로 자막 파일 선택
+        for lang in langs:
+            paths = sorted(glob.glob(f"{output}.{lang}*.vtt"))
+            if paths:
+                with open(paths[0], "r", encoding="utf-8") as f:
+                    text = self.parse_vtt(f.read())
+                if text:
+                    logger.info(f"Using '{lang}' subtitles ({option}) instead of speech-to-text.")
+                    return text
+        return ""
+
+    # vtt 자막 -> 일반 텍스트 (자동 생성 자막은 같은 줄이 여러 번 반복되므로 연속 중복 제거)
+    @staticmethod
+    def parse_vtt(content: str) -> str:
+        lines = []
+        for line in content.splitlines():
+            line = line.strip()
+            if not line or line == "WEBVTT" or VTT_TIMESTAMP_PATTERN.match(line):
+                continue
+            if line.startswith(("NOTE", "Kind:", "Language:", "STYLE", "REGION")) or line.isdigit():
+                continue
+            line = VTT_TAG_PATTERN.sub("", line).strip()
+            if line and (not lines or lines[-1] != line):
+                lines.append(line)
+        return " ".join(lines)
+
     # 다운받은 음성 데이터를 텍스트로 변환
-    def stt(self,audio_path : str) -> str:
+    # on_partial: 구간별 STT 엔진 사용 시 구간이 끝날 때마다 (구간 번호, 텍스트)로 호출
+    @tracer.traced("stt")
+    def stt(self,audio_path : str,on_partial=None) -> str:
+        if self.stt_engine:
+            transcript = self.stt_engine.transcribe(audio_path,on_partial=on_partial)
+            logger.info("Speech-to-Text completed successfully.")
+            return transcript
         with open(audio_path,"rb") as f:
             stt_model = self.client.audio.transcriptions.create(
                 model = "whisper-1",
@@ -43,11 +163,26 @@ class YouTubeTranscriber:
         return stt_model.text.strip()
 
     # url을 받아 전체 과정을 실행하고 음성 데이터 삭제
-    def extract_transcripts(self,url: str) -> str:
+    def extract_transcripts(self,url: str,on_partial=None) -> str:
+        video_id = self.video_id(url)
+        if video_id:
+            # 같은 영상은 URL 형태가 달라도 같은 id로 캐시됨
+            if self.cache:
+                cached = self.cache.get(video_id)
+                if cached is not None:
+                    logger.info(f"Transcript cache hit for video: {video_id}")
+                    return cached
+            url = f"https://www.youtube.com/watch?v={video_id}"
         # 임시 폴더 생성 후 해당 경로가 tmp변수에 저장
         with tempfile.TemporaryDirectory() as tmp:
-            audio_path = self.download_audio(url,output=f"{tmp}/yt_audio")
-            transcript = self.stt(audio_path)
+            transcript = ""
+            if self.prefer_subtitles:
+                transcript = self.download_subtitles(url,output=f"{tmp}/yt_subs")
+            if not transcript:
+                audio_path = self.download_audio(url,output=f"{tmp}/yt_audio")
+                transcript = self.stt(audio_path,on_partial=on_partial)
         logger.debug(f"Temporary directory and its contents have been removed.")
+        if self.cache and video_id and transcript:
+            self.cache.set(video_id, transcript)
         logger.info(f"Successfully extracted transcript for URL: {url}")
         return transcript